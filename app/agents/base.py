@@ -1,9 +1,17 @@
 from abc import ABC, abstractmethod
 
+from app.core.pipeline import CONTEXT_FIELDS
 from app.core.types import PipelineContext
 
 
 class BaseAgent(ABC):
+    # PipelineContext fields (or shared resources) the agent depends on / updates.
+    # Subclasses narrow these so the pipeline engine can run them concurrently.
+    reads: frozenset = CONTEXT_FIELDS
+    writes: frozenset = CONTEXT_FIELDS
+    # False for agents with side effects; pipelines containing them are never cached.
+    cacheable: bool = True
+
     @abstractmethod
     async def run(self, context: PipelineContext) -> PipelineContext:
         raise NotImplementedError
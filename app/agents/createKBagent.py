@@ -12,11 +12,24 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 # app/agents/create_kb_agent.py
 # app/agents/create_kb_agent.py
+from app.core import events
+from app.core.executors import run_blocking
 from app.services.create_KB import VectorStore
 from app.core.types import PipelineContext
 from app.services.retriever_singleton import get_retriever_service
 
 class CreateKBAgent:
+    # "kb_index" is the shared FAISS index, not a context field: it keeps
+    # retriever stages ordered after the index they search is rebuilt.
+    reads = frozenset({"url"})
+    writes = frozenset({"response", "kb_index"})
+    # Ingestion is slow: the API submits it to the job queue instead of awaiting it
+    background = True
+    cacheable = False
+
+    def __init__(self, http=None):
+        self.http = http
+
     async def run(self, context: PipelineContext) -> PipelineContext:
         if not context.url:
             context.response = "❌ No URL provided for knowledge base creation."
@@ -24,13 +37,17 @@ class CreateKBAgent:
 
         # 🔥 Use the global retriever's embeddings (no duplicate model load)
         retriever_service = get_retriever_service()
-        vectorstore = VectorStore(retriever_service.embeddings)
+        vectorstore = VectorStore(
+            retriever_service.embeddings,
+            http=self.http,
+            progress=lambda stage, **counters: events.publish("progress", stage=stage, **counters),
+        )
 
-        # Create / update FAISS index
-        result = vectorstore.ensure_index(context.url)
+        # Create / update FAISS index off the event loop
+        result = await vectorstore.aensure_index(context.url)
 
-        # 🟢 Instead of reload from disk, reuse in-memory index
-        retriever_service.vectors = vectorstore.vectors  
+        # 🟢 Instead of reload from disk, reuse in-memory index (listeners may call Redis)
+        await run_blocking("io", retriever_service.set_vectors, vectorstore.vectors, centroids=vectorstore.centroids)
 
         context.response = result
         context.trace.append({
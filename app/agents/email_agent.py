@@ -15,10 +15,17 @@
 #         return await self.update_trace(context, "EmailAgent", "completed")
 
 
+from app.agents.base import BaseAgent
+from app.core.executors import run_blocking
 from app.core.types import PipelineContext
 from app.services.email import EmailService
 
-class EmailAgent:
+class EmailAgent(BaseAgent):
+    reads = frozenset({"subject", "body", "to_email"})
+    writes = frozenset({"email_status"})
+    # Side effect: never serve from the pipeline result cache
+    cacheable = False
+
     def __init__(self, email_service: EmailService):
         self.email_service = email_service
 
@@ -29,8 +36,9 @@ class EmailAgent:
 
         if not to_email:
             context.email_status = "failed: no recipient email provided"
-            return context
+            return await self.update_trace(context, "EmailAgent", "failed")
 
-        status = self.email_service.send_email(subject, body, to_email)
+        # Transient SMTP errors raise here when EMAIL_FAIL_ON_TRANSIENT is set (resumable run)
+        status = await run_blocking("io", self.email_service.send_email, subject, body, to_email)
         context.email_status = status
-        return context
+        return await self.update_trace(context, "EmailAgent", "completed" if status == "success" else "failed")
@@ -88,17 +88,34 @@
 # If the doc/sheet is private and no JSON key file is given → fail gracefully with a clear message.
 
 
+import requests
+
 from app.agents.base import BaseAgent
 from app.core.types import PipelineContext
 from app.services.GoogleShyAndDoc import GoogleSheetsHandler, GoogleDocsHandler
+from app.core.config import COMPRESSION_ENABLED
 from app.core.summary_fun import summarize_extracted_text
+from app.core.executors import run_blocking
+from app.services.text_compression import compress_text
 
 # JSON_KEY_FILE is optional now
 JSON_KEY_FILE = None  # or set your file path if you want auth enabled by default
 
 class GoogleSheetsAgent(BaseAgent):
-    def __init__(self, json_key_file: str | None = JSON_KEY_FILE):
+    reads = frozenset({"meta"})
+    writes = frozenset({"response"})
+
+    def __init__(
+        self,
+        json_key_file: str | None = JSON_KEY_FILE,
+        http: requests.Session | None = None,
+        embeddings=None,
+        compress: bool = COMPRESSION_ENABLED,
+    ):
         self.json_key_file = json_key_file
+        self.http = http
+        # Extractive compression before summarizing needs the shared MiniLM embeddings
+        self.embeddings = embeddings if compress else None
 
     async def run(self, context: PipelineContext) -> PipelineContext:
         if not context.meta.get("sheet_url"):
@@ -108,8 +125,8 @@ class GoogleSheetsAgent(BaseAgent):
         sheet_url = context.meta["sheet_url"]
 
         try:
-            sheets = GoogleSheetsHandler(sheet_url, self.json_key_file)
-            data = sheets.read()
+            sheets = GoogleSheetsHandler(sheet_url, self.json_key_file, session=self.http)
+            data = await run_blocking("io", sheets.read)
 
             if not data:
                 context.response = "⚠️ No data found in sheet"
@@ -118,6 +135,10 @@ class GoogleSheetsAgent(BaseAgent):
                 extracted_text = "\n".join(
                     " | ".join(f"{k}: {v}" for k, v in row.items()) for row in data
                 )
+                if self.embeddings is not None:
+                    compressed = await compress_text(extracted_text, self.embeddings, unit="row")
+                    context.trace.append(compressed.trace_entry("GoogleSheetsAgent"))
+                    extracted_text = compressed.text
                 summary = await summarize_extracted_text(extracted_text)
                 context.response = summary
 
@@ -133,8 +154,20 @@ class GoogleSheetsAgent(BaseAgent):
 
 
 class GoogleDocsAgent(BaseAgent):
-    def __init__(self, json_key_file: str | None = JSON_KEY_FILE):
+    reads = frozenset({"meta"})
+    writes = frozenset({"response"})
+
+    def __init__(
+        self,
+        json_key_file: str | None = JSON_KEY_FILE,
+        http: requests.Session | None = None,
+        embeddings=None,
+        compress: bool = COMPRESSION_ENABLED,
+    ):
         self.json_key_file = json_key_file
+        self.http = http
+        # Extractive compression before summarizing needs the shared MiniLM embeddings
+        self.embeddings = embeddings if compress else None
 
     async def run(self, context: PipelineContext) -> PipelineContext:
         if not context.meta.get("doc_id"):
@@ -144,14 +177,19 @@ class GoogleDocsAgent(BaseAgent):
         doc_id = context.meta["doc_id"]
 
         try:
-            docs = GoogleDocsHandler(doc_id, self.json_key_file)
-            content = docs.read()
+            docs = GoogleDocsHandler(doc_id, self.json_key_file, session=self.http)
+            content = await run_blocking("io", docs.read)
 
             if isinstance(content, list):
                 extracted_text = "\n".join(content)
             else:
                 extracted_text = str(content)
 
+            if self.embeddings is not None:
+                compressed = await compress_text(extracted_text, self.embeddings, unit="sentence")
+                context.trace.append(compressed.trace_entry("GoogleDocsAgent"))
+                extracted_text = compressed.text
+
             # Summarize the extracted text
             summary = await summarize_extracted_text(extracted_text)
             context.response = summary
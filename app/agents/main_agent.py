@@ -1,24 +1,63 @@
 from app.agents.base import BaseAgent
+from app.core import tokens
 from app.core.types import PipelineContext
+from app.services.conversation_memory import ConversationMemory
 from app.services.llm import LlmService
+from app.services.semantic_cache import SemanticCache
 
 
 class MainAgent(BaseAgent):
-    def __init__(self, llm: LlmService):
+    reads = frozenset({"query", "response", "meta", "session_id"})
+    writes = frozenset({"response", "meta"})
+
+    def __init__(self, llm: LlmService, cache: SemanticCache | None = None, memory: ConversationMemory | None = None):
         self.llm = llm
+        self.cache = cache
+        self.memory = memory
+
+    async def remember(self, context: PipelineContext):
+        """Record this exchange in the session's history (no-op outside a session)."""
+        if self.memory and context.session_id and context.response:
+            await self.memory.record_turn(context.session_id, context.query, context.response)
 
     async def run(self, context: PipelineContext) -> PipelineContext:
         if context.response and context.meta.get("source") == "vectorstore":
             return context
+
+        history = await self.memory.messages(context.session_id) if self.memory and context.session_id else []
+        # SpeculativeAnswerAgent records the turn itself once it knows this answer is used
+        remember = not context.meta.get("defer_memory")
+        # An answer that builds on earlier turns is only valid in its own conversation
+        cache = self.cache if not history else None
+
+        if cache:
+            cached, query_vector, score = await cache.lookup(context.query)
+            if cached is not None:
+                context.response = cached
+                context.meta["source"] = "semantic-cache"
+                context.meta["semantic_similarity"] = round(score, 3)
+                if remember:
+                    await self.remember(context)
+                return await self.update_trace(context, "MainAgent", "completed")
+
+        if history:
+            context.meta["history_tokens"] = tokens.count_message_tokens(history)
         prompt = [
             {"role": "system", "content": "You are an AI expert."},
+            *history,
             {"role": "user", "content": f"Answer this in 50 words: {context.query}"},
         ]
         response = ""
-        async for chunk in self.llm.stream_completion(prompt, max_tokens=1024):
+        # "50 words" is a soft target the model often overshoots: a tight cap would cut answers mid-sentence
+        max_tokens = tokens.completion_tokens_for(50, slack=2.0, minimum=160)
+        async for chunk in self.llm.stream_completion(prompt, max_tokens=max_tokens):
             response += chunk
         context.response = response
         context.meta.update(self.llm.build_metadata())
+        if cache:
+            cache.store(query_vector, response)
+        if remember:
+            await self.remember(context)
         return await self.update_trace(context, "MainAgent", "completed")
 
 
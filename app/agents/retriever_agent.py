@@ -19,21 +19,62 @@
 
 # app/agents/retriever_agent.py
 from app.agents.base import BaseAgent
+from app.core import tokens
 from app.core.types import PipelineContext
+from app.services.conversation_memory import ConversationMemory
 from app.services.retriever_singleton import get_retriever_service  # 🟢 use lazy singleton
+from app.services.semantic_cache import SemanticCache
 
 
 class RetrieverAgent(BaseAgent):
-    def __init__(self):
+    reads = frozenset({"query", "kb_index", "meta", "session_id"})
+    writes = frozenset({"response", "meta"})
+
+    def __init__(self, cache: SemanticCache | None = None, memory: ConversationMemory | None = None):
         # always use the singleton retriever
         self.retriever = get_retriever_service()
+        # answers from the current index only; cleared when the index is rebuilt
+        self.cache = cache
+        self.memory = memory
+
+    async def remember(self, context: PipelineContext):
+        """Record this exchange in the session's history (no-op outside a session)."""
+        if self.memory and context.session_id and context.response:
+            await self.memory.record_turn(context.session_id, context.query, context.response)
 
     async def run(self, context: PipelineContext) -> PipelineContext:
-        result = self.retriever.retrieve(context.query)
+        if context.meta.get("route") == "general":
+            # RouterAgent judged the query off-topic for the knowledge base
+            context.response = "I couldn’t find a relevant answer in the knowledge base."
+            context.meta["source"] = "model-fallback"
+            return await self.update_trace(context, "RetrieverAgent", "skipped")
+
+        history = await self.memory.transcript(context.session_id) if self.memory and context.session_id else ""
+        # An answer that builds on earlier turns is only valid in its own conversation
+        cache = self.cache if not history else None
+
+        if cache:
+            cached, query_vector, score = await cache.lookup(context.query)
+            if cached is not None:
+                context.response = cached
+                context.meta["source"] = "vectorstore"
+                context.meta["semantic_similarity"] = round(score, 3)
+                await self.remember(context)
+                return await self.update_trace(context, "RetrieverAgent", "completed")
+
+        search_query = None
+        if history:
+            context.meta["history_tokens"] = tokens.count_tokens(history)
+            # Follow-ups ("and its price?") need the previous question to find anything
+            search_query = f"{await self.memory.last_query(context.session_id)}\n{context.query}"
+        result = await self.retriever.aretrieve(context.query, history=history, search_query=search_query)
+        if result and cache:
+            cache.store(query_vector, result)
 
         if result:
             context.response = result
             context.meta["source"] = "vectorstore"
+            await self.remember(context)
         else:
             context.response = "I couldn’t find a relevant answer in the knowledge base."
             context.meta["source"] = "model-fallback"
@@ -0,0 +1,40 @@
+from app.agents.base import BaseAgent
+from app.core.executors import run_blocking
+from app.core.types import PipelineContext
+from app.services.kb_router import route_query
+from app.services.retriever_singleton import get_retriever_service
+
+
+class RouterAgent(BaseAgent):
+    """
+    Decides with one query embedding whether the knowledge base is worth searching.
+    Writes meta["route"] ("rag", "general" or "both"); RetrieverAgent skips on "general".
+    """
+
+    reads = frozenset({"query", "kb_index"})
+    writes = frozenset({"meta"})
+
+    def __init__(self):
+        self.retriever = get_retriever_service()
+
+    async def run(self, context: PipelineContext) -> PipelineContext:
+        centroids = self.retriever.centroids
+        if not self.retriever.vectors:
+            route, confidence, similarity = "general", 1.0, 0.0
+        elif centroids is None:
+            # An index without centroids can't be judged: search it rather than skip it
+            route, confidence, similarity = "both", 0.0, 0.0
+        else:
+            query_vector = await run_blocking("embedding", self.retriever.embeddings.embed_query, context.query)
+            route, confidence, similarity = route_query(query_vector, centroids)
+
+        context.meta["route"] = route
+        context.meta["route_confidence"] = confidence
+        context.trace.append({
+            "agent": "RouterAgent",
+            "status": "completed",
+            "route": route,
+            "confidence": confidence,
+            "similarity": similarity,
+        })
+        return context
@@ -1,16 +1,22 @@
 from app.agents.base import BaseAgent
+from app.core.executors import run_blocking
 from app.core.types import PipelineContext
 from app.services.sms import SmsService
 
 
 class SmsAgent(BaseAgent):
+    reads = frozenset({"summary", "response", "phone"})
+    writes = frozenset({"sms_status"})
+    # Side effect: never serve from the pipeline result cache
+    cacheable = False
+
     def __init__(self, sms: SmsService):
         self.sms = sms
 
     async def run(self, context: PipelineContext) -> PipelineContext:
         message = context.summary or context.response or ""
         recipient = context.phone or "unknown"
-        context.sms_status = self.sms.send(recipient, message)
+        context.sms_status = await run_blocking("io", self.sms.send, recipient, message)
         return await self.update_trace(context, "SmsAgent", "completed")
 
 
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from dataclasses import replace
+
+from app.agents.base import BaseAgent
+from app.core import events, metrics
+from app.core.logging_utils import get_logger
+from app.core.types import PipelineContext
+
+logger = get_logger()
+
+
+class SpeculativeAnswerAgent(BaseAgent):
+    """
+    Runs RetrieverAgent and MainAgent together instead of back to back.
+
+    MainAgent starts on a copy of the context as if the knowledge base had
+    missed. If the retriever finds a relevant answer the general LLM stream is
+    cancelled and the tokens it already produced are reported; otherwise the
+    already-running answer is used, saving the retriever's latency.
+    """
+
+    def __init__(self, retriever: BaseAgent, main: BaseAgent):
+        self.retriever = retriever
+        self.main = main
+        self.reads = retriever.reads | main.reads
+        self.writes = retriever.writes | main.writes
+
+    async def _run_main(self, context: PipelineContext, holder: list) -> PipelineContext:
+        with events.agent_scope("main"), metrics.agent_stats() as stats:
+            holder.append(stats)
+            return await self.main.run(context)
+
+    async def run(self, context: PipelineContext) -> PipelineContext:
+        if context.meta.get("route") in ("general", "rag"):
+            # RouterAgent already decided: nothing to overlap
+            context = await self.retriever.run(context)
+            return await self.main.run(context)
+
+        main_context = replace(context, response=None, trace=[], meta=dict(context.meta))
+        main_context.meta.pop("source", None)
+        # The general answer may be thrown away: only record it in the session once it's used
+        main_context.meta["defer_memory"] = True
+        holder: list = []
+        started = time.perf_counter()
+        main_task = asyncio.create_task(self._run_main(main_context, holder))
+
+        try:
+            context = await self.retriever.run(context)
+        except asyncio.CancelledError:
+            # Deadline or client disconnect: don't leave the general answer streaming
+            main_task.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"[Speculative] Retriever failed, using general answer: {e}")
+            context.meta["source"] = "model-fallback"
+
+        if context.meta.get("source") == "vectorstore":
+            main_task.cancel()
+            await asyncio.gather(main_task, return_exceptions=True)
+            stats = holder[0] if holder else metrics.AgentStats()
+            entry = {
+                "agent": "SpeculativeAnswerAgent",
+                "status": "main_cancelled",
+                "cancelled_after_ms": round((time.perf_counter() - started) * 1000, 2),
+                "cancelled_llm_calls": stats.llm_calls,
+                "cancelled_tokens_out": stats.tokens_out or stats.streamed_chunks,
+            }
+            context.trace.append(entry)
+            events.publish("speculation_cancelled", **{k: v for k, v in entry.items() if k != "agent"})
+            metrics.SPECULATIVE_CANCELLED_TOKENS.inc(entry["cancelled_tokens_out"])
+            return context
+
+        main_context = await main_task
+        stats = holder[0]
+        metrics.record(
+            llm_calls=stats.llm_calls,
+            tokens_in=stats.tokens_in,
+            tokens_out=stats.tokens_out,
+            llm_queue_ms=stats.llm_queue_ms,
+            llm_usage=stats.llm_usage,
+        )
+        context.response = main_context.response
+        main_context.meta.pop("defer_memory", None)
+        context.meta.update(main_context.meta)
+        context.trace.extend(main_context.trace)
+        if hasattr(self.main, "remember"):
+            await self.main.remember(context)
+        return await self.update_trace(context, "SpeculativeAnswerAgent", "main_used")
@@ -33,11 +33,15 @@
 
 
 from app.agents.base import BaseAgent
+from app.core import tokens
 from app.core.types import PipelineContext
 from app.services.llm import LlmService
 
 
 class SummaryAgent(BaseAgent):
+    reads = frozenset({"query"})
+    writes = frozenset({"summary", "subject"})
+
     def __init__(self, llm: LlmService):
         self.llm = llm
 
@@ -49,13 +53,31 @@ class SummaryAgent(BaseAgent):
             context.summary = "❌ No input text provided for summarization."
             return await self.update_trace(context, "SummaryAgent", "failed")
 
-        # Summarization
+        # Summary and subject in one round trip
+        result = await self.llm.structured_completion(
+            [
+                {"role": "system", "content": "Summarize this text in about 25 words and write an email subject for the summary."},
+                {"role": "user", "content": text_to_summarize},
+            ],
+            fields={
+                "summary": "summary of the text in about 25 words",
+                "subject": "short email subject for the summary",
+            },
+            max_tokens=tokens.completion_tokens_for(25 + 12),
+        )
+        if result is not None:
+            context.summary = result["summary"]
+            context.subject = result["subject"].strip('"')
+            context.trace.append({"agent": "SummaryAgent", "status": "completed", "mode": "structured"})
+            return context
+
+        # Fallback: summary, then a subject for it (two calls)
         summary_prompt = [
             {"role": "system", "content": "Summarize this text in about 25 words."},
             {"role": "user", "content": text_to_summarize},
         ]
         summary = ""
-        async for chunk in self.llm.stream_completion(summary_prompt, max_tokens=300):
+        async for chunk in self.llm.stream_completion(summary_prompt, max_tokens=tokens.completion_tokens_for(25)):
             if chunk:
                 summary += chunk
         context.summary = summary.strip()
@@ -66,9 +88,10 @@ class SummaryAgent(BaseAgent):
             {"role": "user", "content": context.summary},
         ]
         subject = ""
-        async for chunk in self.llm.stream_completion(subject_prompt, max_tokens=20):
+        async for chunk in self.llm.stream_completion(subject_prompt, max_tokens=tokens.completion_tokens_for(12)):
             if chunk:
                 subject += chunk
         context.subject = subject.strip().strip('"')
 
-        return await self.update_trace(context, "SummaryAgent", "completed")
+        context.trace.append({"agent": "SummaryAgent", "status": "completed", "mode": "sequential"})
+        return context
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.core.logging_utils import get_logger
+
+logger = get_logger()
+
+CHECKPOINT_PREFIX = "pipeline_checkpoint:"
+
+RUNNING, FAILED, DONE = "running", "failed", "done"
+
+
+class DiskCheckpointBackend:
+    """
+    One JSON file per run, replaced atomically so a crash never leaves half a
+    checkpoint. Files untouched for ``ttl`` seconds count as gone and are
+    swept on save, like the Redis backend's key expiry.
+    """
+
+    # Sweep the directory for expired checkpoints at most this often
+    SWEEP_INTERVAL = 300.0
+
+    def __init__(self, directory: str, ttl: int):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _path(self, run_id: str) -> str:
+        path = os.path.realpath(os.path.join(self.directory, f"{run_id}.json"))
+        if os.path.dirname(path) != os.path.realpath(self.directory):
+            raise ValueError(f"run id {run_id!r} escapes the checkpoint directory")
+        return path
+
+    def _expired(self, path: str) -> bool:
+        return bool(self.ttl) and os.path.getmtime(path) + self.ttl < time.time()
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(run_id)
+        try:
+            if self._expired(path):
+                self.delete(run_id)
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, run_id: str, record: Dict[str, Any]):
+        path = self._path(run_id)
+        tmp = f"{path}.tmp"
+        with self._lock:
+            with open(tmp, "w") as f:
+                json.dump(record, f, default=str)
+            os.replace(tmp, path)
+        self._sweep()
+
+    def _sweep(self):
+        now = time.time()
+        if not self.ttl or now - self._last_sweep < self.SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".json") and self._expired(path):
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            logger.info(f"[Checkpoints] Removed {removed} expired checkpoints.")
+
+    def delete(self, run_id: str):
+        try:
+            os.remove(self._path(run_id))
+        except FileNotFoundError:
+            pass
+
+
+class RedisCheckpointBackend:
+    """Checkpoints on the app/core/redis_store.py client, expiring after ``ttl`` seconds."""
+
+    def __init__(self, ttl: int):
+        from app.core.redis_store import redis_client  # optional: only needed for the shared backend
+
+        self.client = redis_client
+        self.ttl = ttl
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        data = self.client.get(f"{CHECKPOINT_PREFIX}{run_id}")
+        return json.loads(data) if data else None
+
+    def save(self, run_id: str, record: Dict[str, Any]):
+        self.client.setex(f"{CHECKPOINT_PREFIX}{run_id}", self.ttl, json.dumps(record, default=str))
+
+    def delete(self, run_id: str):
+        self.client.delete(f"{CHECKPOINT_PREFIX}{run_id}")
+
+
+class CheckpointStore:
+    """
+    Pipeline progress keyed by run id: the agent list, the ids of agents that
+    already succeeded and the context as it stood after them. A resumed run
+    skips the completed agents, so a retry only repeats what failed.
+
+    Run ids are issued by the server (job ids, "run-" ids); both backends do
+    blocking I/O, so the engine calls them through the io pool.
+    """
+
+    def __init__(self, backend: str = "disk", directory: str = "", ttl: int = 86400):
+        if backend == "redis":
+            self.backend = RedisCheckpointBackend(ttl)
+        else:
+            self.backend = DiskCheckpointBackend(directory, ttl)
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.backend.load(run_id)
+        except Exception as e:
+            logger.warning(f"[Checkpoints] load {run_id} failed: {e}")
+            return None
+
+    def save(self, run_id: str, record: Dict[str, Any]):
+        record["updated_at"] = time.time()
+        try:
+            self.backend.save(run_id, record)
+        except Exception as e:
+            # Losing a checkpoint only costs a longer retry; never fail the run over it
+            logger.warning(f"[Checkpoints] save {run_id} failed: {e}")
+
+    def delete(self, run_id: str):
+        try:
+            self.backend.delete(run_id)
+        except Exception as e:
+            logger.warning(f"[Checkpoints] delete {run_id} failed: {e}")
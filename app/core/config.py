@@ -14,6 +14,56 @@ SENDER_PASSWORD = os.getenv("SENDER_PASSWORD", "tinKesh.32")
 
 RECEIVER_EMAIL = os.getenv("RECEIVER_EMAIL", "receiver@example.com")
 
+# Groq rate-limit governor (per model) — set to your account's limits
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "4"))
+
+# LLM provider used by summarize_extracted_text ("groq", "openai" or "hedged"), and the
+# hedged provider's backends ("provider" or "provider:model", best first) and hedge delay bounds
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+LLM_HEDGE_BACKENDS = [b.strip() for b in os.getenv("LLM_HEDGE_BACKENDS", "groq,openai").split(",") if b.strip()]
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "2.0"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.3"))
+LLM_HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "5.0"))
+
+# Point every LLM client (AsyncGroq, ChatGroq, OpenAI) at another compatible server,
+# e.g. the local stand-in in app/devtools/llm_server.py: LLM_BASE_URL=http://127.0.0.1:8001
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+if LLM_BASE_URL:
+    # The stand-in ignores keys, but the SDKs refuse to start without one
+    os.environ.setdefault("GROQ_API_KEY", "local")
+    os.environ.setdefault("OPENAI_API_KEY", "local")
+
+# Summarization of extracted Google Sheets/Docs text: inputs above SUMMARY_SINGLE_CALL_TOKENS
+# are split into SUMMARY_SECTION_TOKENS sections and summarized map-reduce
+SUMMARY_SINGLE_CALL_TOKENS = int(os.getenv("SUMMARY_SINGLE_CALL_TOKENS", "6000"))
+SUMMARY_SECTION_TOKENS = int(os.getenv("SUMMARY_SECTION_TOKENS", "4000"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+# Optional extractive compression before summarization (Google Sheets/Docs): rank rows or
+# sentences by MiniLM salience minus COMPRESSION_REDUNDANCY x similarity to what's already
+# kept, and keep the best that fit in COMPRESSION_TOKEN_BUDGET tokens
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "false").lower() == "true"
+COMPRESSION_TOKEN_BUDGET = int(os.getenv("COMPRESSION_TOKEN_BUDGET", str(SUMMARY_SINGLE_CALL_TOKENS)))
+COMPRESSION_REDUNDANCY = float(os.getenv("COMPRESSION_REDUNDANCY", "0.5"))
+
+# Shared HTTP connection pool (Google Sheets/Docs, knowledge-base downloads)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+
+# Request deadlines: default budget for interactive requests (0 = unbounded; override
+# per request with the X-Request-Timeout header or the `timeout` field), and the
+# per-call caps used when a request has more budget left than that.
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "60"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+# Raise on transient SMTP errors (connection trouble, 4xx replies) so a checkpointed run
+# can be resumed; otherwise every failure is just reported in email_status
+EMAIL_FAIL_ON_TRANSIENT = os.getenv("EMAIL_FAIL_ON_TRANSIENT", "false").lower() == "true"
+
 # Paths
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # points to /Users/abhishek/Desktop/multiAgentAI/app
 
@@ -22,6 +72,62 @@ FAISS_INDEX_PATH = os.getenv(
     os.path.join(PROJECT_ROOT, "Vector_Store"),  # ✅ updated
 )
 
+# Executor pools for blocking work called from async code (see app/core/executors.py)
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "32"))
+EMBEDDING_POOL_SIZE = int(os.getenv("EMBEDDING_POOL_SIZE", "2"))
+PARSING_POOL_SIZE = int(os.getenv("PARSING_POOL_SIZE", "2"))
+PARSING_POOL_KIND = os.getenv("PARSING_POOL_KIND", "thread")  # "thread" or "process"
+
+# Priority scheduler for embedding / parsing / LLM slots: a waiter moves up one
+# class (background -> batch -> interactive) per this many seconds of waiting
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "5"))
+
+# Pipeline result cache: "none", "memory" (in-process LRU) or "redis" (LRU + shared Redis)
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+
+# Semantic answer cache for MainAgent / RetrieverAgent
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+# Knowledge-base router: best query/centroid cosine similarity decides the path
+ROUTER_CENTROIDS = int(os.getenv("ROUTER_CENTROIDS", "8"))
+ROUTER_RAG_THRESHOLD = float(os.getenv("ROUTER_RAG_THRESHOLD", "0.45"))
+ROUTER_GENERAL_THRESHOLD = float(os.getenv("ROUTER_GENERAL_THRESHOLD", "0.2"))
+
+# Multi-turn sessions (context.session_id): the last SESSION_MEMORY_TURNS exchanges are kept
+# verbatim (each message cut to SESSION_MEMORY_TURN_TOKENS), older ones are folded into a rolling
+# summary of at most SESSION_MEMORY_SUMMARY_TOKENS. Backend: "none", "memory" or "redis"
+SESSION_MEMORY_BACKEND = os.getenv("SESSION_MEMORY_BACKEND", "memory")
+SESSION_MEMORY_TURNS = int(os.getenv("SESSION_MEMORY_TURNS", "4"))
+SESSION_MEMORY_TURN_TOKENS = int(os.getenv("SESSION_MEMORY_TURN_TOKENS", "400"))
+SESSION_MEMORY_SUMMARY_TOKENS = int(os.getenv("SESSION_MEMORY_SUMMARY_TOKENS", "300"))
+SESSION_MEMORY_TTL = int(os.getenv("SESSION_MEMORY_TTL", "86400"))
+
+# Pipeline checkpoints for resuming failed runs: "none", "disk" or "redis"
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "disk")
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", os.path.join(PROJECT_ROOT, "checkpoints"))
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", "86400"))  # both backends; 0 keeps disk checkpoints forever
+
+# Disk cache of LLM responses keyed by model, messages and generation parameters:
+# "off", "readwrite" (calls at or below LLM_CACHE_MAX_TEMPERATURE, i.e. deterministic ones
+# by default), "record" (always call, overwrite) or "replay" (strict: a miss is an error,
+# nothing reaches the model)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(PROJECT_ROOT, "llm_cache.db"))
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.0"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "0"))  # seconds, 0 = keep forever
+
+# Rolling window for the per-model / per-endpoint LLM usage stats (GET /llm/usage)
+LLM_USAGE_WINDOW_SECONDS = float(os.getenv("LLM_USAGE_WINDOW_SECONDS", "300"))
+
+# Background jobs (knowledge-base ingestion)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(PROJECT_ROOT, "jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
 # RETRIEVER_FILE_PATH = os.getenv(
 #     "RETRIEVER_FILE_PATH",
 #     os.path.join(PROJECT_ROOT, "api.txt"),  # ✅ updated
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional
+
+# Absolute deadline (epoch seconds) of the request being served. Epoch rather
+# than monotonic time so it survives a trip through PipelineContext / the job store.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before this call could start or finish."""
+
+
+def from_timeout(seconds: Optional[float]) -> Optional[float]:
+    """Turn a relative budget (header/field) into an absolute deadline; None or <= 0 means unbounded."""
+    if not seconds or seconds <= 0:
+        return None
+    return time.time() + seconds
+
+
+def current() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None when it has no deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def check():
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+
+
+def timeout(cap: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout to hand a downstream call: the remaining budget, capped by the
+    call's own default. Raises DeadlineExceeded if nothing is left.
+    """
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return min(left, cap) if cap is not None else left
+
+
+@contextmanager
+def scope(deadline: Optional[float]) -> Iterator[None]:
+    """Bind ``deadline`` for the block. An outer, earlier deadline is never extended."""
+    outer = _deadline.get()
+    if outer is not None and (deadline is None or outer < deadline):
+        deadline = outer
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """
+    Run the block with no deadline: for upstream work shared by several
+    requests, each of which bounds its own wait (see ``wait``).
+    """
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def wait(awaitable: Awaitable[Any]) -> Any:
+    """Await within the remaining budget; raises DeadlineExceeded if it runs out first."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        async with asyncio.timeout(max(left, 0)) as budget:
+            return await awaitable
+    except TimeoutError:
+        if budget.expired():
+            raise DeadlineExceeded("request deadline exceeded") from None
+        raise
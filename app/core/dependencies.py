@@ -1,9 +1,24 @@
 from langchain_huggingface import HuggingFaceEmbeddings
 
+from app.core import metrics
+
+
+class InstrumentedEmbeddings(HuggingFaceEmbeddings):
+    """Counts embedding-model calls against the running agent."""
+
+    def embed_documents(self, texts):
+        metrics.record(embedding_calls=1)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        metrics.record(embedding_calls=1)
+        return super().embed_query(text)
+
+
 _embeddings = None
 
 def get_embeddings():
     global _embeddings
     if _embeddings is None:
-        _embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        _embeddings = InstrumentedEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
     return _embeddings
\ No newline at end of file
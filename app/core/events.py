@@ -0,0 +1,69 @@
+import asyncio
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+# Sink for the request currently being served and the agent currently running.
+# Both are ContextVars so concurrent pipelines (and gathered agents) stay isolated.
+_current_stream: ContextVar[Optional["EventStream"]] = ContextVar("event_stream", default=None)
+_current_agent: ContextVar[Optional[str]] = ContextVar("current_agent", default=None)
+
+_CLOSED = object()
+
+
+class EventStream:
+    """Queue of (event, data) pairs produced by a pipeline and consumed by an SSE response."""
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        # Thread-safe: blocking work offloaded to executors may publish too
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (event, data))
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, _CLOSED)
+
+    async def __aiter__(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        while True:
+            item = await self._queue.get()
+            if item is _CLOSED:
+                return
+            yield item
+
+
+def publish(event: str, **data: Any):
+    """Publish an event to the bound stream, if any; a no-op for plain requests."""
+    stream = _current_stream.get()
+    if stream is None:
+        return
+    data.setdefault("agent", _current_agent.get())
+    stream.publish(event, data)
+
+
+def current_agent() -> Optional[str]:
+    return _current_agent.get()
+
+
+@contextmanager
+def bind_stream(stream: Optional[EventStream]):
+    token = _current_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _current_stream.reset(token)
+
+
+@contextmanager
+def agent_scope(agent_id: str):
+    token = _current_agent.set(agent_id)
+    try:
+        yield
+    finally:
+        _current_agent.reset(token)
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
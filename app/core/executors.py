@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.config import EMBEDDING_POOL_SIZE, IO_POOL_SIZE, PARSING_POOL_KIND, PARSING_POOL_SIZE
+from app.core.logging_utils import get_logger
+from app.core.scheduler import get_scheduler
+
+logger = get_logger()
+
+# Named pools for blocking work called from async code:
+#   io        - network calls through sync clients (SMTP, requests, LangChain invoke)
+#   embedding - sentence-transformer / FAISS work (torch releases the GIL)
+#   parsing   - PDF/DOCX/HTML text extraction (process pool when PARSING_POOL_KIND=process)
+POOL_SIZES = {"io": IO_POOL_SIZE, "embedding": EMBEDDING_POOL_SIZE, "parsing": PARSING_POOL_SIZE}
+
+
+class PoolStats:
+    def __init__(self, size: int):
+        self.size = size
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "saturation": round(self.active / self.size, 3) if self.size else 0.0,
+                "avg_wait_ms": round(1000 * self.wait_seconds / self.completed, 2) if self.completed else 0.0,
+                "avg_busy_ms": round(1000 * self.busy_seconds / self.completed, 2) if self.completed else 0.0,
+            }
+
+
+_pools: Dict[str, Executor] = {}
+_stats: Dict[str, PoolStats] = {}
+_pools_lock = threading.Lock()
+_process_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def _create_pool(name: str) -> Executor:
+    size = POOL_SIZES[name]
+    if name == "parsing" and PARSING_POOL_KIND == "process":
+        return ProcessPoolExecutor(max_workers=size)
+    return ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"{name}-pool")
+
+
+def get_pool(name: str) -> Executor:
+    if name not in POOL_SIZES:
+        raise ValueError(f"Unknown executor pool: {name}")
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = _create_pool(name)
+            _stats[name] = PoolStats(POOL_SIZES[name])
+            logger.info(f"[Executors] '{name}' pool started with {POOL_SIZES[name]} workers.")
+        return _pools[name]
+
+
+def _timed(stats: PoolStats, submitted: float, fn: Callable, *args, **kwargs):
+    started = time.perf_counter()
+    with stats._lock:
+        stats.queued -= 1
+        stats.active += 1
+        stats.wait_seconds += started - submitted
+    ok = False
+    try:
+        result = fn(*args, **kwargs)
+        ok = True
+        return result
+    finally:
+        with stats._lock:
+            stats.active -= 1
+            stats.busy_seconds += time.perf_counter() - started
+            if ok:
+                stats.completed += 1
+            else:
+                stats.failed += 1
+
+
+async def run_blocking(pool: str, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on the named pool without stalling the event loop.
+    Thread pools keep the caller's ContextVars (event sink, current agent);
+    process pools need picklable module-level functions and get no context.
+    Contended pools (embedding, parsing) are entered in priority order, see
+    app/core/scheduler.py.
+    """
+    resource = get_scheduler().resource(pool)
+    if resource is None:
+        return await _submit(pool, fn, *args, **kwargs)
+    async with resource.slot():
+        return await _submit(pool, fn, *args, **kwargs)
+
+
+def _process_slot(pool: str, size: int) -> asyncio.Semaphore:
+    if pool not in _process_slots:
+        _process_slots[pool] = asyncio.Semaphore(size)
+    return _process_slots[pool]
+
+
+async def _submit(pool: str, fn: Callable, *args, **kwargs) -> Any:
+    executor = get_pool(pool)
+    stats = _stats[pool]
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+    with stats._lock:
+        stats.queued += 1
+
+    if isinstance(executor, ProcessPoolExecutor):
+        # Workers can't report back when they pick a task up, so hand the pool at most
+        # one task per worker: whatever holds a slot is running, the rest is queued here.
+        async with _process_slot(pool, stats.size):
+            started = time.perf_counter()
+            with stats._lock:
+                stats.queued -= 1
+                stats.active += 1
+                stats.wait_seconds += started - submitted
+            try:
+                result = await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+            except BaseException:
+                with stats._lock:
+                    stats.failed += 1
+                raise
+            else:
+                with stats._lock:
+                    stats.completed += 1
+                return result
+            finally:
+                with stats._lock:
+                    stats.active -= 1
+                    stats.busy_seconds += time.perf_counter() - started
+
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, _timed, stats, submitted, fn, *args, **kwargs)
+    return await loop.run_in_executor(executor, call)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    with _pools_lock:
+        return {name: stats.snapshot() for name, stats in _stats.items()}
+
+
+def shutdown_pools(wait: bool = True):
+    with _pools_lock:
+        for name, pool in _pools.items():
+            pool.shutdown(wait=wait, cancel_futures=True)
+            logger.info(f"[Executors] '{name}' pool stopped.")
+        _pools.clear()
+        _stats.clear()
+        _process_slots.clear()
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core import metrics
+from app.core.config import (
+    LLM_HEDGE_BACKENDS,
+    LLM_HEDGE_DEFAULT_DELAY,
+    LLM_HEDGE_MAX_DELAY,
+    LLM_HEDGE_MIN_DELAY,
+)
+from app.core.llm_provider import LLMProvider, get_llm_provider
+
+log = logging.getLogger(__name__)
+
+
+class BackendStats:
+    """Rolling first-token latency and error window for one backend."""
+
+    def __init__(self, window: int = 200):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)  # True = error
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.outcomes.append(False)
+            self.requests += 1
+
+    def error(self):
+        with self._lock:
+            self.outcomes.append(True)
+            self.requests += 1
+            self.errors += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self) -> float:
+        """Lower is better: p95 latency inflated by the recent error rate."""
+        p95 = self.percentile(0.95)
+        return (p95 if p95 is not None else LLM_HEDGE_DEFAULT_DELAY) * (1 + 4 * self.error_rate())
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate(), 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class HedgedProvider(LLMProvider):
+    """
+    Composite provider for tail latency.
+
+    Backends are ranked by recent p95 first-token latency and error rate. The
+    best one is asked first; if it hasn't produced a first token (or a full
+    response) within its own p95, the next backend is started as a hedge and
+    whichever answers first wins, the other is cancelled. Errors fail over to
+    the next backend. Once a stream has produced its first token it is never
+    switched, so output is not duplicated.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Tuple[str, LLMProvider]],
+        min_delay: float = LLM_HEDGE_MIN_DELAY,
+        max_delay: float = LLM_HEDGE_MAX_DELAY,
+        min_samples: int = 20,
+    ):
+        if not backends:
+            raise ValueError("HedgedProvider needs at least one backend")
+        self.backends = list(backends)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.latency = {name: BackendStats() for name, _ in self.backends}
+        self.hedges = 0
+        self.secondary_wins = 0
+
+    @classmethod
+    def from_config(cls, names: Sequence[str] = LLM_HEDGE_BACKENDS) -> "HedgedProvider":
+        """Backends named in LLM_HEDGE_BACKENDS, skipping any that aren't configured (no API key or SDK)."""
+        backends = []
+        for name in names:
+            try:
+                backends.append((name, get_llm_provider(name)))
+            except (ValueError, ImportError) as e:
+                log.warning(f"[HedgedProvider] skipping backend {name}: {e}")
+        return cls(backends)
+
+    def ranked(self) -> List[Tuple[str, LLMProvider]]:
+        # Stable sort: with no data yet the configured order is kept
+        return sorted(self.backends, key=lambda backend: self.latency[backend[0]].score())
+
+    def hedge_delay(self, name: str) -> float:
+        stats = self.latency[name]
+        p95 = stats.percentile(0.95)
+        if p95 is None or len(stats.latencies) < self.min_samples:
+            return LLM_HEDGE_DEFAULT_DELAY
+        return min(self.max_delay, max(self.min_delay, p95))
+
+    async def _timed(self, name: str, start: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()
+        # A cancelled call (lost race) leaves no sample: its elapsed time is a lower bound, not a
+        # latency, and would drag the backend's p95 (hedge delay and ranking) down
+        try:
+            result = await start()
+        except Exception:
+            self.latency[name].error()
+            metrics.LLM_BACKEND_REQUESTS.inc(backend=name, outcome="error")
+            raise
+        self.latency[name].observe(time.perf_counter() - started)
+        metrics.LLM_BACKEND_REQUESTS.inc(backend=name, outcome="ok")
+        return result
+
+    async def _race(
+        self,
+        start: Callable[[LLMProvider], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> Any:
+        """Run ``start`` on the ranked backends with hedging and failover; return the first success."""
+        queue = self.ranked()
+        running: Dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+        primary = queue[0][0]
+
+        def launch():
+            name, provider = queue.pop(0)
+            running[asyncio.create_task(self._timed(name, lambda: start(provider)))] = name
+
+        launch()
+        try:
+            while running:
+                # Hedge on the p95 of the backend actually running, which after a failover isn't the primary
+                timeout = self.hedge_delay(next(iter(running.values()))) if queue and len(running) == 1 else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The running backend is slower than its p95: hedge with the next one
+                    self.hedges += 1
+                    metrics.LLM_HEDGED_REQUESTS.inc(reason="slow")
+                    launch()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        if name != primary:
+                            self.secondary_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    log.warning(f"[HedgedProvider] {name} failed: {last_error!r}")
+                if not running and queue:
+                    metrics.LLM_HEDGED_REQUESTS.inc(reason="failover")
+                    launch()
+            raise last_error
+        finally:
+            for task in running:
+                task.cancel()
+            results = await asyncio.gather(*running, return_exceptions=True)
+            if discard:
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result)
+
+    async def generate_response(self, prompt: str) -> str:
+        return await self._race(lambda provider: provider.generate_response(prompt))
+
+    async def stream_response(self, prompt: str) -> AsyncIterator[str]:
+        async def first_token(provider: LLMProvider):
+            stream = provider.stream_response(prompt).__aiter__()
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
+
+        async def close(result):
+            await result[0].aclose()
+
+        stream, first = await self._race(first_token, discard=close)
+        try:
+            if first is None:
+                return
+            yield first
+            async for token in stream:
+                yield token
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "order": [name for name, _ in self.ranked()],
+            "hedges": self.hedges,
+            "secondary_wins": self.secondary_wins,
+            "backends": {name: stats.snapshot() for name, stats in self.latency.items()},
+        }
+
+    async def aclose(self):
+        # Backends belong to the registry and are closed there
+        pass
+
+
+class StubProvider(LLMProvider):
+    """Local stand-in backend with injected latency and failures, for exercising hedging."""
+
+    def __init__(
+        self,
+        text: str = "stub response",
+        first_token_delay: float = 0.0,
+        token_delay: float = 0.0,
+        fail: bool = False,
+        latency: Optional[Callable[[], float]] = None,
+    ):
+        self.text = text
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.fail = fail
+        # Optional sampler, e.g. lambda: random.expovariate(5), overriding first_token_delay
+        self.latency = latency
+        self.calls = 0
+
+    async def _wait_first(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency() if self.latency else self.first_token_delay)
+        if self.fail:
+            raise RuntimeError("stub provider failure")
+
+    async def generate_response(self, prompt: str) -> str:
+        await self._wait_first()
+        await asyncio.sleep(self.token_delay * len(self.text.split()))
+        return self.text
+
+    async def stream_response(self, prompt: str) -> AsyncIterator[str]:
+        await self._wait_first()
+        for i, word in enumerate(self.text.split()):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else f" {word}"
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.core import metrics
+from app.core.config import LLM_CACHE_MAX_TEMPERATURE, LLM_CACHE_MODE, LLM_CACHE_PATH, LLM_CACHE_TTL
+from app.core.executors import run_blocking
+from app.core.logging_utils import get_logger
+
+logger = get_logger()
+
+# off       - no caching
+# readwrite - serve hits, store misses (only calls at or below LLM_CACHE_MAX_TEMPERATURE,
+#             0.0 by default so sampled completions are never replayed)
+# record    - always call the model and (over)write the entry
+# replay    - strict: serve hits, fail on a miss; nothing reaches the model
+MODES = ("off", "readwrite", "record", "replay")
+
+
+class LlmCacheMiss(LookupError):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+def _usage(usage: Any) -> Optional[Dict[str, int]]:
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+
+# Replayed responses carry no usage (no tokens were spent on them) and are marked cached
+def _chunk(content: str) -> SimpleNamespace:
+    """A streamed chunk shaped like the SDKs' (choices[0].delta.content)."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], x_groq=None, usage=None, cached=True
+    )
+
+
+def _response(content: str) -> SimpleNamespace:
+    """A non-streamed response shaped like the SDKs' (choices[0].message.content)."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None, cached=True)
+
+
+class LlmResponseCache:
+    """
+    Disk-backed, content-addressed store of finished LLM responses, keyed by
+    the flight_key() of model, messages and generation parameters. Streams are
+    stored as their content deltas and replayed chunk by chunk; only streams
+    that ran to completion are recorded.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        mode: str = LLM_CACHE_MODE,
+        max_temperature: float = LLM_CACHE_MAX_TEMPERATURE,
+        ttl: int = LLM_CACHE_TTL,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.max_temperature = max_temperature
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if mode != "off":
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            self._db.commit()
+            logger.info(f"[LlmCache] {mode} mode, store at {path}")
+
+    def applies(self, temperature: Optional[float]) -> bool:
+        """Whether a call with this temperature goes through the cache at all."""
+        if self.mode == "off":
+            return False
+        if self.mode == "readwrite":
+            # None = the API default, which is 1.0 for both Groq and OpenAI
+            return (1.0 if temperature is None else temperature) <= self.max_temperature
+        return True
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and row[1] + self.ttl < time.time():
+                self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is not None:
+                self._db.execute("UPDATE llm_responses SET hits = hits + 1 WHERE key = ?", (key,))
+                self._db.commit()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, key: str, model: str, response: Dict[str, Any]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, model, json.dumps(response), time.time()),
+            )
+            self._db.commit()
+        self.writes += 1
+
+    # get/put hit SQLite (and commit); callers on the event loop go through the io pool
+    async def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = None if self.mode == "record" else await run_blocking("io", self.get, key)
+        result = "hit" if entry is not None else "miss"
+        if entry is not None:
+            self.hits += 1
+            metrics.record(llm_cache_hits=1)
+        else:
+            self.misses += 1
+        metrics.LLM_CACHE_LOOKUPS.inc(mode=self.mode, result=result)
+        if entry is None and self.mode == "replay":
+            raise LlmCacheMiss(f"No recorded LLM response for key {key[:12]}… (LLM_CACHE_MODE=replay)")
+        return entry
+
+    async def call(
+        self, key: str, model: str, temperature: Optional[float], fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Non-streamed call through the cache; a hit returns an SDK-shaped response."""
+        if not self.applies(temperature):
+            return await fn()
+        entry = await self._lookup(key)
+        if entry is not None:
+            return _response(entry["content"])
+        response = await fn()
+        await run_blocking("io", self.put, key, model, {
+            "content": response.choices[0].message.content or "",
+            "usage": _usage(getattr(response, "usage", None)),
+        })
+        return response
+
+    async def stream(
+        self,
+        key: str,
+        model: str,
+        temperature: Optional[float],
+        open_stream: Callable[[], AsyncIterator[Any]],
+    ) -> AsyncIterator[Any]:
+        """Streamed call through the cache; a hit replays the recorded chunks."""
+        if not self.applies(temperature):
+            async for chunk in open_stream():
+                yield chunk
+            return
+        entry = await self._lookup(key)
+        if entry is not None:
+            for content in entry["chunks"]:
+                yield _chunk(content)
+                await asyncio.sleep(0)  # yield to the event loop between chunks, like a live stream
+            return
+
+        chunks: List[str] = []
+        usage = None
+        async for chunk in open_stream():
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                chunks.append(chunk.choices[0].delta.content)
+            yield chunk
+        await run_blocking("io", self.put, key, model, {"chunks": chunks, "usage": _usage(usage)})
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self._db is not None:
+            with self._lock:
+                entries = self._db.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        return {"mode": self.mode, "entries": entries, "hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
+
+
+_cache: Optional[LlmResponseCache] = None
+
+
+def get_llm_cache() -> LlmResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = LlmResponseCache()
+    return _cache
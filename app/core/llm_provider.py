@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
-from langchain_groq import ChatGroq
-# from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 import os
 import logging
 from dotenv import load_dotenv
+from groq import AsyncGroq
+from app.core import deadline, llm_usage, metrics, tokens
+from app.core.config import LLM_BASE_URL, LLM_TIMEOUT_SECONDS
+from app.core.llm_cache import get_llm_cache
+from app.core.rate_limit import get_governor
+from app.core.singleflight import SingleFlight, flight_key
 
 # Load environment variables
 load_dotenv()
@@ -16,10 +20,127 @@ class LLMProvider(ABC):
     async def generate_response(self, prompt: str) -> str:
         pass
 
-class GroqProvider(LLMProvider):
-    def __init__(self):
+    @abstractmethod
+    def stream_response(self, prompt: str) -> AsyncIterator[str]:
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class ChatCompletionsProvider(LLMProvider):
+    """
+    Shared implementation for OpenAI-compatible async clients (Groq, OpenAI).
+    Subclasses set ``client``/``model_name`` and may wrap calls in ``_call``/``_stream``.
+    """
+
+    client: Any
+    model_name: str
+    _flights: Optional[SingleFlight] = None
+
+    @property
+    def flights(self) -> SingleFlight:
+        # Concurrent identical prompts to this provider share one upstream call
+        if self._flights is None:
+            self._flights = SingleFlight(type(self).__name__)
+        return self._flights
+
+    # Output room kept free when fitting a prompt into the model's context window, and the output cap
+    completion_reserve = 2048
+    # Callers (summaries, extraction) want the same answer for the same input; 0 also makes calls cacheable
+    temperature = 0.0
+
+    def _messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [{"role": "user", "content": tokens.fit_prompt(prompt, self.model_name, self.completion_reserve)}]
+
+    def _params(self) -> Dict[str, Any]:
+        """Generation parameters sent with every call; also part of the flight/cache key."""
+        return {"temperature": self.temperature, "max_completion_tokens": self.completion_reserve}
+
+    def _key(self, prompt: str, stream: bool) -> str:
+        return flight_key(model=self.model_name, prompt=prompt, stream=stream, **self._params())
+
+    def _create(self, prompt: str, stream: bool) -> Callable[[], Awaitable[Any]]:
+        # Fresh coroutine per attempt so the rate governor can retry it
+        return lambda: self.client.chat.completions.create(
+            messages=self._messages(prompt),
+            model=self.model_name,
+            stream=stream,
+            timeout=deadline.timeout(LLM_TIMEOUT_SECONDS),
+            **self._params(),
+        )
+
+    async def _call(self, prompt: str, create: Callable[[], Awaitable[Any]]) -> Any:
+        return await create()
+
+    async def _stream(self, prompt: str, create: Callable[[], Awaitable[Any]]) -> AsyncIterator[Any]:
+        async for chunk in await create():
+            yield chunk
+
+    def _timed_create(self, call: llm_usage.LlmCall, prompt: str, stream: bool) -> Callable[[], Awaitable[Any]]:
+        create = self._create(prompt, stream)
+        return lambda: call.sent(create())
+
+    async def generate_response(self, prompt: str) -> str:
+        key = self._key(prompt, stream=False)
+        call = llm_usage.LlmCall(self.model_name, llm_usage.endpoint_of(self.client))
+        try:
+            response, leader = await self.flights.do(
+                key,
+                lambda: get_llm_cache().call(
+                    key,
+                    self.model_name,
+                    self.temperature,
+                    lambda: self._call(prompt, self._timed_create(call, prompt, False)),
+                ),
+            )
+        except Exception:
+            if call.sent_at is not None:  # this caller made the request
+                call.fail()
+            raise
+        metrics.record_first_token()
+        if leader:
+            metrics.record(llm_calls=1)
+            call.complete_response(response, tokens.count_tokens(prompt))
+        return response.choices[0].message.content or ""
+
+    async def stream_response(self, prompt: str) -> AsyncIterator[str]:
+        key = self._key(prompt, stream=True)
+        call = llm_usage.LlmCall(self.model_name, llm_usage.endpoint_of(self.client))
+        stream = self.flights.stream(
+            key,
+            lambda: get_llm_cache().stream(
+                key,
+                self.model_name,
+                self.temperature,
+                lambda: self._stream(prompt, self._timed_create(call, prompt, True)),
+            ),
+        )
+        if stream.leader:
+            metrics.record(llm_calls=1)
+        try:
+            async for chunk in stream:
+                deadline.check()
+                content = call.observe(chunk)
+                if content:
+                    metrics.record_first_token()
+                    metrics.record(streamed_chunks=1)
+                    yield content
+        except Exception:
+            if stream.leader:
+                call.fail()
+            raise
+        if stream.leader:
+            call.complete(tokens.count_tokens(prompt))
+
+    async def aclose(self):
+        await self.client.close()
+
+
+class GroqProvider(ChatCompletionsProvider):
+    def __init__(self, client: Optional[AsyncGroq] = None, model_name: Optional[str] = None):
         self.api_key = os.getenv("GROQ_API_KEY")
-        self.model_name = os.getenv("GROQ_MODEL_NAME")
+        self.model_name = model_name or os.getenv("GROQ_MODEL_NAME")
         log.info(f"Initializing Groq provider with model: {self.model_name}")
         
         if not self.api_key:
@@ -29,47 +150,96 @@ class GroqProvider(LLMProvider):
             log.error("GROQ_MODEL_NAME is not set in environment variables")
             raise ValueError("GROQ_MODEL_NAME is not set in environment variables.")
         
-        self.llm = ChatGroq(
-            model_name=self.model_name,
-            api_key=self.api_key
-        )
+        # One pooled async client per provider; retries handled by the rate governor
+        self.client = client or AsyncGroq(api_key=self.api_key, base_url=LLM_BASE_URL, max_retries=0)
         log.info(f"Successfully initialized Groq provider with model: {self.model_name}")
 
-    async def generate_response(self, prompt: str) -> str:
-        messages = [HumanMessage(content=prompt)]
-        response = self.llm.invoke(messages)
-        return response.content
-
-# class OpenAIProvider(LLMProvider):
-#     def __init__(self):
-#         self.api_key = os.getenv("OPENAI_API_KEY")
-#         self.model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-3.5-turbo")
-#         log.info(f"Initializing OpenAI provider with model: {self.model_name}")
-        
-#         if not self.api_key:
-#             log.error("OPENAI_API_KEY is not set in environment variables")
-#             raise ValueError("OPENAI_API_KEY is not set in environment variables.")
+    async def _call(self, prompt: str, create: Callable[[], Awaitable[Any]]) -> Any:
+        return await get_governor().call(self.model_name, self._estimate(prompt), create)
+
+    def _stream(self, prompt: str, create: Callable[[], Awaitable[Any]]) -> AsyncIterator[Any]:
+        return get_governor().stream(self.model_name, self._estimate(prompt), create)
+
+    def _estimate(self, prompt: str) -> int:
+        prompt_tokens = min(tokens.count_tokens(prompt), tokens.context_limit(self.model_name))
+        return prompt_tokens + self.completion_reserve
+
+
+class OpenAIProvider(ChatCompletionsProvider):
+    def __init__(self, client: Any = None, model_name: Optional[str] = None):
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.model_name = model_name or os.getenv("OPENAI_MODEL_NAME", "gpt-3.5-turbo")
+        log.info(f"Initializing OpenAI provider with model: {self.model_name}")
         
-#         self.llm = ChatOpenAI(
-#             model_name=self.model_name,
-#             api_key=self.api_key
-#         )
-#         log.info(f"Successfully initialized OpenAI provider with model: {self.model_name}")
+        if not self.api_key:
+            log.error("OPENAI_API_KEY is not set in environment variables")
+            raise ValueError("OPENAI_API_KEY is not set in environment variables.")
+
+        if client is None:
+            from openai import AsyncOpenAI  # optional dependency: only needed for this provider
+
+            client = AsyncOpenAI(
+                api_key=self.api_key, base_url=f"{LLM_BASE_URL.rstrip('/')}/v1" if LLM_BASE_URL else None
+            )
+        self.client = client
+        log.info(f"Successfully initialized OpenAI provider with model: {self.model_name}")
+
+    def _create(self, prompt: str, stream: bool) -> Callable[[], Awaitable[Any]]:
+        if not stream:
+            return super()._create(prompt, stream)
+        # OpenAI only reports usage on streams when asked to
+        return lambda: self.client.chat.completions.create(
+            messages=self._messages(prompt),
+            model=self.model_name,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=deadline.timeout(LLM_TIMEOUT_SECONDS),
+            **self._params(),
+        )
+
+
+# -------------------------------------------------------------------
+# Registry: each provider (and its connection pool) is built once
+# -------------------------------------------------------------------
+def _hedged_provider(model_name: Optional[str] = None) -> LLMProvider:
+    from app.core.hedged_provider import HedgedProvider  # composite built on this registry
+
+    return HedgedProvider.from_config()
+
+
+# Factories take an optional model override: "groq:llama-3.1-8b-instant" is the Groq provider on that model
+PROVIDER_FACTORIES: Dict[str, Callable[..., LLMProvider]] = {
+    "groq": GroqProvider,
+    "openai": OpenAIProvider,
+    "hedged": _hedged_provider,
+}
+
+_providers: Dict[str, LLMProvider] = {}
 
-#     async def generate_response(self, prompt: str) -> str:
-#         messages = [HumanMessage(content=prompt)]
-#         response = self.llm.invoke(messages)
-#         return response.content
 
 def get_llm_provider(provider_name: str) -> LLMProvider:
     provider_name = provider_name.lower()
-    log.info(f"Getting LLM provider: {provider_name}")
-    
-    if provider_name == 'groq':
-        return GroqProvider()
-    elif provider_name == 'openai':
-        # return OpenAIProvider()
-        pass
-    else:
+    if provider_name in _providers:
+        return _providers[provider_name]
+
+    kind, _, model_name = provider_name.partition(":")
+    if kind not in PROVIDER_FACTORIES:
         log.error(f"Unsupported LLM provider: {provider_name}")
-        raise ValueError(f"Unsupported LLM provider: {provider_name}") 
\ No newline at end of file
+        raise ValueError(f"Unsupported LLM provider: {provider_name}")
+    log.info(f"Creating LLM provider: {provider_name}")
+    _providers[provider_name] = PROVIDER_FACTORIES[kind](model_name=model_name or None)
+    return _providers[provider_name]
+
+
+def register_llm_provider(provider_name: str, provider: LLMProvider):
+    """Use ``provider`` for ``provider_name`` (e.g. one built on a shared client)."""
+    _providers[provider_name.lower()] = provider
+
+
+async def close_llm_providers():
+    for name, provider in list(_providers.items()):
+        try:
+            await provider.aclose()
+        except Exception as e:
+            log.warning(f"Closing LLM provider {name} failed: {e}")
+    _providers.clear()
@@ -0,0 +1,282 @@
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.core import metrics, tokens
+from app.core.config import LLM_USAGE_WINDOW_SECONDS
+
+
+# -------------------------------------------------------------------
+# One call
+# -------------------------------------------------------------------
+@dataclass
+class LlmCallRecord:
+    model: str
+    endpoint: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    queue_wait_ms: float = 0.0  # local: rate-limit admission, concurrency slot, retry backoff
+    provider_queue_ms: Optional[float] = None  # provider-side queueing, when reported (Groq)
+    ttft_ms: Optional[float] = None  # request sent -> first token (whole response if not streamed)
+    duration_ms: float = 0.0  # request sent -> last token
+    tokens_per_sec: Optional[float] = None  # completion tokens over decode time
+    cached: bool = False
+    estimated: bool = False  # token counts from the local tokenizer, not the provider
+    outcome: str = "ok"
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        for name in ("queue_wait_ms", "provider_queue_ms", "ttft_ms", "duration_ms", "tokens_per_sec"):
+            if data[name] is not None:
+                data[name] = round(data[name], 2)
+        return data
+
+
+def endpoint_of(client: Any) -> str:
+    """Host the SDK client (or base URL) talks to, e.g. api.groq.com or the local stand-in server."""
+    if isinstance(client, str):
+        return urlparse(client).netloc or client
+    base_url = getattr(client, "base_url", None)
+    if base_url is None:
+        return "unknown"
+    host = getattr(base_url, "host", None)
+    port = getattr(base_url, "port", None)
+    return f"{host}:{port}" if host and port else host or str(base_url)
+
+
+class LlmCall:
+    """
+    Times one upstream call. Create it before queueing for the rate governor
+    and wrap the request with ``sent()``. Streams then pass every chunk through
+    ``observe()`` and end with ``complete()``; plain calls use
+    ``complete_response()``; failures ``fail()``. The record goes to the
+    running agent (and from there to meta["llm_usage"]) and to the registry.
+    """
+
+    def __init__(self, model: str, endpoint: str):
+        self.model = model
+        self.endpoint = endpoint
+        self.created = time.perf_counter()
+        self.sent_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.provider_queue_ms: Optional[float] = None
+        self.reported: Optional[Tuple[int, int]] = None
+        self.cached = False
+        self.chunks = 0
+
+    def sent(self, request: Any) -> Any:
+        # Called by the governor per attempt; the last attempt is the one that answered
+        self.sent_at = time.perf_counter()
+        return request
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def usage(self, usage: Any) -> Tuple[int, int]:
+        """Read (prompt, completion) tokens off an SDK usage object, keeping Groq's queue_time."""
+        queue_time = getattr(usage, "queue_time", None)
+        if queue_time is not None:
+            self.provider_queue_ms = queue_time * 1000
+        return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+    def observe(self, chunk: Any) -> Optional[str]:
+        """Track one streamed chunk; returns its text, if any."""
+        self.cached = self.cached or getattr(chunk, "cached", False)
+        # Groq reports usage on the last chunk under x_groq, OpenAI (if asked) under usage
+        usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None)
+        if usage is not None:
+            self.reported = self.usage(usage)
+        if not chunk.choices:
+            return None
+        content = chunk.choices[0].delta.content
+        if content:
+            self.first_token()
+            self.chunks += 1
+        return content
+
+    def complete(self, prompt_tokens: int) -> LlmCallRecord:
+        """End of a stream. ``prompt_tokens`` (local count) is used if the provider sent no usage."""
+        if self.cached:
+            return self.finish(0, 0, cached=True)
+        if self.reported is not None:
+            prompt_tokens, completion_tokens = self.reported
+        else:
+            completion_tokens = self.chunks  # about one token per streamed chunk
+        metrics.record(tokens_in=prompt_tokens, tokens_out=completion_tokens)
+        return self.finish(prompt_tokens, completion_tokens, estimated=self.reported is None)
+
+    def complete_response(self, response: Any, prompt_tokens: int) -> LlmCallRecord:
+        """End of a non-streamed call."""
+        if getattr(response, "cached", False):
+            return self.finish(0, 0, cached=True)
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            content = response.choices[0].message.content or ""
+            reported, completion_tokens = False, tokens.count_tokens(content)
+        else:
+            reported = True
+            prompt_tokens, completion_tokens = self.usage(usage)
+        metrics.record(tokens_in=prompt_tokens, tokens_out=completion_tokens)
+        return self.finish(prompt_tokens, completion_tokens, estimated=not reported)
+
+    def _record(self, **values: Any) -> LlmCallRecord:
+        now = time.perf_counter()
+        sent_at = self.sent_at or self.created
+        if self.first_token_at is not None or values.get("outcome", "ok") == "ok":
+            values.setdefault("ttft_ms", ((self.first_token_at or now) - sent_at) * 1000)
+        record = LlmCallRecord(
+            model=self.model,
+            endpoint=self.endpoint,
+            queue_wait_ms=(sent_at - self.created) * 1000,
+            provider_queue_ms=self.provider_queue_ms,
+            duration_ms=(now - sent_at) * 1000,
+            **values,
+        )
+        metrics.record(llm_queue_ms=record.queue_wait_ms, llm_usage=[record.to_dict()])
+        if not record.cached:
+            get_usage_registry().observe(record)
+        return record
+
+    def finish(
+        self, prompt_tokens: int, completion_tokens: int, cached: bool = False, estimated: bool = False
+    ) -> LlmCallRecord:
+        now = time.perf_counter()
+        if self.first_token_at is not None and completion_tokens > 1 and now > self.first_token_at:
+            # Decode speed: the tokens after the first over the time they took to stream
+            tokens_per_sec = (completion_tokens - 1) / (now - self.first_token_at)
+        elif completion_tokens and self.sent_at is not None and now > self.sent_at:
+            tokens_per_sec = completion_tokens / (now - self.sent_at)
+        else:
+            tokens_per_sec = None
+        return self._record(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            tokens_per_sec=tokens_per_sec,
+            cached=cached,
+            estimated=estimated,
+        )
+
+    def fail(self) -> LlmCallRecord:
+        return self._record(outcome="error")
+
+
+# -------------------------------------------------------------------
+# Rolling per-model / per-endpoint aggregation
+# -------------------------------------------------------------------
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+class UsageWindow:
+    """Calls for one (model, endpoint) over the last ``window_seconds``."""
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.calls: deque = deque()  # (monotonic time, LlmCallRecord)
+        self.total_calls = 0
+        self.total_prompt_tokens = 0
+        self.total_completion_tokens = 0
+
+    def add(self, record: LlmCallRecord):
+        self.calls.append((time.monotonic(), record))
+        self.total_calls += 1
+        self.total_prompt_tokens += record.prompt_tokens
+        self.total_completion_tokens += record.completion_tokens
+        self._trim()
+
+    def _trim(self):
+        horizon = time.monotonic() - self.window_seconds
+        while self.calls and self.calls[0][0] < horizon:
+            self.calls.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._trim()
+        records = [record for _, record in self.calls]
+        ok = [r for r in records if r.outcome == "ok"]
+        minutes = self.window_seconds / 60
+        prompt = sum(r.prompt_tokens for r in ok)
+        completion = sum(r.completion_tokens for r in ok)
+        return {
+            "window_seconds": self.window_seconds,
+            "calls": len(records),
+            "errors": len(records) - len(ok),
+            "requests_per_minute": round(len(records) / minutes, 2),
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "tokens_per_minute": round((prompt + completion) / minutes, 1),
+            "ttft_ms": {
+                "p50": _percentile([r.ttft_ms for r in ok if r.ttft_ms is not None], 0.5),
+                "p95": _percentile([r.ttft_ms for r in ok if r.ttft_ms is not None], 0.95),
+            },
+            "tokens_per_sec": {
+                "p50": _percentile([r.tokens_per_sec for r in ok if r.tokens_per_sec], 0.5),
+                "p05": _percentile([r.tokens_per_sec for r in ok if r.tokens_per_sec], 0.05),
+            },
+            "queue_wait_ms": {
+                "p50": _percentile([r.queue_wait_ms for r in records], 0.5),
+                "p95": _percentile([r.queue_wait_ms for r in records], 0.95),
+            },
+            "totals": {
+                "calls": self.total_calls,
+                "prompt_tokens": self.total_prompt_tokens,
+                "completion_tokens": self.total_completion_tokens,
+            },
+        }
+
+
+class UsageRegistry:
+    def __init__(self, window_seconds: float = LLM_USAGE_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._windows: Dict[Tuple[str, str], UsageWindow] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, record: LlmCallRecord):
+        with self._lock:
+            key = (record.model, record.endpoint)
+            if key not in self._windows:
+                self._windows[key] = UsageWindow(self.window_seconds)
+            self._windows[key].add(record)
+        labels = {"model": record.model, "endpoint": record.endpoint}
+        metrics.LLM_CALLS.inc(outcome=record.outcome, **labels)
+        metrics.LLM_QUEUE_WAIT.observe(record.queue_wait_ms / 1000, **labels)
+        if record.outcome == "ok" and record.ttft_ms is not None:
+            metrics.LLM_CALL_TTFT.observe(record.ttft_ms / 1000, **labels)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"model": model, "endpoint": endpoint, **window.snapshot()}
+                for (model, endpoint), window in self._windows.items()
+            ]
+
+
+_registry: Optional[UsageRegistry] = None
+
+
+def get_usage_registry() -> UsageRegistry:
+    global _registry
+    if _registry is None:
+        _registry = UsageRegistry()
+    return _registry
+
+
+def summarize(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-agent roll-up stored in PipelineContext.meta["llm_usage"]."""
+    upstream = [c for c in calls if not c["cached"]]
+    ttfts = [c["ttft_ms"] for c in upstream if c["ttft_ms"] is not None and c["outcome"] == "ok"]
+    return {
+        "calls": len(calls),
+        "cached_calls": len(calls) - len(upstream),
+        "prompt_tokens": sum(c["prompt_tokens"] for c in upstream),
+        "completion_tokens": sum(c["completion_tokens"] for c in upstream),
+        "queue_wait_ms": round(sum(c["queue_wait_ms"] for c in upstream), 2),
+        "ttft_ms": ttfts[0] if ttfts else None,  # first call: what the user waited for
+        "by_call": calls,
+    }
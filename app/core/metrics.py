@@ -0,0 +1,217 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.executors import pool_stats
+
+# -------------------------------------------------------------------
+# Per-agent stats (collected while one agent runs, written to its trace)
+# -------------------------------------------------------------------
+@dataclass
+class AgentStats:
+    wall_ms: float = 0.0
+    ttft_ms: Optional[float] = None
+    llm_calls: int = 0
+    llm_cache_hits: int = 0
+    llm_queue_ms: float = 0.0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    streamed_chunks: int = 0
+    embedding_calls: int = 0
+    faiss_search_ms: float = 0.0
+    bytes_fetched: int = 0
+    # One LlmCallRecord dict per upstream call (app/core/llm_usage.py); goes to meta, not the trace
+    llm_usage: List[dict] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("llm_usage")
+        data["wall_ms"] = round(data["wall_ms"], 2)
+        data["llm_queue_ms"] = round(data["llm_queue_ms"], 2)
+        data["faiss_search_ms"] = round(data["faiss_search_ms"], 2)
+        if data["ttft_ms"] is not None:
+            data["ttft_ms"] = round(data["ttft_ms"], 2)
+        return data
+
+
+_current_stats: ContextVar[Optional[AgentStats]] = ContextVar("agent_stats", default=None)
+
+
+def current_stats() -> Optional[AgentStats]:
+    return _current_stats.get()
+
+
+def record(**increments: float):
+    """Add to the running agent's counters (lists are extended); a no-op outside an instrumented agent."""
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    with stats._lock:
+        for name, value in increments.items():
+            setattr(stats, name, getattr(stats, name) + value)
+
+
+def record_first_token():
+    """Mark time-to-first-token (relative to agent start) for the first LLM output only."""
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    with stats._lock:
+        if stats.ttft_ms is None:
+            stats.ttft_ms = (time.perf_counter() - stats._started) * 1000
+
+
+@contextmanager
+def timed(field: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(**{field: (time.perf_counter() - started) * 1000})
+
+
+@contextmanager
+def agent_stats() -> Iterator[AgentStats]:
+    stats = AgentStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        stats.wall_ms = (time.perf_counter() - stats._started) * 1000
+        _current_stats.reset(token)
+
+
+# -------------------------------------------------------------------
+# Process-wide aggregation (Prometheus text format)
+# -------------------------------------------------------------------
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series: Dict[LabelKey, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return "\n".join(lines)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._series: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels: str):
+        key = _labels(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._series.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return "\n".join(lines)
+
+
+AGENT_DURATION = Histogram("agent_duration_seconds", "Wall time of one agent run.")
+AGENT_TTFT = Histogram("agent_time_to_first_token_seconds", "Time from agent start to first LLM token.")
+FAISS_SEARCH = Histogram("faiss_search_seconds", "FAISS similarity search time per agent run.")
+AGENT_RUNS = Counter("agent_runs_total", "Agent runs by outcome.")
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens by direction (in = prompt, out = completion).")
+EMBEDDING_CALLS = Counter("embedding_calls_total", "Calls into the embedding model.")
+BYTES_FETCHED = Counter("http_bytes_fetched_total", "Bytes downloaded from external sources.")
+SEMANTIC_CACHE_LOOKUPS = Counter("semantic_cache_lookups_total", "Semantic answer cache lookups by result.")
+SPECULATIVE_CANCELLED_TOKENS = Counter(
+    "speculative_cancelled_tokens_total", "Completion tokens spent on speculative answers that were cancelled."
+)
+LLM_BACKEND_REQUESTS = Counter("llm_backend_requests_total", "Hedged-provider backend attempts by outcome.")
+LLM_HEDGED_REQUESTS = Counter("llm_hedged_requests_total", "Extra LLM requests started by the hedged provider.")
+LLM_COALESCED = Counter("llm_coalesced_calls_total", "LLM calls served by an identical call already in flight.")
+LLM_CACHE_LOOKUPS = Counter("llm_cache_lookups_total", "LLM response cache lookups by mode and result.")
+LLM_CALLS = Counter("llm_calls_total", "Upstream LLM calls by model, endpoint and outcome.")
+LLM_CALL_TTFT = Histogram("llm_call_time_to_first_token_seconds", "Request sent to first token, per LLM call.")
+LLM_QUEUE_WAIT = Histogram("llm_queue_wait_seconds", "Local wait (rate limits, concurrency, retries) before an LLM call.")
+
+REGISTRY = [
+    AGENT_DURATION, AGENT_TTFT, FAISS_SEARCH, AGENT_RUNS, LLM_TOKENS, EMBEDDING_CALLS, BYTES_FETCHED,
+    SEMANTIC_CACHE_LOOKUPS, SPECULATIVE_CANCELLED_TOKENS, LLM_BACKEND_REQUESTS, LLM_HEDGED_REQUESTS,
+    LLM_COALESCED, LLM_CACHE_LOOKUPS, LLM_CALLS, LLM_CALL_TTFT, LLM_QUEUE_WAIT,
+]
+
+
+def observe_agent(agent_id: str, stats: AgentStats, outcome: str):
+    AGENT_RUNS.inc(agent=agent_id, outcome=outcome)
+    AGENT_DURATION.observe(stats.wall_ms / 1000, agent=agent_id)
+    if stats.ttft_ms is not None:
+        AGENT_TTFT.observe(stats.ttft_ms / 1000, agent=agent_id)
+    if stats.faiss_search_ms:
+        FAISS_SEARCH.observe(stats.faiss_search_ms / 1000, agent=agent_id)
+    if stats.tokens_in:
+        LLM_TOKENS.inc(stats.tokens_in, agent=agent_id, direction="in")
+    if stats.tokens_out:
+        LLM_TOKENS.inc(stats.tokens_out, agent=agent_id, direction="out")
+    if stats.embedding_calls:
+        EMBEDDING_CALLS.inc(stats.embedding_calls, agent=agent_id)
+    if stats.bytes_fetched:
+        BYTES_FETCHED.inc(stats.bytes_fetched, agent=agent_id)
+
+
+def _render_pools() -> str:
+    lines = []
+    for field, kind in (("active", "gauge"), ("queued", "gauge"), ("saturation", "gauge"), ("completed", "counter")):
+        name = f"executor_pool_{field}" + ("_total" if kind == "counter" else "")
+        lines += [f"# TYPE {name} {kind}"]
+        for pool, stats in pool_stats().items():
+            lines.append(f'{name}{{pool="{pool}"}} {stats[field]}')
+    return "\n".join(lines)
+
+
+def render_prometheus() -> str:
+    return "\n".join([metric.render() for metric in REGISTRY] + [_render_pools()]) + "\n"
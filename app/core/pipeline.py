@@ -0,0 +1,282 @@
+import asyncio
+from dataclasses import asdict, fields, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core import checkpoints, deadline, events, llm_usage, metrics
+from app.core.executors import run_blocking
+from app.core.scheduler import priority_scope
+from app.core.logging_utils import get_logger
+from app.core.types import PipelineContext
+
+logger = get_logger()
+
+# Every PipelineContext field. Agents that don't declare reads/writes are
+# treated as touching all of them, which makes them a barrier in the graph.
+CONTEXT_FIELDS = frozenset(f.name for f in fields(PipelineContext))
+
+
+def agent_reads(agent: Any) -> frozenset:
+    return frozenset(getattr(agent, "reads", CONTEXT_FIELDS))
+
+
+def agent_writes(agent: Any) -> frozenset:
+    return frozenset(getattr(agent, "writes", CONTEXT_FIELDS))
+
+
+def plan_stages(agents: Sequence[Any]) -> List[List[int]]:
+    """
+    Group agents (given in request order) into stages that can run concurrently.
+
+    Names in ``reads``/``writes`` are PipelineContext fields, or shared resources
+    such as ``kb_index`` that only constrain ordering. For an earlier agent i and
+    a later agent j:
+      * i writes what j reads (read-after-write)  -> j runs in a later stage
+      * i reads what j writes, or both write it   -> j runs in the same or a later stage
+    Writes are merged back in request order, so the last writer still wins.
+    """
+    levels: List[int] = []
+    for j, agent in enumerate(agents):
+        reads_j, writes_j = agent_reads(agent), agent_writes(agent)
+        level = 0
+        for i in range(j):
+            reads_i, writes_i = agent_reads(agents[i]), agent_writes(agents[i])
+            if writes_i & reads_j:
+                level = max(level, levels[i] + 1)
+            elif (reads_i | writes_i) & writes_j:
+                level = max(level, levels[i])
+        levels.append(level)
+
+    stages: List[List[int]] = [[] for _ in range(max(levels, default=-1) + 1)]
+    for index, level in enumerate(levels):
+        stages[level].append(index)
+    return stages
+
+
+def _snapshot(context: PipelineContext) -> PipelineContext:
+    return replace(context, trace=list(context.trace), meta=dict(context.meta))
+
+
+def merge_branches(base: PipelineContext, branches: Iterable[PipelineContext]) -> PipelineContext:
+    """Fold branch results into ``base`` in order: changed fields, new meta keys, new trace entries."""
+    merged = _snapshot(base)
+    for branch in branches:
+        for name in CONTEXT_FIELDS - {"trace", "meta"}:
+            value = getattr(branch, name)
+            if value != getattr(base, name):
+                setattr(merged, name, value)
+        for key, value in branch.meta.items():
+            if key == "llm_usage":
+                # Per-agent entries: siblings each add their own
+                merged.meta[key] = {**merged.meta.get(key, {}), **value}
+            elif key not in base.meta or base.meta[key] != value:
+                merged.meta[key] = value
+        merged.trace.extend(branch.trace[len(base.trace):])
+    return merged
+
+
+class PipelineEngine:
+    """Runs a list of agents as a dependency graph, gathering independent stages."""
+
+    def __init__(
+        self,
+        resolve_agent: Callable[[str], Any],
+        cache: Optional[Any] = None,
+        speculative_pairs: Optional[Dict[Tuple[str, str], Callable[[Any, Any], Any]]] = None,
+        checkpoints: Optional[Any] = None,
+    ):
+        self.resolve_agent = resolve_agent
+        # Optional PipelineResultCache (app/core/result_cache.py)
+        self.cache = cache
+        # (first_id, second_id) -> factory(first, second) for agents that may overlap
+        self.speculative_pairs = speculative_pairs or {}
+        # Optional CheckpointStore (app/core/checkpoints.py) for resumable runs
+        self.checkpoints = checkpoints
+
+    def fuse_speculative(self, agent_ids: Sequence[str], agents: Sequence[Any]) -> Tuple[List[str], List[Any]]:
+        """Replace adjacent registered pairs (e.g. retriever, main) with one speculative agent."""
+        fused_ids, fused_agents = [], []
+        i = 0
+        while i < len(agent_ids):
+            pair = tuple(agent_ids[i:i + 2])
+            if pair in self.speculative_pairs:
+                fused_ids.append("+".join(pair))
+                fused_agents.append(self.speculative_pairs[pair](agents[i], agents[i + 1]))
+                i += 2
+            else:
+                fused_ids.append(agent_ids[i])
+                fused_agents.append(agents[i])
+                i += 1
+        return fused_ids, fused_agents
+
+    async def run_agent(self, agent_id: str, agent: Any, context: PipelineContext) -> PipelineContext:
+        with events.agent_scope(agent_id):
+            outcome = "error"
+            try:
+                with metrics.agent_stats() as stats:
+                    context = await agent.run(context)
+                outcome = "ok"
+            finally:
+                metrics.observe_agent(agent_id, stats, outcome)
+            context.trace.append({"agent": agent_id, "status": "metrics", **stats.to_dict()})
+            if stats.llm_usage:
+                context.meta["llm_usage"] = {
+                    **context.meta.get("llm_usage", {}),
+                    agent_id: llm_usage.summarize(stats.llm_usage),
+                }
+            events.publish(
+                "agent_completed",
+                outputs={name: getattr(context, name) for name in agent_writes(agent) & CONTEXT_FIELDS},
+                metrics=stats.to_dict(),
+            )
+        return context
+
+    async def run_stage(
+        self, agent_ids: Sequence[str], agents: Sequence[Any], stage: List[int], context: PipelineContext
+    ) -> Tuple[PipelineContext, List[str], List[str], List[Tuple[str, BaseException]]]:
+        """
+        Run one stage within the remaining request budget.
+
+        Returns (merged context, ids that succeeded, ids cancelled by the
+        deadline, (id, error) for agents that raised). Results of agents that
+        succeeded are kept even when a sibling fails or times out.
+        """
+        budget = deadline.remaining()
+        if budget is None and len(stage) == 1:
+            i = stage[0]
+            try:
+                # Snapshot so a failing agent's half-made changes don't reach the checkpoint
+                return await self.run_agent(agent_ids[i], agents[i], _snapshot(context)), [agent_ids[i]], [], []
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return context, [], [], [(agent_ids[i], e)]
+
+        tasks = [
+            asyncio.create_task(self.run_agent(agent_ids[i], agents[i], _snapshot(context)))
+            for i in stage
+        ]
+        try:
+            await asyncio.wait(tasks, timeout=max(budget, 0) if budget is not None else None)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        branches, succeeded, timed_out, failed = [], [], [], []
+        for i, task in zip(stage, tasks):
+            if task.cancelled() or isinstance(task.exception(), deadline.DeadlineExceeded):
+                timed_out.append(agent_ids[i])
+            elif task.exception() is not None:
+                failed.append((agent_ids[i], task.exception()))
+            else:
+                branches.append(task.result())
+                succeeded.append(agent_ids[i])
+        return merge_branches(context, branches), succeeded, timed_out, failed
+
+    async def _checkpoint(self, run_id: Optional[str], record: Dict[str, Any], context: PipelineContext, **values: Any):
+        if not (self.checkpoints and run_id):
+            return
+        record.update(values, context=asdict(context))
+        # File writes / Redis calls; the record isn't touched again until this returns
+        await run_blocking("io", self.checkpoints.save, run_id, record)
+
+    async def run(
+        self,
+        agent_ids: Sequence[str],
+        context: PipelineContext,
+        speculative: bool = False,
+        run_id: Optional[str] = None,
+    ) -> PipelineContext:
+        """
+        Run ``agent_ids`` on ``context``. With a ``run_id`` (and a checkpoint
+        store) the context is saved after every stage, so a failed run can be
+        continued with resume(run_id).
+        """
+        with deadline.scope(context.deadline), priority_scope(context.priority):
+            return await self._run(list(agent_ids), context, speculative, run_id, completed=[])
+
+    async def resume(self, run_id: str, deadline_at: Optional[float] = None) -> PipelineContext:
+        """Continue a checkpointed run, skipping the agents that already succeeded."""
+        record = await run_blocking("io", self.checkpoints.load, run_id) if self.checkpoints else None
+        if record is None:
+            raise KeyError(f"No checkpoint for run '{run_id}'")
+        context = PipelineContext(**record["context"])
+        context.deadline = deadline_at
+        if record["status"] == checkpoints.DONE:
+            return context
+        context.trace.append({"agent": "pipeline", "status": "resumed", "completed": record["completed"]})
+        events.publish("resumed", run_id=run_id, completed=record["completed"])
+        with deadline.scope(context.deadline), priority_scope(context.priority):
+            return await self._run(
+                record["agents"], context, record.get("speculative", False), run_id, completed=record["completed"]
+            )
+
+    async def _run(
+        self,
+        agent_ids: List[str],
+        context: PipelineContext,
+        speculative: bool,
+        run_id: Optional[str],
+        completed: List[str],
+    ) -> PipelineContext:
+        agents = [self.resolve_agent(agent_id) for agent_id in agent_ids]
+
+        cache_key = self.cache.key(agent_ids, agents, context) if self.cache and not completed else None
+        if cache_key:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"[Pipeline] cache hit for {agent_ids}")
+                cached["deadline"], cached["priority"] = context.deadline, context.priority
+                context = PipelineContext(**cached)
+                context.trace.append({"agent": "pipeline", "status": "cache_hit"})
+                events.publish("cache_hit", agents=agent_ids)
+                return context
+
+        record = {"run_id": run_id, "agents": agent_ids, "speculative": speculative, "completed": list(completed)}
+        if run_id:
+            context.meta["run_id"] = run_id
+        await self._checkpoint(run_id, record, context, status=checkpoints.RUNNING, error=None)
+
+        pending = [(agent_id, agent) for agent_id, agent in zip(agent_ids, agents) if agent_id not in completed]
+        pending_ids, pending_agents = [p[0] for p in pending], [p[1] for p in pending]
+        if speculative:
+            pending_ids, pending_agents = self.fuse_speculative(pending_ids, pending_agents)
+
+        stages = plan_stages(pending_agents)
+        logger.info(f"[Pipeline] stages: {[[pending_ids[i] for i in stage] for stage in stages]}")
+
+        for n, stage in enumerate(stages):
+            context, succeeded, timed_out, failed = await self.run_stage(pending_ids, pending_agents, stage, context)
+            # Fused speculative agents ("retriever+main") count as both of their parts
+            record["completed"] += [part for agent_id in succeeded for part in agent_id.split("+")]
+
+            if failed:
+                for agent_id, error in failed:
+                    context.trace.append({"agent": agent_id, "status": "failed", "error": str(error)})
+                await self._checkpoint(run_id, record, context, status=checkpoints.FAILED, error=str(failed[0][1]))
+                raise failed[0][1]
+
+            if timed_out:
+                # Out of budget: return what finished, record what didn't
+                skipped = [pending_ids[i] for later in stages[n + 1:] for i in later]
+                logger.warning(f"[Pipeline] deadline exceeded; cancelled {timed_out}, skipped {skipped}")
+                context.trace.append({
+                    "agent": "pipeline",
+                    "status": "timeout",
+                    "cancelled": timed_out,
+                    "skipped": skipped,
+                })
+                events.publish("timeout", cancelled=timed_out, skipped=skipped)
+                await self._checkpoint(run_id, record, context, status=checkpoints.FAILED, error="deadline exceeded")
+                return context
+
+            await self._checkpoint(run_id, record, context)
+
+        await self._checkpoint(run_id, record, context, status=checkpoints.DONE)
+        if cache_key:
+            result = asdict(context)
+            result["meta"].pop("run_id", None)
+            result["meta"].pop("llm_usage", None)  # a cache hit makes no LLM calls
+            await self.cache.set(cache_key, result)
+        return context
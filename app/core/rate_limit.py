@@ -0,0 +1,226 @@
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Mapping, Optional
+
+from app.core.config import (
+    GROQ_MAX_CONCURRENCY,
+    GROQ_MAX_RETRIES,
+    GROQ_REQUESTS_PER_MINUTE,
+    GROQ_TOKENS_PER_MINUTE,
+)
+from app.core import deadline
+from app.core.logging_utils import get_logger
+from app.core.scheduler import PriorityResource
+
+logger = get_logger()
+
+
+class TokenBucket:
+    """Continuous-refill bucket sized to one minute of budget."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self, seconds: float):
+        """Provider said we're out: pretend the bucket is empty for ``seconds``."""
+        self.tokens = min(self.tokens, -seconds * self.rate)
+        self.updated = time.monotonic()
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse Groq/OpenAI reset headers: '2.5', '1m30s', '250ms', '6s'."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total, number = 0.0, ""
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+        elif value.startswith("ms", i):
+            total += float(number or 0) / 1000
+            number = ""
+            i += 1
+        elif ch in "hms":
+            total += float(number or 0) * {"h": 3600, "m": 60, "s": 1}[ch]
+            number = ""
+        i += 1
+    return total or None
+
+
+def retry_delay(error: Exception, attempt: int, base: float = 0.5, cap: float = 30.0) -> Optional[float]:
+    """
+    Seconds to wait before retrying ``error``, or None if it isn't retryable.
+    Honours retry-after / x-ratelimit-reset-* headers, else full-jitter exponential backoff.
+    """
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    retryable = status in (408, 409, 429, 500, 502, 503, 504) or type(error).__name__ in (
+        "APIConnectionError",
+        "APITimeoutError",
+        "RateLimitError",
+    )
+    if not retryable:
+        return None
+
+    headers: Mapping[str, str] = getattr(response, "headers", None) or {}
+    hinted = [
+        _parse_duration(headers.get(name))
+        for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    hinted = [h for h in hinted if h]
+    if hinted:
+        return min(max(hinted), cap) + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class ModelLimiter:
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        # One waiter at a time; interactive callers go first, aging keeps batch moving
+        self.lock = PriorityResource(f"admission:{name}", 1)
+
+
+class RateGovernor:
+    """
+    Process-wide gate for Groq calls: per-model request/token buckets, a global
+    concurrency cap, and retries with jittered exponential backoff that follow
+    the provider's rate-limit headers. Both the budget queue and the
+    concurrency slots are served by priority class (app/core/scheduler.py).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = GROQ_TOKENS_PER_MINUTE,
+        max_concurrency: int = GROQ_MAX_CONCURRENCY,
+        max_retries: int = GROQ_MAX_RETRIES,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self._slots = PriorityResource("llm", max_concurrency)
+        self._models: Dict[str, ModelLimiter] = {}
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "wait_seconds": 0.0}
+
+    def slot_stats(self) -> Dict[str, Any]:
+        return self._slots.stats()
+
+    def _limiter(self, model: str) -> ModelLimiter:
+        if model not in self._models:
+            self._models[model] = ModelLimiter(model, self.requests_per_minute, self.tokens_per_minute)
+        return self._models[model]
+
+    async def _admit(self, model: str, estimated_tokens: int):
+        limiter = self._limiter(model)
+        started = time.monotonic()
+        # One waiter at a time per model: the caller sleeping for budget is the
+        # highest-priority one, and nobody jumps it while it sleeps.
+        async with limiter.lock.slot():
+            while True:
+                delay = max(limiter.requests.delay_for(1), limiter.tokens.delay_for(estimated_tokens))
+                if delay <= 0:
+                    break
+                left = deadline.remaining()
+                if left is not None and delay >= left:
+                    raise deadline.DeadlineExceeded(f"{model}: rate-limit wait {delay:.1f}s exceeds request budget")
+                await asyncio.sleep(delay)
+            limiter.requests.take(1)
+            limiter.tokens.take(estimated_tokens)
+        self.stats["wait_seconds"] += time.monotonic() - started
+
+    def _penalize(self, model: str, error: Exception, delay: float):
+        if getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError":
+            self.stats["rate_limited"] += 1
+            limiter = self._limiter(model)
+            limiter.requests.drain(delay)
+
+    async def _backoff(self, model: str, error: Exception, attempt: int, delay: float):
+        left = deadline.remaining()
+        if left is not None and delay >= left:
+            raise deadline.DeadlineExceeded(f"{model}: no budget left to retry after {error!r}") from error
+        self.stats["retries"] += 1
+        logger.warning(f"[RateGovernor] {model}: {error!r}; retry {attempt}/{self.max_retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+    async def call(self, model: str, estimated_tokens: int, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` (a fresh coroutine per attempt) under the model's limits."""
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            await self._admit(model, estimated_tokens)
+            async with self._slots.slot():
+                try:
+                    return await fn()
+                except Exception as e:
+                    delay = retry_delay(e, attempt)
+                    if delay is None or attempt >= self.max_retries:
+                        raise
+                    self._penalize(model, e, delay)
+                    error = e
+            attempt += 1
+            await self._backoff(model, error, attempt, delay)
+
+    async def stream(
+        self, model: str, estimated_tokens: int, open_stream: Callable[[], Awaitable[AsyncIterator[Any]]]
+    ) -> AsyncIterator[Any]:
+        """
+        Like ``call`` for streaming responses. Retries only happen before the
+        first chunk; the concurrency slot is held until the stream is drained.
+        """
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            await self._admit(model, estimated_tokens)
+            async with self._slots.slot():
+                try:
+                    stream = await open_stream()
+                except Exception as e:
+                    delay = retry_delay(e, attempt)
+                    if delay is None or attempt >= self.max_retries:
+                        raise
+                    self._penalize(model, e, delay)
+                    error = e
+                else:
+                    async for chunk in stream:
+                        yield chunk
+                    return
+            attempt += 1
+            await self._backoff(model, error, attempt, delay)
+
+
+_governor: Optional[RateGovernor] = None
+
+
+def get_governor() -> RateGovernor:
+    global _governor
+    if _governor is None:
+        _governor = RateGovernor()
+    return _governor
@@ -48,3 +48,18 @@ def delete_context(session_id: str):
     """Delete session"""
     key = f"{SESSION_PREFIX}{session_id}"
     redis_client.delete(key)
+
+def save_session_memory(session_id: str, memory: dict, ttl: int = 3600):
+    """Save a session's conversation memory (recent turns + rolling summary) with TTL"""
+    key = f"{SESSION_PREFIX}{session_id}:memory"
+    redis_client.setex(key, ttl, json.dumps(memory))
+
+def load_session_memory(session_id: str) -> dict | None:
+    """Load a session's conversation memory"""
+    key = f"{SESSION_PREFIX}{session_id}:memory"
+    data = redis_client.get(key)
+    return json.loads(data) if data else None
+
+def delete_session_memory(session_id: str):
+    """Forget a session's conversation memory"""
+    redis_client.delete(f"{SESSION_PREFIX}{session_id}:memory")
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+from app.core.executors import run_blocking
+from app.core.logging_utils import get_logger
+from app.core.pipeline import CONTEXT_FIELDS, agent_reads
+from app.core.types import PipelineContext
+
+logger = get_logger()
+
+CACHE_PREFIX = "pipeline_cache:"
+GENERATION_KEY = f"{CACHE_PREFIX}generation"
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry TTL. Values are stored as JSON so callers can't mutate them."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(payload)
+
+    def set(self, key: str, value: dict):
+        payload = json.dumps(value, default=str)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """
+    Shared cache on the app/core/redis_store.py client. Invalidation bumps a
+    generation counter; each entry records the generation it was written
+    under, so a lookup is a single MGET of the counter and the entry.
+    Blocking: called through the io pool.
+    """
+
+    def __init__(self, ttl: int):
+        from app.core.redis_store import redis_client  # optional: only needed for the shared backend
+
+        self.client = redis_client
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            generation, data = self.client.mget(GENERATION_KEY, f"{CACHE_PREFIX}{key}")
+        except Exception as e:
+            logger.warning(f"[ResultCache] Redis get failed: {e}")
+            return None
+        if not data:
+            return None
+        entry = json.loads(data)
+        if entry.get("generation") != (generation or "0"):
+            return None  # written before the last invalidation
+        return entry["value"]
+
+    def set(self, key: str, value: dict):
+        try:
+            generation = self.client.get(GENERATION_KEY) or "0"
+            entry = {"generation": generation, "value": value}
+            self.client.setex(f"{CACHE_PREFIX}{key}", self.ttl, json.dumps(entry, default=str))
+        except Exception as e:
+            logger.warning(f"[ResultCache] Redis set failed: {e}")
+
+    def clear(self):
+        try:
+            self.client.incr(GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"[ResultCache] Redis invalidation failed: {e}")
+
+
+class PipelineResultCache:
+    """
+    Caches final pipeline contexts keyed on the agent list plus the context
+    fields those agents read. Pipelines containing a non-cacheable agent
+    (side effects such as email/SMS) are never cached.
+
+    The "memory" backend is per process: invalidate() only clears the LRU of
+    the worker whose index changed. Multi-worker deployments use "redis", which
+    has no in-process layer, since only the shared generation counter knows
+    whether another worker has invalidated.
+    """
+
+    def __init__(self, backend: str = "memory", ttl: int = 300, max_entries: int = 512):
+        self.shared = RedisBackend(ttl) if backend == "redis" else None
+        self.memory = MemoryBackend(max_entries, ttl) if self.shared is None else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(agent_ids: Sequence[str], agents: Sequence[Any], context: PipelineContext) -> Optional[str]:
+        if not all(getattr(agent, "cacheable", True) for agent in agents):
+            return None
+        if context.session_id:
+            # Conversation history isn't part of the key, and a session run records a new turn
+            return None
+        inputs = set()
+        for agent in agents:
+            inputs |= agent_reads(agent) & CONTEXT_FIELDS
+        inputs -= {"trace", "deadline", "priority"}
+        payload = {
+            "agents": list(agent_ids),
+            "inputs": {name: getattr(context, name) for name in sorted(inputs)},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.shared is not None:
+            value = await run_blocking("io", self.shared.get, key)
+        else:
+            value = self.memory.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        if self.shared is not None:
+            await run_blocking("io", self.shared.set, key, value)
+        else:
+            self.memory.set(key, value)
+
+    def invalidate(self):
+        # Index listener: CreateKBAgent swaps the index on the io pool, so the INCR doesn't block the loop
+        if self.shared is not None:
+            self.shared.clear()
+        else:
+            self.memory.clear()
+        logger.info("[ResultCache] Invalidated.")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
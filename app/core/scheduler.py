@@ -0,0 +1,158 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from app.core.config import EMBEDDING_POOL_SIZE, PARSING_POOL_SIZE, SCHEDULER_AGING_SECONDS
+
+# Lower rank is served first. Callers pick a class per endpoint:
+#   interactive - synchronous API requests a user is waiting on
+#   batch       - queued jobs (knowledge-base ingestion)
+#   background  - housekeeping nobody is waiting on
+PRIORITIES = {"interactive": 0, "batch": 1, "background": 2}
+INTERACTIVE, BATCH, BACKGROUND = "interactive", "batch", "background"
+
+_priority: ContextVar[str] = ContextVar("priority_class", default=INTERACTIVE)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def priority_scope(priority: Optional[str]) -> Iterator[None]:
+    """Run the block under ``priority``; None keeps the caller's class."""
+    if priority is None:
+        yield
+        return
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority class: {priority}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "enqueued", "future")
+
+    def __init__(self, priority: str, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class PriorityResource:
+    """
+    Counting semaphore that hands free slots to the highest-priority waiter.
+
+    Starvation protection: a waiter's rank improves by one class for every
+    ``aging_seconds`` it has waited, so bulk work always gets through eventually.
+    Slots are only reassigned when released, so long jobs yield at the
+    boundaries where they release (e.g. between embedding batches).
+    """
+
+    def __init__(self, name: str, slots: int, aging_seconds: float = SCHEDULER_AGING_SECONDS):
+        self.name = name
+        self.slots = slots
+        self.aging_seconds = aging_seconds
+        self.in_use = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._stats = {p: {"acquired": 0, "wait_seconds": 0.0} for p in PRIORITIES}
+
+    def _rank(self, waiter: _Waiter, now: float) -> tuple:
+        aged = (now - waiter.enqueued) / self.aging_seconds if self.aging_seconds > 0 else 0.0
+        return PRIORITIES[waiter.priority] - aged, waiter.seq
+
+    def _wake(self):
+        while self.in_use < self.slots and self._waiters:
+            now = time.monotonic()
+            waiter = min(self._waiters, key=lambda w: self._rank(w, now))
+            self._waiters.remove(waiter)
+            if waiter.future.done():
+                continue
+            self.in_use += 1
+            self._account(waiter.priority, now - waiter.enqueued)
+            waiter.future.set_result(None)
+
+    def _account(self, priority: str, waited: float):
+        self._stats[priority]["acquired"] += 1
+        self._stats[priority]["wait_seconds"] += waited
+
+    async def acquire(self, priority: Optional[str] = None):
+        priority = priority or current_priority()
+        if self.in_use < self.slots and not self._waiters:
+            self.in_use += 1
+            self._account(priority, 0.0)
+            return
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()  # slot was granted just as we were cancelled: pass it on
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        self.in_use -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        waiting = {p: 0 for p in PRIORITIES}
+        for waiter in self._waiters:
+            waiting[waiter.priority] += 1
+        return {
+            "slots": self.slots,
+            "in_use": self.in_use,
+            "waiting": waiting,
+            "by_class": {
+                p: {
+                    "acquired": s["acquired"],
+                    "avg_wait_ms": round(1000 * s["wait_seconds"] / s["acquired"], 2) if s["acquired"] else 0.0,
+                }
+                for p, s in self._stats.items()
+            },
+        }
+
+
+class Scheduler:
+    """
+    Priority-ordered access to the CPU-bound executor pools. LLM calls are
+    ordered the same way by the rate governor's own PriorityResources.
+    """
+
+    def __init__(self, sizes: Dict[str, int]):
+        self.resources = {name: PriorityResource(name, size) for name, size in sizes.items()}
+
+    def resource(self, name: str) -> Optional[PriorityResource]:
+        return self.resources.get(name)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: resource.stats() for name, resource in self.resources.items()}
+
+
+_scheduler: Optional[Scheduler] = None
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    if _scheduler is None:
+        # Slot counts match the executor pools so the pools themselves never queue FIFO
+        _scheduler = Scheduler({"embedding": EMBEDDING_POOL_SIZE, "parsing": PARSING_POOL_SIZE})
+    return _scheduler
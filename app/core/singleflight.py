@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core import deadline, metrics
+from app.core.scheduler import current_priority
+
+
+def flight_key(**params: Any) -> str:
+    """Stable key for a call: model, messages and every generation parameter."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class Subscription:
+    """One caller's view of a shared stream. ``leader`` is True for the caller that opened it."""
+
+    def __init__(self, group: "SingleFlight", key: str, flight: _Flight, leader: bool):
+        self.group = group
+        self.key = key
+        self.flight = flight
+        self.leader = leader
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        flight = self.flight
+        index = 0
+        try:
+            while True:
+                async with flight.changed:
+                    # The upstream runs without a deadline; each subscriber bounds its own wait
+                    await deadline.wait(flight.changed.wait_for(lambda: index < len(flight.chunks) or flight.done))
+                # Late subscribers replay what was already produced
+                while index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                if flight.done and index >= len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            self.group._leave(self.key, flight)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller for a key runs the
+    upstream call, everyone arriving while it is in flight shares the result
+    (or, for streams, every chunk). The upstream call is cancelled only when
+    all callers have gone away.
+
+    The upstream call runs without the leader's deadline, since a follower may
+    have more time left; every caller waits only within its own budget. Calls
+    are only coalesced within a priority class, so an interactive caller never
+    queues behind a batch leader's slot.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, Tuple[asyncio.Task, List[int]]] = {}
+        self._streams: Dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns (result, leader); only the leader should account for the upstream usage."""
+        key = f"{current_priority()}:{key}"
+        leader = key not in self._calls
+        if leader:
+            task = asyncio.create_task(self._detached(fn))
+            self._calls[key] = (task, [0])
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            metrics.LLM_COALESCED.inc(group=self.name, kind="call")
+        task, waiters = self._calls[key]
+        waiters[0] += 1
+        try:
+            return await deadline.wait(asyncio.shield(task)), leader
+        except (asyncio.CancelledError, deadline.DeadlineExceeded):
+            if not task.done() and waiters[0] == 1:
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def stream(self, key: str, open_stream: Callable[[], AsyncIterator[Any]]) -> Subscription:
+        """Subscribe to the shared stream for ``key``, opening it if nobody has yet."""
+        key = f"{current_priority()}:{key}"
+        flight = self._streams.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            self._streams[key] = flight
+            flight.task = asyncio.create_task(self._pump(key, flight, open_stream))
+        else:
+            metrics.LLM_COALESCED.inc(group=self.name, kind="stream")
+        flight.subscribers += 1
+        return Subscription(self, key, flight, leader)
+
+    @staticmethod
+    async def _detached(fn: Callable[[], Awaitable[Any]]) -> Any:
+        with deadline.detached():
+            return await fn()
+
+    async def _pump(self, key: str, flight: _Flight, open_stream: Callable[[], AsyncIterator[Any]]):
+        try:
+            with deadline.detached():
+                async for chunk in open_stream():
+                    async with flight.changed:
+                        flight.chunks.append(chunk)
+                        flight.changed.notify_all()
+        except BaseException as e:  # includes cancellation once every subscriber has left
+            flight.error = e
+        finally:
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def _leave(self, key: str, flight: _Flight):
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.done and flight.task is not None:
+            # Nobody is listening any more: stop the upstream call
+            flight.task.cancel()
+            if self._streams.get(key) is flight:
+                del self._streams[key]
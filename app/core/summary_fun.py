@@ -1,7 +1,11 @@
+import asyncio
 import logging
 import re
+from typing import List
 from dotenv import load_dotenv
-from app.core.llm_provider import get_llm_provider
+from app.core import events, tokens
+from app.core.config import LLM_PROVIDER, SUMMARY_CONCURRENCY, SUMMARY_SECTION_TOKENS, SUMMARY_SINGLE_CALL_TOKENS
+from app.core.llm_provider import LLMProvider, get_llm_provider
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -10,24 +14,112 @@ log = logging.getLogger(__name__)
 # Load environment variables from .env
 load_dotenv()
 
+MAP_PROMPT = (
+    "You are summarizing one section of a larger document. "
+    "Extract and present every fact, figure, name and data point in this section.\n\n"
+)
+REDUCE_PROMPT = (
+    "The following are summaries of consecutive sections of one document. "
+    "Merge them into a single structured summary without dropping any facts or data points.\n\n"
+)
+
 
 def truncate_to_token_limit(text: str, max_tokens: int = 30000, buffer: int = 500) -> str:
     """
-    Truncate the input text to fit within token limit.
-    Approximate 1 token ≈ 4 characters.
+    Truncate the input text to fit within token limit, on a token boundary.
     The buffer reserves tokens for prompt/query content.
     """
-    max_chars = (max_tokens - buffer) * 4
-    return text[:max_chars]
+    return tokens.truncate(text, max_tokens - buffer)
+
+
+def split_into_sections(text: str, max_tokens: int = SUMMARY_SECTION_TOKENS) -> List[str]:
+    """
+    Split text into sections of at most ``max_tokens`` tokens, breaking on line
+    boundaries so sheet rows and paragraphs stay whole where possible.
+    """
+    lines = text.splitlines()
+    sections, current, size = [], [], 0
+    for line, count in zip(lines, tokens.count_tokens_batch(lines)):
+        if count > max_tokens:  # a single huge line: split it on its own
+            if current:
+                sections.append("\n".join(current))
+                current, size = [], 0
+            sections.extend(tokens.split_by_tokens(line.split(), max_tokens))
+            continue
+        if size + count + 1 > max_tokens and current:
+            sections.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += count + 1  # +1 for the newline
+    if current and any(part.strip() for part in current):
+        sections.append("\n".join(current))
+    return sections
+
+
+async def _summarize(provider: LLMProvider, prompt: str, text: str) -> str:
+    response = await provider.generate_response(f"{prompt}\n\nInput Text:\n{text}\n\nSummary:")
+    return re.sub(r"\s+", " ", response).strip()
+
+
+async def map_reduce_summarize(
+    input_text: str,
+    summarization_prompt: str,
+    provider: LLMProvider,
+    section_tokens: int = SUMMARY_SECTION_TOKENS,
+    concurrency: int = SUMMARY_CONCURRENCY,
+) -> str:
+    """
+    Summarize every section concurrently (at most ``concurrency`` LLM calls in
+    flight), then merge the partial summaries level by level until one call
+    can see them all. Progress is published as `progress` events.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def summarize_all(texts: List[str], prompt: str, stage: str, level: int) -> List[str]:
+        done = 0
+
+        async def one(text: str) -> str:
+            nonlocal done
+            async with limit:
+                summary = await _summarize(provider, prompt, text)
+            done += 1
+            events.publish("progress", stage=stage, level=level, sections_done=done, sections_total=len(texts))
+            return summary
+
+        return await asyncio.gather(*(one(text) for text in texts))
+
+    sections = split_into_sections(input_text, section_tokens)
+    log.info(f"Map-reduce summarization over {len(sections)} sections")
+    if len(sections) == 1:
+        # Nothing to merge: one call with the caller's prompt is the whole job
+        return (await summarize_all(sections, summarization_prompt, "summarize_map", 0))[0]
+    summaries = await summarize_all(sections, MAP_PROMPT, "summarize_map", 0)
+
+    level = 1
+    while True:
+        groups = split_into_sections("\n".join(summaries), section_tokens)
+        if len(groups) >= len(summaries):
+            # Summaries too long to pack several per section: merge pairwise so every level shrinks
+            groups = ["\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+        if len(groups) == 1:
+            break  # the last merge is the final pass below
+        summaries = await summarize_all(groups, REDUCE_PROMPT, "summarize_reduce", level)
+        level += 1
+
+    # Final pass merges the last group of partial summaries under the caller's prompt
+    final = await _summarize(provider, f"{summarization_prompt}{REDUCE_PROMPT}", "\n".join(summaries))
+    events.publish("progress", stage="summarize_reduce", level=level, sections_done=1, sections_total=1)
+    return final
 
 
 async def summarize_extracted_text(
     input_text: str,
     custom_prompt: str = None,
-    llm_provider: str = "groq",
+    llm_provider: str = LLM_PROVIDER,
 ) -> str:
     """
     Generate a structured, detailed summary of extracted text using an LLM.
+    Text too large for one call is summarized map-reduce instead of truncated.
     """
 
     summarization_prompt = custom_prompt or (
@@ -39,13 +131,8 @@ async def summarize_extracted_text(
     provider = get_llm_provider(llm_provider)
     log.info(f"Using {llm_provider} provider for text summarization")
 
-    # Truncate input to fit within token limits
-    truncated_input = truncate_to_token_limit(input_text)
-
-    full_input = f"{summarization_prompt}\n\nInput Text:\n{truncated_input}\n\nSummary:"
+    if tokens.count_tokens(input_text) > SUMMARY_SINGLE_CALL_TOKENS:
+        return await map_reduce_summarize(input_text, summarization_prompt, provider)
 
     # Generate summary using the provider
-    response = await provider.generate_response(full_input)
-
-    # Clean whitespace
-    return re.sub(r"\s+", " ", response).strip()
+    return await _summarize(provider, summarization_prompt, input_text)
@@ -0,0 +1,128 @@
+import functools
+import math
+from typing import Any, Dict, Iterable, List, Sequence
+
+import tiktoken
+
+# One tokenizer for every budget decision. cl100k_base is not the exact Llama
+# vocabulary, but it is within a few percent and far better than chars/4.
+ENCODING_NAME = "cl100k_base"
+
+# Context windows (prompt + completion) per model; unknown models get the default
+MODEL_CONTEXT_LIMITS: Dict[str, int] = {
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant": 131072,
+    "openai/gpt-oss-20b": 131072,
+    "openai/gpt-oss-120b": 131072,
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_LIMIT = 8192
+
+# Chat formatting adds a few tokens per message (role, separators)
+MESSAGE_OVERHEAD = 4
+# English prose averages ~1.3 tokens per word; used to size completions
+TOKENS_PER_WORD = 1.35
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding() -> tiktoken.Encoding:
+    return tiktoken.get_encoding(ENCODING_NAME)
+
+
+def encode(text: str) -> List[int]:
+    # User text may contain "<|endoftext|>" etc.; count it as plain text
+    return get_encoding().encode(text, disallowed_special=())
+
+
+def count_tokens(text: str) -> int:
+    return len(encode(text)) if text else 0
+
+
+def count_tokens_batch(texts: Sequence[str]) -> List[int]:
+    """Token counts for many strings at once (tiktoken encodes the batch in native threads)."""
+    if not texts:
+        return []
+    return [len(ids) for ids in get_encoding().encode_batch(list(texts), disallowed_special=())]
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to at most ``max_tokens`` tokens, on a token boundary."""
+    ids = encode(text)
+    if len(ids) <= max_tokens:
+        return text
+    return get_encoding().decode(ids[:max(max_tokens, 0)])
+
+
+def _content(message: Any) -> str:
+    if isinstance(message, dict):
+        return str(message.get("content") or "")
+    return str(getattr(message, "content", message))
+
+
+def count_message_tokens(messages: Any) -> int:
+    """Prompt size of a string, a list of strings, or chat messages (dicts / LangChain messages)."""
+    if isinstance(messages, str):
+        return count_tokens(messages)
+    contents = [_content(m) for m in messages]
+    return sum(count_tokens_batch(contents)) + MESSAGE_OVERHEAD * len(contents)
+
+
+def estimate_request_tokens(messages: Any, max_tokens: int = 0) -> int:
+    """Prompt tokens plus the completion budget: what a call can charge against the TPM limit."""
+    return count_message_tokens(messages) + max_tokens
+
+
+def context_limit(model: str) -> int:
+    return MODEL_CONTEXT_LIMITS.get(model, DEFAULT_CONTEXT_LIMIT)
+
+
+def completion_tokens_for(words: int, slack: float = 1.25, minimum: int = 16) -> int:
+    """``max_completion_tokens`` for an answer of about ``words`` words, with some headroom."""
+    return max(minimum, math.ceil(words * TOKENS_PER_WORD * slack))
+
+
+def clamp_completion(model: str, prompt_tokens: int, max_tokens: int) -> int:
+    """Never ask for more completion tokens than the model's window has left after the prompt."""
+    return max(1, min(max_tokens, context_limit(model) - prompt_tokens))
+
+
+def fit_prompt(text: str, model: str, reserve_tokens: int = 0) -> str:
+    """Truncate a single-string prompt so it plus ``reserve_tokens`` of output fits the window."""
+    return truncate(text, context_limit(model) - reserve_tokens - MESSAGE_OVERHEAD)
+
+
+def fit_messages(messages: List[Dict[str, str]], model: str, reserve_tokens: int = 0) -> List[Dict[str, str]]:
+    """
+    Return ``messages`` unchanged if they fit the window with ``reserve_tokens``
+    of output, otherwise a copy with the longest message truncated to fit.
+    """
+    counts = count_tokens_batch([_content(m) for m in messages])
+    overflow = sum(counts) + MESSAGE_OVERHEAD * len(messages) + reserve_tokens - context_limit(model)
+    if overflow <= 0:
+        return messages
+    longest = max(range(len(messages)), key=counts.__getitem__)
+    fitted = [dict(m) for m in messages]
+    fitted[longest]["content"] = truncate(_content(messages[longest]), counts[longest] - overflow)
+    return fitted
+
+
+def split_by_tokens(words: Iterable[str], max_tokens: int, overlap: int = 0) -> List[str]:
+    """
+    Greedy chunks of whitespace-separated ``words`` with at most ``max_tokens``
+    tokens each (counted per word, in one batch) and ``overlap`` words repeated.
+    """
+    words = list(words)
+    counts = count_tokens_batch([f" {w}" for w in words])
+    chunks, start, total, end = [], 0, 0, 0
+    for i, count in enumerate(counts):
+        total += count
+        if total >= max_tokens:
+            chunks.append(" ".join(words[start:i + 1]))
+            end = i + 1
+            start = max(start + 1, end - overlap)
+            total = sum(counts[start:end])
+    if end < len(words):
+        chunks.append(" ".join(words[start:]))
+    return chunks
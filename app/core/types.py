@@ -27,5 +27,8 @@ class PipelineContext:
     email_status: Optional[str] = None
     sms_status: Optional[str] = None
     url: Optional[str] = None
+    deadline: Optional[float] = None  # epoch seconds; the engine cancels work past it
+    priority: Optional[str] = None    # scheduler class: interactive / batch / background
+    session_id: Optional[str] = None  # multi-turn conversation key (app/services/conversation_memory.py)
     trace: List[dict] = field(default_factory=list)
     meta: Dict[str, object] = field(default_factory=dict)
@@ -0,0 +1,287 @@
+"""
+Local stand-in for the Groq / OpenAI chat completions API, for load tests and
+benchmarks without network or quota:
+
+    uvicorn app.devtools.llm_server:app --port 8001
+    LLM_BASE_URL=http://127.0.0.1:8001 uvicorn app.main:app
+
+Latency and failures are drawn per request from configurable distributions
+(FAKE_LLM_* environment variables, or POST /admin/config at runtime):
+time-to-first-token is log-normal, decode speed is normal, and a fraction of
+requests can fail with 5xx or be rejected with 429 + rate-limit headers.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass, fields
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "the pipeline retrieves relevant context from the knowledge base and the model answers "
+    "with a short grounded summary of the requested documents for the user"
+).split()
+JSON_FIELD = re.compile(r'"(\w+)":\s*string')
+
+
+# -------------------------------------------------------------------
+# Knobs
+# -------------------------------------------------------------------
+@dataclass
+class ServerConfig:
+    ttft_ms: float = 300.0  # median time to first token
+    ttft_sigma: float = 0.5  # log-normal shape; 0 = fixed TTFT
+    tokens_per_sec: float = 150.0  # mean decode speed
+    tokens_per_sec_jitter: float = 0.2  # relative std-dev of decode speed
+    output_tokens: int = 200  # completion length when max_tokens allows
+    error_rate: float = 0.0  # fraction answered with error_status
+    error_status: int = 503
+    rate_limit_rate: float = 0.0  # fraction answered with 429
+    retry_after: float = 1.0  # seconds advertised on 429s
+    max_concurrency: int = 0  # requests beyond this get 429 (0 = unlimited)
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        config = cls()
+        for field in fields(cls):
+            value = os.getenv(f"FAKE_LLM_{field.name.upper()}")
+            if value is not None:
+                setattr(config, field.name, _coerce(field.name, value))
+        return config
+
+    def update(self, values: Dict[str, Any]):
+        names = {field.name for field in fields(self)}
+        for name, value in values.items():
+            if name not in names:
+                raise ValueError(f"Unknown setting '{name}'")
+            setattr(self, name, _coerce(name, value))
+
+
+def _coerce(name: str, value: Any) -> Any:
+    if value is None or value == "":
+        return None if name == "seed" else getattr(ServerConfig, name)
+    if name in ("output_tokens", "error_status", "max_concurrency", "seed"):
+        return int(value)
+    return float(value)
+
+
+config = ServerConfig.from_env()
+rng = random.Random(config.seed)
+stats = {"requests": 0, "in_flight": 0, "peak_in_flight": 0, "completed": 0, "errors": 0, "rate_limited": 0}
+
+
+def _sample_ttft() -> float:
+    median = config.ttft_ms / 1000
+    if config.ttft_sigma <= 0:
+        return median
+    return median * math.exp(rng.gauss(0, config.ttft_sigma))
+
+
+def _sample_token_interval() -> float:
+    speed = rng.gauss(config.tokens_per_sec, config.tokens_per_sec * config.tokens_per_sec_jitter)
+    return 1.0 / max(speed, 1.0)
+
+
+# -------------------------------------------------------------------
+# Responses
+# -------------------------------------------------------------------
+def _prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    # ~4 characters per token; the stand-in doesn't need an exact tokenizer
+    return sum(4 + len(str(message.get("content") or "")) // 4 for message in messages)
+
+
+def _completion_words(body: Dict[str, Any]) -> List[str]:
+    limit = body.get("max_completion_tokens") or body.get("max_tokens") or config.output_tokens
+    count = max(1, min(int(limit), config.output_tokens))
+    words = [WORDS[i % len(WORDS)] for i in range(count)]
+    if (body.get("response_format") or {}).get("type") != "json_object":
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    # JSON mode: fill the fields the instruction asks for (see LlmService.structured_completion)
+    prompt = " ".join(str(message.get("content") or "") for message in body.get("messages", []))
+    names = JSON_FIELD.findall(prompt) or ["content"]
+    per_field = max(1, count // len(names))
+    values = {name: " ".join(words[i * per_field:(i + 1) * per_field] or words[:1]) for i, name in enumerate(names)}
+    text = json.dumps(values)
+    # Split roughly at word boundaries so field parsers see realistic deltas
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def _usage(prompt_tokens: int, completion_tokens: int, started: float, first_token: float) -> Dict[str, Any]:
+    now = time.perf_counter()
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "queue_time": 0.0,
+        "prompt_time": round(first_token - started, 4),
+        "completion_time": round(now - first_token, 4),
+        "total_time": round(now - started, 4),
+    }
+
+
+def _error(status: int, message: str, kind: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": kind, "code": kind}},
+        headers=headers,
+    )
+
+
+def _rate_limited() -> JSONResponse:
+    stats["rate_limited"] += 1
+    reset = f"{config.retry_after:g}s"
+    headers = {
+        "retry-after": f"{config.retry_after:g}",
+        "x-ratelimit-reset-requests": reset,
+        "x-ratelimit-reset-tokens": reset,
+        "x-ratelimit-remaining-requests": "0",
+    }
+    return _error(429, "Rate limit reached (injected by the local LLM server).", "rate_limit_exceeded", headers)
+
+
+async def _stream(
+    body: Dict[str, Any], completion_id: str, words: List[str], prompt_tokens: int, started: float
+) -> AsyncIterator[str]:
+    model = body.get("model", "local")
+    created = int(time.time())
+
+    def frame(choices: List[Dict[str, Any]], **extra) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": choices,
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> str:
+        return frame([{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra)
+
+    try:
+        await asyncio.sleep(_sample_ttft())
+        first_token = time.perf_counter()
+        yield chunk({"role": "assistant", "content": ""})
+        interval = _sample_token_interval()
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(interval)
+            yield chunk({"content": word})
+        usage = _usage(prompt_tokens, len(words), started, first_token)
+        # Groq reports usage under x_groq on the last chunk, OpenAI (include_usage) on a trailing chunk
+        yield chunk({}, "stop", x_groq={"id": completion_id, "usage": usage})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield frame([], usage=usage)
+        yield "data: [DONE]\n\n"
+        stats["completed"] += 1
+    finally:
+        stats["in_flight"] -= 1
+
+
+async def _complete(body: Dict[str, Any], completion_id: str, words: List[str], prompt_tokens: int, started: float):
+    try:
+        await asyncio.sleep(_sample_ttft())
+        first_token = time.perf_counter()
+        await asyncio.sleep(_sample_token_interval() * max(len(words) - 1, 0))
+        stats["completed"] += 1
+    finally:
+        stats["in_flight"] -= 1
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "local"),
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": "".join(words)}, "finish_reason": "stop"}
+        ],
+        "usage": _usage(prompt_tokens, len(words), started, first_token),
+    }
+
+
+# -------------------------------------------------------------------
+# API
+# -------------------------------------------------------------------
+app = FastAPI(title="Local LLM server", version="1.0")
+
+
+@app.post("/openai/v1/chat/completions")  # Groq SDK / ChatGroq
+@app.post("/v1/chat/completions")  # OpenAI SDK
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    if not body.get("messages"):
+        return _error(400, "'messages' is required", "invalid_request_error")
+
+    if config.max_concurrency and stats["in_flight"] >= config.max_concurrency:
+        return _rate_limited()
+    roll = rng.random()
+    if roll < config.rate_limit_rate:
+        return _rate_limited()
+    if roll < config.rate_limit_rate + config.error_rate:
+        stats["errors"] += 1
+        await asyncio.sleep(_sample_ttft())
+        return _error(config.error_status, "Injected failure from the local LLM server.", "server_error")
+
+    stats["in_flight"] += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    started = time.perf_counter()
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    words = _completion_words(body)
+    prompt_tokens = _prompt_tokens(body["messages"])
+    if body.get("stream"):
+        return StreamingResponse(
+            _stream(body, completion_id, words, prompt_tokens, started), media_type="text/event-stream"
+        )
+    return await _complete(body, completion_id, words, prompt_tokens, started)
+
+
+@app.get("/openai/v1/models")
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "local", "object": "model", "owned_by": "local"}]}
+
+
+@app.get("/admin/config")
+async def get_config():
+    return asdict(config)
+
+
+@app.post("/admin/config")
+async def set_config(values: Dict[str, Any]):
+    global rng
+    try:
+        config.update(values)
+    except (TypeError, ValueError) as e:
+        return _error(400, str(e), "invalid_request_error")
+    if "seed" in values:
+        rng = random.Random(config.seed)
+    return asdict(config)
+
+
+@app.get("/admin/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/admin/stats/reset")
+async def reset_stats():
+    in_flight = stats["in_flight"]
+    stats.update({key: 0 for key in stats})
+    stats["in_flight"] = in_flight
+    return stats
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("FAKE_LLM_HOST", "127.0.0.1"), port=int(os.getenv("FAKE_LLM_PORT", "8001")))
@@ -1,14 +1,27 @@
 # with authetication----------------------------------------------------------
 
-from fastapi import FastAPI, Depends, HTTPException, status, APIRouter
+from fastapi import FastAPI, Depends, Header, HTTPException, status, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Awaitable, Callable, Literal, Optional
 from dataclasses import is_dataclass, asdict
+import asyncio
+import re
+import uuid
 import jwt, datetime
 
 from app.core.types import PipelineContext
+from app.core import deadline, events
+from app.core.config import REQUEST_TIMEOUT_SECONDS
+from app.core.executors import pool_stats
+from app.core.scheduler import get_scheduler
+from app.core.llm_cache import get_llm_cache
+from app.core.llm_usage import get_usage_registry
+from app.core.metrics import render_prometheus
+from app.core.rate_limit import get_governor
+from app.services.container import init_container, get_container, close_container
 from app.services.email import EmailService
 from app.agents.email_agent import EmailAgent
 from app.agents.retriever_agent import RetrieverAgent
@@ -20,6 +33,7 @@ from app.agents.sms_agent import SmsAgent
 from app.services.sms import SmsService
 from app.agents.google_sheet_doc_agents import GoogleSheetsAgent, GoogleDocsAgent
 from app.agents.createKBagent import CreateKBAgent
+from app.agents.router_agent import RouterAgent
 from langchain_huggingface import HuggingFaceEmbeddings
 
 
@@ -63,20 +77,29 @@ async def startup_event():
     print("[Retriever Init] Skipping FAISS index load. A new index will be created by CreateKBAgent.")
     # Ensure retriever is constructed once on first access
     _ = get_retriever_service()
+    # Shared clients + agents live for the whole process
+    await init_container(AGENT_REGISTRY).astart()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_container()
 
 
 # -------------------------------------------------------------------
 # Agent Registry
 # -------------------------------------------------------------------
+# Factories receive the service container and are called once per agent id.
 AGENT_REGISTRY = {
-    "retriever": lambda: RetrieverAgent(),
-    "main": lambda: MainAgent(LlmService()),
-    "email": lambda: EmailAgent(EmailService()),
-    "summary": lambda: SummaryAgent(LlmService()),
-    "google_sheets": lambda: GoogleSheetsAgent(),
-    "google_docs": lambda: GoogleDocsAgent(),
-    "create_kb": lambda: CreateKBAgent(),
-    # "sms": lambda: SmsAgent(SmsService(dev_mode=True)),
+    "retriever": lambda c: RetrieverAgent(cache=c.retriever_cache, memory=c.memory),
+    "main": lambda c: MainAgent(c.llm, cache=c.main_cache, memory=c.memory),
+    "email": lambda c: EmailAgent(c.email),
+    "summary": lambda c: SummaryAgent(c.llm),
+    "google_sheets": lambda c: GoogleSheetsAgent(http=c.http, embeddings=c.retriever.embeddings),
+    "google_docs": lambda c: GoogleDocsAgent(http=c.http, embeddings=c.retriever.embeddings),
+    "create_kb": lambda c: CreateKBAgent(http=c.http),
+    "router": lambda c: RouterAgent(),
+    # "sms": lambda c: SmsAgent(c.sms),
 }
 
 
@@ -85,10 +108,24 @@ AGENT_REGISTRY = {
 # -------------------------------------------------------------------
 class AgentRequest(BaseModel):
     context: Dict[str, Any]
+    # Seconds this request may take; the X-Request-Timeout header wins if both are set
+    timeout: Optional[float] = None
+    # Scheduler class; defaults to interactive for direct calls and batch for jobs
+    priority: Optional[Literal["interactive", "batch", "background"]] = None
 
 class PipelineRequest(BaseModel):
     agents: list[str]
     context: Dict[str, Any]
+    timeout: Optional[float] = None
+    priority: Optional[Literal["interactive", "batch", "background"]] = None
+    # Overlap retriever + main: start the general answer while the KB is searched
+    speculative: bool = False
+    # Checkpoint the run under a server-issued run_id (returned in meta.run_id, the error
+    # detail, or the X-Run-Id header when streaming); pass it to /pipeline/{run_id}/resume
+    checkpoint: bool = False
+
+class ResumeRequest(BaseModel):
+    timeout: Optional[float] = None
 
 class LoginRequest(BaseModel):
     username: str
@@ -107,6 +144,66 @@ def context_to_dict(context: PipelineContext) -> dict:
         return context.__dict__
 
 
+def request_context(
+    request: BaseModel, header: Optional[float], default: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Context dict for a request: the absolute deadline (header, then body
+    `timeout`, then ``default``) and the scheduler class if one was asked for.
+    """
+    seconds = header if header is not None else request.timeout
+    if seconds is None:
+        seconds = default
+    context = {**request.context, "deadline": deadline.from_timeout(seconds)}
+    if request.priority is not None:
+        context["priority"] = request.priority
+    return context
+
+
+# Server-issued run ids are "run-" + 32 hex chars and job ids 32 hex chars; anything outside
+# this shape can't name a checkpoint and must never reach a file path or Redis key
+RUN_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def new_run_id(request: PipelineRequest) -> Optional[str]:
+    """Issue a checkpoint id when the client asks for one; clients never choose it."""
+    return f"run-{uuid.uuid4().hex}" if request.checkpoint else None
+
+
+def sse_response(run: Callable[[], Awaitable[PipelineContext]], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Stream a pipeline run as Server-Sent Events:
+    `token` (LLM output as it arrives), `agent_completed`, then `context` (or `error`).
+    """
+    async def event_source():
+        stream = events.EventStream()
+
+        async def worker():
+            with events.bind_stream(stream):
+                try:
+                    context = await run()
+                    stream.publish("context", context_to_dict(context))
+                except Exception as e:
+                    stream.publish("error", {"error": str(e)})
+                finally:
+                    stream.close()
+
+        task = asyncio.create_task(worker())
+        try:
+            async for event, data in stream:
+                yield events.format_sse(event, data)
+        finally:
+            # Client disconnected early: stop the pipeline instead of finishing it for nobody
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})},
+    )
+
+
 # -------------------------------------------------------------------
 # API Router with prefix /api/v1
 # -------------------------------------------------------------------
@@ -114,7 +211,23 @@ router = APIRouter(prefix="/api/v1")
 
 @router.get("/health")
 async def health():
-    return {"status": "ok", "message": "API is running 🚀"}
+    return {
+        "status": "ok",
+        "message": "API is running 🚀",
+        "pools": pool_stats(),
+        "llm_governor": get_governor().stats,
+        "llm_cache": get_llm_cache().stats(),
+        "scheduler": {**get_scheduler().stats(), "llm": get_governor().slot_stats()},
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@router.get("/llm/usage")
+async def llm_usage_stats():
+    """Rolling-window LLM usage per model and endpoint: tokens, TTFT, tokens/sec, queue wait."""
+    return {"models": get_usage_registry().snapshot()}
 
 @router.post("/login")
 async def login(request: LoginRequest):
@@ -127,24 +240,146 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
 @router.post("/pipeline")
-async def run_pipeline(request: PipelineRequest):
-    context = PipelineContext(**request.context)
+async def run_pipeline(request: PipelineRequest, request_timeout: Optional[float] = Header(None, alias="X-Request-Timeout")):
     for agent_id in request.agents:
         if agent_id not in AGENT_REGISTRY:
             return {"error": f"Unknown agent '{agent_id}'"}
-        agent = AGENT_REGISTRY[agent_id]()
-        context = await agent.run(context)
+    container = get_container()
+    if container.runs_in_background(request.agents):
+        # Background jobs are only bounded when the caller asks for it
+        job_id = await container.jobs.submit(request.agents, request_context(request, request_timeout))
+        return {"job_id": job_id, "status": "queued"}
+    context = PipelineContext(**request_context(request, request_timeout, REQUEST_TIMEOUT_SECONDS))
+    # Only runs the client asked to checkpoint get an id; anything else couldn't be resumed anyway
+    run_id = new_run_id(request)
+    try:
+        context = await container.engine.run(request.agents, context, speculative=request.speculative, run_id=run_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"error": str(e), "run_id": run_id},
+        )
+    return context_to_dict(context)
+
+@router.post("/pipeline/{run_id}/resume")
+async def resume_pipeline(
+    run_id: str,
+    request: ResumeRequest = ResumeRequest(),
+    request_timeout: Optional[float] = Header(None, alias="X-Request-Timeout"),
+):
+    if not RUN_ID_PATTERN.fullmatch(run_id):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid run id '{run_id}'")
+    seconds = request_timeout if request_timeout is not None else request.timeout
+    try:
+        context = await get_container().engine.resume(
+            run_id, deadline.from_timeout(seconds if seconds is not None else REQUEST_TIMEOUT_SECONDS)
+        )
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No checkpoint for run '{run_id}'")
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"error": str(e), "run_id": run_id},
+        )
     return context_to_dict(context)
 
 @router.post("/agent/{agent_id}")
-async def run_agent(agent_id: str, request: AgentRequest, payload: dict = Depends(verify_jwt)):
+async def run_agent(
+    agent_id: str,
+    request: AgentRequest,
+    payload: dict = Depends(verify_jwt),
+    request_timeout: Optional[float] = Header(None, alias="X-Request-Timeout"),
+):
     if agent_id not in AGENT_REGISTRY:
         return {"error": f"Unknown agent '{agent_id}'"}
-    context = PipelineContext(**request.context)
-    agent = AGENT_REGISTRY[agent_id]()
-    context = await agent.run(context)
+    container = get_container()
+    if container.runs_in_background([agent_id]):
+        job_id = await container.jobs.submit([agent_id], request_context(request, request_timeout))
+        return {"agent": agent_id, "job_id": job_id, "status": "queued", "user": payload}
+    context = PipelineContext(**request_context(request, request_timeout, REQUEST_TIMEOUT_SECONDS))
+    try:
+        context = await container.engine.run([agent_id], context)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"error": str(e), "agent": agent_id},
+        )
     return {"agent": agent_id, "context": context_to_dict(context), "user": payload}
 
+@router.post("/pipeline/stream")
+async def stream_pipeline(request: PipelineRequest, request_timeout: Optional[float] = Header(None, alias="X-Request-Timeout")):
+    for agent_id in request.agents:
+        if agent_id not in AGENT_REGISTRY:
+            return {"error": f"Unknown agent '{agent_id}'"}
+    container = get_container()
+    if container.runs_in_background(request.agents):
+        # Long-running agents go through the job queue, not a held-open event stream
+        job_id = await container.jobs.submit(request.agents, request_context(request, request_timeout))
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"job_id": job_id, "status": "queued"})
+    context = PipelineContext(**request_context(request, request_timeout, REQUEST_TIMEOUT_SECONDS))
+    run_id = new_run_id(request)
+    return sse_response(
+        lambda: container.engine.run(request.agents, context, speculative=request.speculative, run_id=run_id),
+        headers={"X-Run-Id": run_id} if run_id else None,
+    )
+
+@router.post("/agent/{agent_id}/stream")
+async def stream_agent(
+    agent_id: str,
+    request: AgentRequest,
+    payload: dict = Depends(verify_jwt),
+    request_timeout: Optional[float] = Header(None, alias="X-Request-Timeout"),
+):
+    if agent_id not in AGENT_REGISTRY:
+        return {"error": f"Unknown agent '{agent_id}'"}
+    container = get_container()
+    if container.runs_in_background([agent_id]):
+        job_id = await container.jobs.submit([agent_id], request_context(request, request_timeout))
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"agent": agent_id, "job_id": job_id, "status": "queued", "user": payload},
+        )
+    context = PipelineContext(**request_context(request, request_timeout, REQUEST_TIMEOUT_SECONDS))
+    return sse_response(lambda: container.engine.run([agent_id], context))
+
+@router.post("/jobs")
+async def submit_job(request: PipelineRequest, request_timeout: Optional[float] = Header(None, alias="X-Request-Timeout")):
+    for agent_id in request.agents:
+        if agent_id not in AGENT_REGISTRY:
+            return {"error": f"Unknown agent '{agent_id}'"}
+    job_id = await get_container().jobs.submit(request.agents, request_context(request, request_timeout))
+    return {"job_id": job_id, "status": "queued"}
+
+@router.delete("/sessions/{session_id}")
+async def forget_session(session_id: str):
+    memory = get_container().memory
+    if memory is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session memory is disabled")
+    await memory.clear(session_id)
+    return {"session_id": session_id, "status": "forgotten"}
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await get_container().jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job '{job_id}'")
+    return {key: job[key] for key in ("id", "agents", "status", "progress", "error", "created_at", "updated_at")}
+
+@router.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    if not await get_container().jobs.retry(job_id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job '{job_id}' is not failed")
+    return {"job_id": job_id, "status": "queued"}
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = await get_container().jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job '{job_id}'")
+    if job["status"] not in ("done", "failed"):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job '{job_id}' is {job['status']}")
+    return {"id": job_id, "status": job["status"], "result": job["result"], "error": job["error"]}
+
 
 # Register router
 app.include_router(router)
@@ -165,6 +165,9 @@ from googleapiclient.errors import HttpError
 import pandas as pd
 from io import StringIO
 
+from app.core import deadline, metrics
+from app.core.config import HTTP_TIMEOUT_SECONDS
+
 # -------------------------
 # Logger Setup
 # -------------------------
@@ -180,10 +183,11 @@ logger = logging.getLogger(__name__)
 # Sheets Handler
 # -------------------------
 class GoogleSheetsHandler:
-    def __init__(self, sheet_url, json_key_file=None):
+    def __init__(self, sheet_url, json_key_file=None, session=None):
         self.sheet_url = sheet_url
         self.json_key_file = json_key_file
         self.sheet = None
+        self.http = session or requests
 
     def _connect_private(self):
         """Connect using Service Account (for private sheets)."""
@@ -205,13 +209,16 @@ class GoogleSheetsHandler:
             sheet_id = self.sheet_url.split("/d/")[1].split("/")[0]
             url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv"
 
-            response = requests.get(url)
+            response = self.http.get(url, timeout=deadline.timeout(HTTP_TIMEOUT_SECONDS))
+            metrics.record(bytes_fetched=len(response.content))
             if response.status_code == 200 and "html" not in response.text.lower():
                 df = pd.read_csv(StringIO(response.text))
                 logger.info("📊 Read PUBLIC Google Sheet successfully")
                 return df.to_dict(orient="records")
             else:
                 raise Exception("Not a public sheet, trying private...")
+        except deadline.DeadlineExceeded:
+            raise
         except Exception:
             if not self.json_key_file:
                 raise Exception("❌ Sheet is private. Please provide a JSON key file.")
@@ -224,10 +231,11 @@ class GoogleSheetsHandler:
 # Docs Handler
 # -------------------------
 class GoogleDocsHandler:
-    def __init__(self, doc_id, json_key_file=None):
+    def __init__(self, doc_id, json_key_file=None, session=None):
         self.doc_id = doc_id
         self.json_key_file = json_key_file
         self.service = None
+        self.http = session or requests
 
     def _connect_private(self):
         """Connect using Service Account (for private docs)."""
@@ -243,13 +251,16 @@ class GoogleDocsHandler:
         try:
             # Public Docs can be published as HTML
             url = f"https://docs.google.com/document/d/{self.doc_id}/export?format=txt"
-            response = requests.get(url)
+            response = self.http.get(url, timeout=deadline.timeout(HTTP_TIMEOUT_SECONDS))
+            metrics.record(bytes_fetched=len(response.content))
 
             if response.status_code == 200:
                 logger.info("📄 Read PUBLIC Google Doc successfully")
                 return response.text
             else:
                 raise Exception("Not a public doc, trying private...")
+        except deadline.DeadlineExceeded:
+            raise
         except Exception:
             if not self.json_key_file:
                 raise Exception("❌ Doc is private. Please provide a JSON key file.")
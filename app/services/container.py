@@ -0,0 +1,145 @@
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from groq import AsyncGroq
+from requests.adapters import HTTPAdapter
+
+from app.agents.speculative_agent import SpeculativeAnswerAgent
+from app.core.checkpoints import CheckpointStore
+from app.core.config import (
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_DIR,
+    CHECKPOINT_TTL,
+    HTTP_POOL_SIZE,
+    LLM_BASE_URL,
+    RESULT_CACHE_BACKEND,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_TTL,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_THRESHOLD,
+    SESSION_MEMORY_BACKEND,
+)
+from app.core.executors import shutdown_pools
+from app.core.llm_cache import get_llm_cache
+from app.core.llm_provider import close_llm_providers
+from app.core.logging_utils import get_logger
+from app.core.pipeline import PipelineEngine
+from app.core.result_cache import PipelineResultCache
+from app.services.conversation_memory import ConversationMemory
+from app.services.email import EmailService
+from app.services.jobs import JobQueue
+from app.services.llm import LlmService
+from app.services.retriever_singleton import get_retriever_service
+from app.services.semantic_cache import SemanticCache
+from app.services.sms import SmsService
+
+logger = get_logger()
+
+
+class ServiceContainer:
+    """Long-lived clients, services and agents shared by every request."""
+
+    def __init__(self, agent_factories: Dict[str, Callable[["ServiceContainer"], Any]]):
+        self.agent_factories = agent_factories
+
+        # Pooled clients (keep-alive / TLS session reuse across requests)
+        self.groq_client = AsyncGroq(base_url=LLM_BASE_URL, max_retries=0)  # retries handled by the rate governor
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+
+        # Services built on top of the clients
+        self.llm = LlmService(client=self.groq_client)
+        self.email = EmailService()
+        self.sms = SmsService(dev_mode=True)
+
+        self.retriever = get_retriever_service()
+
+        # Pipeline result cache, dropped whenever CreateKBAgent swaps the FAISS index
+        self.result_cache = None
+        if RESULT_CACHE_BACKEND != "none":
+            self.result_cache = PipelineResultCache(RESULT_CACHE_BACKEND, RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES)
+            self.retriever.add_index_listener(self.result_cache.invalidate)
+
+        # Semantic answer caches; the retriever one is tied to the current index
+        self.main_cache = self.retriever_cache = None
+        if SEMANTIC_CACHE_ENABLED:
+            self.main_cache = SemanticCache(
+                self.retriever.embeddings, "main", SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES
+            )
+            self.retriever_cache = SemanticCache(
+                self.retriever.embeddings, "retriever", SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES
+            )
+            self.retriever.add_index_listener(self.retriever_cache.clear)
+
+        # Multi-turn session history for MainAgent / RetrieverAgent; summaries use temperature 0
+        self.memory = None
+        if SESSION_MEMORY_BACKEND != "none":
+            self.memory = ConversationMemory(
+                SESSION_MEMORY_BACKEND, LlmService(client=self.groq_client, temperature=0.0)
+            )
+
+        # Per-run checkpoints so a failed pipeline resumes at the agent that failed
+        self.checkpoints = None
+        if CHECKPOINT_BACKEND != "none":
+            self.checkpoints = CheckpointStore(CHECKPOINT_BACKEND, CHECKPOINT_DIR, CHECKPOINT_TTL)
+
+        self._agents: Dict[str, Any] = {}
+        self.engine = PipelineEngine(
+            self.agent,
+            cache=self.result_cache,
+            speculative_pairs={("retriever", "main"): SpeculativeAnswerAgent},
+            checkpoints=self.checkpoints,
+        )
+        self.jobs = JobQueue(self.engine)
+
+    def agent(self, agent_id: str) -> Any:
+        """Resolve an agent by id, building it once on first use."""
+        if agent_id not in self._agents:
+            self._agents[agent_id] = self.agent_factories[agent_id](self)
+        return self._agents[agent_id]
+
+    def runs_in_background(self, agent_ids: List[str]) -> bool:
+        """True if any requested agent is long-running and should go through the job queue."""
+        return any(getattr(self.agent(agent_id), "background", False) for agent_id in agent_ids)
+
+    async def astart(self):
+        await self.jobs.start()
+
+    async def aclose(self):
+        await self.jobs.stop()
+        if self.memory is not None:
+            await self.memory.aclose()
+        await self.groq_client.close()
+        await close_llm_providers()
+        get_llm_cache().close()
+        self.email.close()
+        self.http.close()
+        shutdown_pools(wait=False)
+        logger.info("[Container] Clients closed.")
+
+
+_container: Optional[ServiceContainer] = None
+
+
+def init_container(agent_factories: Dict[str, Callable[[ServiceContainer], Any]]) -> ServiceContainer:
+    global _container
+    if _container is None:
+        _container = ServiceContainer(agent_factories)
+        logger.info("[Container] Services initialized.")
+    return _container
+
+
+def get_container() -> ServiceContainer:
+    if _container is None:
+        raise RuntimeError("Service container is not initialized. Call init_container() at startup.")
+    return _container
+
+
+async def close_container():
+    global _container
+    if _container is not None:
+        await _container.aclose()
+        _container = None
@@ -0,0 +1,258 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from app.core import tokens
+from app.core.config import (
+    SESSION_MEMORY_SUMMARY_TOKENS,
+    SESSION_MEMORY_TTL,
+    SESSION_MEMORY_TURN_TOKENS,
+    SESSION_MEMORY_TURNS,
+)
+from app.core.executors import run_blocking
+from app.core.logging_utils import get_logger
+from app.core.scheduler import BACKGROUND, priority_scope
+
+logger = get_logger()
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new exchanges below. Keep facts, names, numbers, decisions "
+    "and open questions the user may refer back to; drop pleasantries. "
+    "Reply with the updated summary only, at most {words} words."
+)
+
+
+def _empty() -> Dict[str, Any]:
+    # turns: recent exchanges kept verbatim; pending: older ones waiting to be folded into summary
+    return {"summary": "", "turns": [], "pending": []}
+
+
+class InMemorySessionBackend:
+    """Process-local sessions with TTL, least recently used dropped first."""
+
+    blocking = False
+
+    def __init__(self, ttl: int, max_sessions: int = 10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at < time.monotonic():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return {key: list(value) if isinstance(value, list) else value for key, value in state.items()}
+
+    def save(self, session_id: str, state: Dict[str, Any]):
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic() + self.ttl, state)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class RedisSessionBackend:
+    """Sessions shared across workers through app/core/redis_store.py."""
+
+    # Sync redis client: ConversationMemory calls it on the io pool
+    blocking = True
+
+    def __init__(self, ttl: int):
+        from app.core import redis_store  # optional: only needed for the shared backend
+
+        self.store = redis_store
+        self.ttl = ttl
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.store.load_session_memory(session_id)
+        except Exception as e:
+            logger.warning(f"[Memory] Redis load failed: {e}")
+            return None
+
+    def save(self, session_id: str, state: Dict[str, Any]):
+        try:
+            self.store.save_session_memory(session_id, state, self.ttl)
+        except Exception as e:
+            logger.warning(f"[Memory] Redis save failed: {e}")
+
+    def delete(self, session_id: str):
+        try:
+            self.store.delete_session_memory(session_id)
+        except Exception as e:
+            logger.warning(f"[Memory] Redis delete failed: {e}")
+
+
+class ConversationMemory:
+    """
+    Bounded multi-turn history per session.
+
+    The last ``recent_turns`` exchanges are kept verbatim (each message cut to
+    ``turn_tokens``); older ones are folded into a rolling summary of at most
+    ``summary_tokens`` by a background LLM call after the response has been
+    sent. Exchanges waiting for that fold stay in the history verbatim, so the
+    prompt cost per turn stays flat however long the conversation gets.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        llm,
+        recent_turns: int = SESSION_MEMORY_TURNS,
+        turn_tokens: int = SESSION_MEMORY_TURN_TOKENS,
+        summary_tokens: int = SESSION_MEMORY_SUMMARY_TOKENS,
+        ttl: int = SESSION_MEMORY_TTL,
+    ):
+        self.store = RedisSessionBackend(ttl) if backend == "redis" else InMemorySessionBackend(ttl)
+        self.llm = llm
+        self.recent_turns = recent_turns
+        self.turn_tokens = turn_tokens
+        self.summary_tokens = summary_tokens
+        # Serializes read-modify-write of a session's state (turn appends, fold results).
+        # [lock, users]; an entry only lives while someone holds or waits for it.
+        self._locks: Dict[str, list] = {}
+        self._folds: Set[asyncio.Task] = set()
+        self._folding: Set[str] = set()
+
+    @asynccontextmanager
+    async def _locked(self, session_id: str) -> AsyncIterator[None]:
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+    async def _store(self, method, *args):
+        if self.store.blocking:
+            return await run_blocking("io", method, *args)
+        return method(*args)
+
+    async def load(self, session_id: str) -> Dict[str, Any]:
+        return await self._store(self.store.load, session_id) or _empty()
+
+    async def save(self, session_id: str, state: Dict[str, Any]):
+        await self._store(self.store.save, session_id, state)
+
+    async def messages(self, session_id: str) -> List[Dict[str, str]]:
+        """Chat messages to put between the system prompt and the new query."""
+        state = await self.load(session_id)
+        history = []
+        if state["summary"]:
+            history.append({"role": "system", "content": f"Summary of the earlier conversation: {state['summary']}"})
+        # Not-yet-folded turns are included too, but never more than twice the window
+        for turn in (state["pending"] + state["turns"])[-2 * self.recent_turns:]:
+            history.append({"role": "user", "content": turn["user"]})
+            history.append({"role": "assistant", "content": turn["assistant"]})
+        return history
+
+    async def transcript(self, session_id: str) -> str:
+        """The same history as plain text, for prompts that aren't chat messages."""
+        lines = []
+        for message in await self.messages(session_id):
+            speaker = {"system": "Earlier", "user": "User", "assistant": "Assistant"}[message["role"]]
+            lines.append(f"{speaker}: {message['content']}")
+        return "\n".join(lines)
+
+    async def last_query(self, session_id: str) -> Optional[str]:
+        state = await self.load(session_id)
+        turns = state["pending"] + state["turns"]
+        return turns[-1]["user"] if turns else None
+
+    async def record_turn(self, session_id: str, query: str, response: str):
+        """Append an exchange; anything beyond the recent window is summarized in the background."""
+        turn = {
+            "user": tokens.truncate(query, self.turn_tokens),
+            "assistant": tokens.truncate(response, self.turn_tokens),
+        }
+        async with self._locked(session_id):
+            state = await self.load(session_id)
+            state["turns"].append(turn)
+            overflow = len(state["turns"]) - self.recent_turns
+            if overflow > 0:
+                state["pending"] += state["turns"][:overflow]
+                state["turns"] = state["turns"][overflow:]
+            await self.save(session_id, state)
+        if state["pending"]:
+            self._schedule_fold(session_id)
+
+    def _schedule_fold(self, session_id: str):
+        # Fresh context: the fold must not stream tokens to, or bill, the request that triggered it
+        task = contextvars.Context().run(asyncio.create_task, self._fold(session_id))
+        self._folds.add(task)
+        task.add_done_callback(self._folds.discard)
+
+    async def _fold(self, session_id: str):
+        if session_id in self._folding:
+            return  # the running fold picks up whatever is pending when it finishes
+        self._folding.add(session_id)
+        try:
+            with priority_scope(BACKGROUND):
+                while await self._fold_pending(session_id):
+                    pass
+        finally:
+            self._folding.discard(session_id)
+
+    async def _fold_pending(self, session_id: str) -> bool:
+        """Summarize the pending exchanges once; False when there is nothing (more) to do."""
+        state = await self.load(session_id)
+        pending = state["pending"]
+        if not pending:
+            return False
+        exchanges = "\n".join(f"User: {t['user']}\nAssistant: {t['assistant']}" for t in pending)
+        prompt = [
+            {"role": "system", "content": SUMMARY_PROMPT.format(words=int(self.summary_tokens * 0.75))},
+            {
+                "role": "user",
+                "content": f"Current summary:\n{state['summary'] or '(none)'}\n\nNew exchanges:\n{exchanges}",
+            },
+        ]
+        # No lock while the model writes: new turns can be recorded meanwhile
+        try:
+            summary = ""
+            async for chunk in self.llm.stream_completion(prompt, max_tokens=self.summary_tokens, publish_tokens=False):
+                summary += chunk
+        except Exception as e:
+            # Keep the exchanges pending; the next turn retries the fold
+            logger.warning(f"[Memory] Summary update for session {session_id} failed: {e}")
+            return False
+        async with self._locked(session_id):
+            state = await self.load(session_id)
+            state["summary"] = tokens.truncate(summary.strip(), self.summary_tokens)
+            # Turns are only ever appended to pending, so the folded ones are its head
+            state["pending"] = state["pending"][len(pending):]
+            await self.save(session_id, state)
+        logger.info(f"[Memory] Session {session_id}: folded {len(pending)} turns into the summary")
+        return True
+
+    async def clear(self, session_id: str):
+        await self._store(self.store.delete, session_id)
+
+    async def aclose(self, timeout: float = 5.0):
+        """Give in-flight summary updates a moment to land, then cancel the rest."""
+        if not self._folds:
+            return
+        _, unfinished = await asyncio.wait(set(self._folds), timeout=timeout)
+        for task in unfinished:
+            task.cancel()
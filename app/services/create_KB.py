@@ -9,7 +9,6 @@ import re
 import logging
 import PyPDF2
 import json
-import tiktoken
 
 # LangChain / FAISS
 from langchain_community.vectorstores import FAISS
@@ -18,123 +17,188 @@ from langchain.schema import Document as LCDocument
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 
-from app.core.config import FAISS_INDEX_PATH
+from app.core.config import FAISS_INDEX_PATH, EMBED_BATCH_SIZE, HTTP_TIMEOUT_SECONDS, ROUTER_CENTROIDS
+from app.core import deadline, metrics, tokens
+from app.core.executors import run_blocking
+from app.services.kb_router import compute_centroids, save_centroids
+
+
+# -------- Parsers --------
+# Module-level so they can run in a process pool (see app.core.executors).
+def parse_html(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.get_text(separator="\n", strip=True)
+
+
+def parse_pdf(content: bytes) -> str:
+    with io.BytesIO(content) as f:
+        reader = PyPDF2.PdfReader(f)
+        text = "\n".join(
+            page.extract_text() for page in reader.pages if page.extract_text()
+        )
+    return text
+
+
+def parse_docx(content: bytes) -> str:
+    with io.BytesIO(content) as f:
+        doc = Document(f)
+        text = "\n".join(p.text for p in doc.paragraphs)
+    return text
+
+
+def parse_xlsx(content: bytes) -> str:
+    df = pd.read_excel(io.BytesIO(content))
+    return df.to_string()
+
+
+def parse_csv(text: str) -> str:
+    df = pd.read_csv(io.StringIO(text))
+    return df.to_string()
+
+
+def parse_document(kind: str, payload: str | bytes) -> str:
+    parsers = {
+        "html": parse_html,
+        "pdf": parse_pdf,
+        "docx": parse_docx,
+        "xlsx": parse_xlsx,
+        "csv": parse_csv,
+        "text": lambda text: text,
+    }
+    return parsers[kind](payload)
 
 
 class VectorStore:
-    def __init__(self, embeddings, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, embeddings, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", http=None, progress=None):
         self.embeddings = embeddings
+        self.http = http or requests
+        # progress(stage, **counters) is called as ingestion advances
+        self.progress = progress or (lambda stage, **counters: None)
         self.vectors = None
+        self.centroids = None
         self.model_name = model_name
-        # use tiktoken to tokenize safely
-        self.encoding = tiktoken.get_encoding("cl100k_base")
 
-    # -------- Tokenization --------
+    # -------- Tokenization (shared encoder in app/core/tokens.py) --------
     def count_tokens(self, text: str) -> int:
-        return len(self.encoding.encode(text))
+        return tokens.count_tokens(text)
 
     def split_by_tokens(self, text: str, max_tokens: int = 512, overlap: int = 50) -> list[str]:
         """Split text into chunks capped at max_tokens with overlap."""
-        words = text.split()
-        chunks, current_chunk = [], []
-
-        for word in words:
-            current_chunk.append(word)
-            if self.count_tokens(" ".join(current_chunk)) >= max_tokens:
-                chunks.append(" ".join(current_chunk))
-                # keep overlap
-                current_chunk = current_chunk[-overlap:]
+        return tokens.split_by_tokens(text.split(), max_tokens, overlap)
 
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+    # -------- Download --------
+    def _fetch(self, url: str) -> requests.Response:
+        response = self.http.get(url, timeout=deadline.timeout(HTTP_TIMEOUT_SECONDS))
+        metrics.record(bytes_fetched=len(response.content))
+        self.progress("download", bytes=len(response.content), url=url)
+        return response
 
-        return chunks
+    def download(self, url: str) -> tuple[str, str | bytes]:
+        """Fetch the raw source; returns (kind, payload) for parse_document()."""
+        if "docs.google.com/document" in url:
+            file_id = re.findall(r"/d/([a-zA-Z0-9-_]+)", url)[0]
+            export_url = f"https://docs.google.com/document/d/{file_id}/export?format=txt"
+            return "text", self._fetch(export_url).text
+        elif "docs.google.com/spreadsheets" in url:
+            sheet_id = re.findall(r"/d/([a-zA-Z0-9-_]+)", url)[0]
+            export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+            return "csv", self._fetch(export_url).text
+        elif url.endswith(".pdf"):
+            return "pdf", self._fetch(url).content
+        elif url.endswith(".docx"):
+            return "docx", self._fetch(url).content
+        elif url.endswith(".xlsx"):
+            return "xlsx", self._fetch(url).content
+        else:
+            return "html", self._fetch(url).text
 
-    # -------- HTML --------
+    # -------- Extractors (download + parse) --------
     def extract_html(self, url: str) -> str:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-        return soup.get_text(separator="\n", strip=True)
+        return parse_html(self._fetch(url).text)
 
-    # -------- PDF --------
     def extract_pdf(self, url: str) -> str:
-        response = requests.get(url)
-        with io.BytesIO(response.content) as f:
-            reader = PyPDF2.PdfReader(f)
-            text = "\n".join(
-                page.extract_text() for page in reader.pages if page.extract_text()
-            )
-        return text
-
-    # -------- DOCX --------
+        return parse_pdf(self._fetch(url).content)
+
     def extract_docx(self, url: str) -> str:
-        response = requests.get(url)
-        with io.BytesIO(response.content) as f:
-            doc = Document(f)
-            text = "\n".join(p.text for p in doc.paragraphs)
-        return text
+        return parse_docx(self._fetch(url).content)
 
-    # -------- XLSX --------
     def extract_xlsx(self, url: str) -> str:
-        df = pd.read_excel(url)
-        return df.to_string()
+        return parse_xlsx(self._fetch(url).content)
 
-    # -------- Google Doc (Public) --------
     def extract_google_doc(self, doc_url: str) -> str:
-        file_id = re.findall(r"/d/([a-zA-Z0-9-_]+)", doc_url)[0]
-        export_url = f"https://docs.google.com/document/d/{file_id}/export?format=txt"
-        response = requests.get(export_url)
-        return response.text
+        return parse_document(*self.download(doc_url))
 
-    # -------- Google Sheet (Public) --------
     def extract_google_sheet(self, sheet_url: str) -> str:
-        sheet_id = re.findall(r"/d/([a-zA-Z0-9-_]+)", sheet_url)[0]
-        export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-        response = requests.get(export_url)
-        df = pd.read_csv(io.StringIO(response.text))
-        return df.to_string()
+        return parse_document(*self.download(sheet_url))
 
     # -------- Dispatcher --------
     def extract(self, url: str) -> str:
-        if "docs.google.com/document" in url:
-            return self.extract_google_doc(url)
-        elif "docs.google.com/spreadsheets" in url:
-            return self.extract_google_sheet(url)
-        elif url.endswith(".pdf"):
-            return self.extract_pdf(url)
-        elif url.endswith(".docx"):
-            return self.extract_docx(url)
-        elif url.endswith(".xlsx"):
-            return self.extract_xlsx(url)
-        else:
-            return self.extract_html(url)
+        return parse_document(*self.download(url))
 
     # -------- Vector Store Management --------
     def ensure_index(self, url: str) -> dict:
+        # Extract text
+        text = self.extract(url)
+        logger.info("Text extracted successfully.")
+        return self.build_index(url, text)
+
+    async def aensure_index(self, url: str) -> dict:
+        """Same as ensure_index, with each stage on its own executor pool."""
+        kind, payload = await run_blocking("io", self.download, url)
+        text = await run_blocking("parsing", parse_document, kind, payload)
+        logger.info("Text extracted successfully.")
+        documents, total_tokens, embedded_tokens = await run_blocking("embedding", self.prepare_chunks, text)
+        # One embedding slot per batch: between batches the scheduler can hand
+        # the model to higher-priority (interactive) queries.
+        for start in range(0, len(documents), EMBED_BATCH_SIZE):
+            await run_blocking("embedding", self.embed_batch, documents, start)
+        return await run_blocking("embedding", self.write_index, url, total_tokens, embedded_tokens)
+
+    def build_index(self, url: str, text: str) -> dict:
+        documents, total_tokens, embedded_tokens = self.prepare_chunks(text)
+        for start in range(0, len(documents), EMBED_BATCH_SIZE):
+            self.embed_batch(documents, start)
+        return self.write_index(url, total_tokens, embedded_tokens)
+
+    def prepare_chunks(self, text: str) -> tuple[list[LCDocument], int, int]:
         # 🚨 Always start fresh (ignore old index if exists)
         if os.path.exists(FAISS_INDEX_PATH):
             import shutil
             shutil.rmtree(FAISS_INDEX_PATH)  # delete old vector store
             logger.info("🧹 Old FAISS index deleted. Creating new one.")
 
-        # Extract text
-        text = self.extract(url)
-        logger.info("Text extracted successfully.")
-
         # Count total tokens
         total_tokens = self.count_tokens(text)
 
         # Split into chunks (512 max tokens)
         chunks = self.split_by_tokens(text, max_tokens=512, overlap=50)
         documents = [LCDocument(page_content=chunk) for chunk in chunks]
+        self.progress("chunk", chunks=len(chunks), total_tokens=total_tokens)
 
         # Count tokens after chunking
-        embedded_tokens = sum(self.count_tokens(chunk) for chunk in chunks)
+        embedded_tokens = sum(tokens.count_tokens_batch(chunks))
 
-        # Create new FAISS
-        self.vectors = FAISS.from_documents(documents, self.embeddings)
+        self.vectors = None
+        return documents, total_tokens, embedded_tokens
+
+    def embed_batch(self, documents: list[LCDocument], start: int):
+        """Embed documents[start:start + EMBED_BATCH_SIZE] into the new FAISS index."""
+        batch = documents[start:start + EMBED_BATCH_SIZE]
+        if self.vectors is None:
+            self.vectors = FAISS.from_documents(batch, self.embeddings)
+        else:
+            self.vectors.add_documents(batch)
+        self.progress("embed", chunks_embedded=start + len(batch), chunks_total=len(documents))
+
+    def write_index(self, url: str, total_tokens: int, embedded_tokens: int) -> dict:
         os.makedirs(FAISS_INDEX_PATH, exist_ok=True)
         self.vectors.save_local(FAISS_INDEX_PATH)
+        self.progress("write", vectors_written=self.vectors.index.ntotal, path=FAISS_INDEX_PATH)
+
+        # Cluster summaries of the index, used by RouterAgent to skip off-topic retrieval
+        index = self.vectors.index
+        self.centroids = compute_centroids(index.reconstruct_n(0, index.ntotal), k=ROUTER_CENTROIDS)
+        save_centroids(self.centroids)
 
         logger.info("✅ New vector embeddings created and saved.")
         logger.info(f"Total tokens in document: {total_tokens}")
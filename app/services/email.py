@@ -30,15 +30,77 @@
 
 
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from app.core.config import SMTP_SERVER, SMTP_PORT, SENDER_EMAIL, SENDER_PASSWORD
+from app.core import deadline
+from app.core.config import (
+    EMAIL_FAIL_ON_TRANSIENT,
+    SENDER_EMAIL,
+    SENDER_PASSWORD,
+    SMTP_PORT,
+    SMTP_SERVER,
+    SMTP_TIMEOUT_SECONDS,
+)
 from app.core.logging_utils import get_logger
 
 logger = get_logger()
 
 
+class TransientEmailError(RuntimeError):
+    """An SMTP failure worth retrying later (connection trouble, 4xx reply)."""
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # Other SMTPExceptions (bad sender, auth, ...) won't go away on retry; plain OSErrors might
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
 class EmailService:
+    """
+    Sends mail over one logged-in SMTP connection, reopened when the server drops it.
+    Failures come back as "failed: ..."; with ``fail_on_transient`` the retryable
+    ones raise TransientEmailError instead, so a checkpointed run can be resumed.
+    """
+
+    def __init__(self, fail_on_transient: bool = EMAIL_FAIL_ON_TRANSIENT):
+        self.fail_on_transient = fail_on_transient
+        self._server: smtplib.SMTP | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=deadline.timeout(SMTP_TIMEOUT_SECONDS))
+        server.starttls()
+        server.login(SENDER_EMAIL, SENDER_PASSWORD)
+        return server
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is not None:
+            try:
+                # Reused socket: bound every SMTP command by what's left of the request budget
+                self._server.sock.settimeout(deadline.timeout(SMTP_TIMEOUT_SECONDS))
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard()
+        self._server = self._connect()
+        return self._server
+
+    def _discard(self):
+        if self._server is not None:
+            try:
+                self._server.close()
+            except Exception:
+                pass
+            self._server = None
+
     def send_email(self, subject: str, body: str, to_email: str) -> str:
         message = MIMEMultipart()
         message["From"] = SENDER_EMAIL
@@ -46,13 +108,34 @@ class EmailService:
         message["Subject"] = subject
         message.attach(MIMEText(body, "plain"))
 
-        try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.starttls()
-                server.login(SENDER_EMAIL, SENDER_PASSWORD)
-                server.sendmail(SENDER_EMAIL, to_email, message.as_string())
-            logger.info(f"Email sent successfully to {to_email}.")
-            return "success"
-        except Exception as e:
-            logger.error(f"Email failed: {e}")
-            return f"failed: {e}"
+        with self._lock:
+            try:
+                try:
+                    self._connection().sendmail(SENDER_EMAIL, to_email, message.as_string())
+                except smtplib.SMTPServerDisconnected:
+                    # Idle connection was closed between the NOOP and the send
+                    self._discard()
+                    self._connection().sendmail(SENDER_EMAIL, to_email, message.as_string())
+                logger.info(f"Email sent successfully to {to_email}.")
+                return "success"
+            except deadline.DeadlineExceeded:
+                self._discard()
+                raise
+            except Exception as e:
+                self._discard()
+                if isinstance(e, TimeoutError):
+                    # The socket timeout was the request budget running out: a timeout, not a send failure
+                    deadline.check()
+                logger.error(f"Email failed: {e}")
+                if self.fail_on_transient and _is_transient(e):
+                    raise TransientEmailError(f"failed: {e}") from e
+                return f"failed: {e}"
+
+    def close(self):
+        with self._lock:
+            if self._server is not None:
+                try:
+                    self._server.quit()
+                except Exception:
+                    pass
+                self._server = None
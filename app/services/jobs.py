@@ -0,0 +1,242 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from app.core import events
+from app.core.config import JOB_WORKERS, JOBS_DB_PATH
+from app.core.executors import get_pool, run_blocking
+from app.core.logging_utils import get_logger
+from app.core.pipeline import PipelineEngine
+from app.core.scheduler import BATCH
+from app.core.types import PipelineContext
+
+logger = get_logger()
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobStore:
+    """
+    SQLite-backed job table so queued work survives a restart. Calls are
+    blocking (execute + commit); async code reaches them through the io pool.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                agents TEXT NOT NULL,
+                context TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT NOT NULL DEFAULT '{}',
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    def insert(self, job_id: str, agents: List[str], context: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, agents, context, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(agents), json.dumps(context, default=str), QUEUED, now, now),
+            )
+            self._db.commit()
+
+    def update(self, job_id: str, **values: Any):
+        for key in ("progress", "result"):
+            if key in values and values[key] is not None:
+                values[key] = json.dumps(values[key], default=str)
+        values["updated_at"] = time.time()
+        columns = ", ".join(f"{key} = ?" for key in values)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*values.values(), job_id))
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, agents, context, status, progress, result, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "agents": json.loads(row[1]),
+            "context": json.loads(row[2]),
+            "status": row[3],
+            "progress": json.loads(row[4]),
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+            "created_at": row[7],
+            "updated_at": row[8],
+        }
+
+    def requeue_unfinished(self) -> List[str]:
+        """Jobs interrupted mid-run go back to the queue; returns every queued id, oldest first."""
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobProgress:
+    """
+    Event sink for a running job: folds `progress` and `agent_completed` events
+    into its record. Writes happen on the io pool; each one stores the newest
+    snapshot, so a slow write never lands on top of a later one.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, flush_interval: float = 0.5):
+        self.store = store
+        self.job_id = job_id
+        self.flush_interval = flush_interval
+        self.progress: Dict[str, Any] = {"stages": {}, "agents_completed": []}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._snapshot: Dict[str, Any] = {}
+        self._version = 0
+        self._written = 0
+        self._write_lock = threading.Lock()
+
+    def _take_snapshot(self):
+        # Caller holds self._lock
+        self._snapshot = json.loads(json.dumps(self.progress, default=str))
+        self._version += 1
+
+    def _write(self):
+        with self._write_lock:
+            with self._lock:
+                version, snapshot = self._version, self._snapshot
+            if version <= self._written:
+                return
+            self.store.update(self.job_id, progress=snapshot)
+            self._written = version
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        # Called from the event loop and from executor threads alike
+        with self._lock:
+            if event == "progress":
+                data = dict(data)
+                stage = data.pop("stage", "unknown")
+                data.pop("agent", None)
+                self.progress["stages"].setdefault(stage, {}).update(data)
+            elif event == "agent_completed":
+                self.progress["agents_completed"].append(data.get("agent"))
+            else:
+                return
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                return
+            self._last_flush = time.monotonic()
+            self._take_snapshot()
+        # Fire and forget: publish() may run on the event loop, which must not wait on SQLite
+        get_pool("io").submit(self._write).add_done_callback(self._log_failed_write)
+
+    def _log_failed_write(self, future):
+        if future.exception() is not None:
+            logger.warning(f"[Jobs] progress write for {self.job_id} failed: {future.exception()}")
+
+    async def flush(self):
+        with self._lock:
+            self._take_snapshot()
+        await run_blocking("io", self._write)
+
+
+class JobQueue:
+    """Bounded pool of workers running pipelines off the request path."""
+
+    def __init__(self, engine: PipelineEngine, workers: int = JOB_WORKERS, store: Optional[JobStore] = None):
+        self.engine = engine
+        self.workers = workers
+        self.store = store or JobStore()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        for job_id in await run_blocking("io", self.store.requeue_unfinished):
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info(f"[Jobs] {self.workers} workers started, {self._queue.qsize()} job(s) pending.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    async def submit(self, agents: List[str], context: Dict[str, Any], priority: str = BATCH) -> str:
+        """Queue a pipeline; it runs under ``priority`` unless the context names its own class."""
+        job_id = uuid.uuid4().hex
+        context = {**context, "priority": context.get("priority") or priority}
+        await run_blocking("io", self.store.insert, job_id, agents, context)
+        self._queue.put_nowait(job_id)
+        logger.info(f"[Jobs] queued {job_id}: {agents}")
+        return job_id
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await run_blocking("io", self.store.get, job_id)
+
+    async def retry(self, job_id: str) -> bool:
+        """Requeue a failed job; it resumes from its last checkpoint. False if it isn't failed."""
+        job = await self.status(job_id)
+        if job is None or job["status"] != FAILED:
+            return False
+        await run_blocking("io", self.store.update, job_id, status=QUEUED, error=None)
+        self._queue.put_nowait(job_id)
+        logger.info(f"[Jobs] requeued {job_id}")
+        return True
+
+    async def _worker(self, n: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self.status(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+        await run_blocking("io", self.store.update, job_id, status=RUNNING)
+        progress = JobProgress(self.store, job_id)
+        try:
+            with events.bind_stream(progress):
+                # The job id doubles as the run id: a restart or retry continues from the checkpoint
+                checkpoint = None
+                if self.engine.checkpoints:
+                    checkpoint = await run_blocking("io", self.engine.checkpoints.load, job_id)
+                if checkpoint is not None:
+                    context = await self.engine.resume(job_id, job["context"].get("deadline"))
+                else:
+                    context = await self.engine.run(job["agents"], PipelineContext(**job["context"]), run_id=job_id)
+            await progress.flush()
+            await run_blocking("io", self.store.update, job_id, status=DONE, result=asdict(context))
+            logger.info(f"[Jobs] {job_id} done.")
+        except asyncio.CancelledError:
+            # Shutdown mid-run: leave it RUNNING so the next start() requeues it
+            raise
+        except Exception as e:
+            await progress.flush()
+            await run_blocking("io", self.store.update, job_id, status=FAILED, error=str(e))
+            logger.error(f"[Jobs] {job_id} failed: {e}")
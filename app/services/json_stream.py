@@ -0,0 +1,102 @@
+from typing import Dict, List, Tuple
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "/": "/", "\\": "\\", '"': '"'}
+
+
+class JsonFieldStream:
+    """
+    Incremental parser for a flat JSON object whose values of interest are
+    strings, e.g. ``{"summary": "...", "subject": "..."}`` arriving in chunks.
+
+    feed() returns the (field, text) deltas decoded from each chunk so callers
+    can forward fields while the object is still streaming. Non-string values
+    are skipped. ``values`` holds everything decoded so far.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, str] = {}
+        self.done = False
+        self._state = "start"
+        self._key: List[str] = []
+        self._field = ""
+        self._escape = None  # None, "" after a backslash, or collected \\u hex digits
+        self._depth = 0
+
+    def _decode(self, ch: str, out: List[str]) -> bool:
+        """Handle one char inside a string; returns False when the closing quote is reached."""
+        if self._escape is not None:
+            if self._escape == "" and ch != "u":
+                out.append(_ESCAPES.get(ch, ch))
+                self._escape = None
+            elif self._escape == "":
+                self._escape = "u"
+            else:
+                self._escape += ch
+                if len(self._escape) == 5:
+                    out.append(chr(int(self._escape[1:], 16)))
+                    self._escape = None
+            return True
+        if ch == "\\":
+            self._escape = ""
+            return True
+        if ch == '"':
+            return False
+        out.append(ch)
+        return True
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        deltas: List[Tuple[str, str]] = []
+        current: List[str] = []
+
+        def flush():
+            if current:
+                delta = "".join(current)
+                self.values[self._field] += delta
+                deltas.append((self._field, delta))
+                current.clear()
+
+        for ch in text:
+            state = self._state
+            if state == "start":
+                if ch == "{":
+                    self._state = "key_or_end"
+            elif state == "key_or_end":
+                if ch == '"':
+                    self._key = []
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "end"
+                    self.done = True
+            elif state == "key":
+                if not self._decode(ch, self._key):
+                    self._state = "colon"
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value"
+            elif state == "value":
+                if ch == '"':
+                    self._field = "".join(self._key)
+                    self.values[self._field] = ""
+                    self._state = "string"
+                elif not ch.isspace():
+                    self._depth = 1 if ch in "{[" else 0
+                    self._state = "raw"
+            elif state == "string":
+                if not self._decode(ch, current):
+                    flush()
+                    self._state = "key_or_end"
+            elif state == "raw":
+                # Skip a non-string value (numbers, literals, nested containers)
+                if ch in "{[":
+                    self._depth += 1
+                elif ch in "}]":
+                    if self._depth == 0:
+                        self._state = "end"
+                        self.done = True
+                    else:
+                        self._depth -= 1
+                elif ch == "," and self._depth == 0:
+                    self._state = "key_or_end"
+        if self._state == "string":
+            flush()
+        return deltas
@@ -0,0 +1,69 @@
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.core.config import FAISS_INDEX_PATH, ROUTER_GENERAL_THRESHOLD, ROUTER_RAG_THRESHOLD
+from app.core.logging_utils import get_logger
+
+logger = get_logger()
+
+CENTROIDS_FILE = "centroids.npy"
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norms == 0, 1, norms)
+
+
+def compute_centroids(vectors: np.ndarray, k: int = 8, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over chunk embeddings; returns (k, dim) unit vectors summarizing the index."""
+    x = _normalize(np.asarray(vectors, dtype=np.float32))
+    k = min(k, len(x))
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(x @ centroids.T, axis=1)
+        for j in range(k):
+            members = x[assignment == j]
+            if len(members):
+                centroids[j] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def save_centroids(centroids: np.ndarray, path: str = FAISS_INDEX_PATH):
+    np.save(os.path.join(path, CENTROIDS_FILE), centroids)
+
+
+def load_centroids(path: str = FAISS_INDEX_PATH) -> Optional[np.ndarray]:
+    file_path = os.path.join(path, CENTROIDS_FILE)
+    if not os.path.exists(file_path):
+        return None
+    return np.load(file_path)
+
+
+def route_query(
+    query_vector: np.ndarray,
+    centroids: Optional[np.ndarray],
+    rag_threshold: float = ROUTER_RAG_THRESHOLD,
+    general_threshold: float = ROUTER_GENERAL_THRESHOLD,
+) -> Tuple[str, float, float]:
+    """
+    Pick "rag", "general" or "both" from the best centroid similarity.
+    Returns (route, confidence, similarity); confidence is the distance from the
+    middle of the uncertain band, scaled to [0, 1].
+    """
+    if centroids is None or len(centroids) == 0:
+        return "general", 1.0, 0.0
+    similarity = float(np.max(centroids @ _normalize(np.asarray(query_vector, dtype=np.float32))))
+    if similarity >= rag_threshold:
+        route = "rag"
+    elif similarity < general_threshold:
+        route = "general"
+    else:
+        route = "both"
+    middle = (rag_threshold + general_threshold) / 2
+    half_band = max((rag_threshold - general_threshold) / 2, 1e-6)
+    confidence = min(1.0, abs(similarity - middle) / half_band)
+    return route, round(confidence, 3), round(similarity, 3)
@@ -1,33 +1,148 @@
+import json
 from datetime import datetime
-from typing import AsyncIterator, List, Dict
+from typing import Any, AsyncIterator, List, Dict, Optional
 
 from groq import AsyncGroq
 
-from app.core.config import MODEL_NAME
+from app.core import deadline, events, llm_usage, metrics, tokens
+from app.core.config import LLM_BASE_URL, LLM_TIMEOUT_SECONDS, MODEL_NAME
+from app.core.llm_cache import get_llm_cache
+from app.core.logging_utils import get_logger
+from app.core.rate_limit import get_governor
+from app.core.singleflight import SingleFlight, flight_key
+from app.services.json_stream import JsonFieldStream
+
+logger = get_logger()
+
+# Completion tokens spent on JSON keys, quotes and braces in structured mode
+JSON_OVERHEAD_TOKENS = 24
 
 
 class LlmService:
-    def __init__(self, model_name: str = MODEL_NAME, temperature: float = 0.5):
-        self.client = AsyncGroq()
+    def __init__(self, model_name: str = MODEL_NAME, temperature: float = 0.5, client: Optional[AsyncGroq] = None):
+        # Pass a shared client to reuse its connection pool across requests.
+        # Retries are left to the rate governor so they respect rate-limit headers.
+        self.client = client or AsyncGroq(base_url=LLM_BASE_URL, max_retries=0)
         self.model_name = model_name
         self.temperature = temperature
+        self.endpoint = llm_usage.endpoint_of(self.client)
+        # Concurrent identical completions share one upstream stream
+        self.flights = SingleFlight("llm_service")
 
-    async def stream_completion(self, messages: List[Dict[str, str]], max_tokens: int = 1024) -> AsyncIterator[str]:
-        stream = await self.client.chat.completions.create(
-            messages=messages,
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 1024,
+        response_format: Optional[Dict[str, Any]] = None,
+        publish_tokens: bool = True,
+    ) -> AsyncIterator[str]:
+        # Keep prompt + completion inside the model's window, and only reserve what can be generated
+        messages = tokens.fit_messages(messages, self.model_name, reserve_tokens=max_tokens)
+        prompt_tokens = tokens.count_message_tokens(messages)
+        max_tokens = tokens.clamp_completion(self.model_name, prompt_tokens, max_tokens)
+        extra = {"response_format": response_format} if response_format else {}
+        key = flight_key(
             model=self.model_name,
+            messages=messages,
             temperature=self.temperature,
-            max_completion_tokens=max_tokens,
-            top_p=1,
-            stream=True,
+            max_tokens=max_tokens,
+            **extra,
         )
-        async for chunk in stream:
-            content = chunk.choices[0].delta.content
-            if content:
-                yield content
+        call = llm_usage.LlmCall(self.model_name, self.endpoint)
+        # Identical calls in flight share one stream; finished ones may be replayed from disk
+        stream = self.flights.stream(key, lambda: get_llm_cache().stream(
+            key,
+            self.model_name,
+            self.temperature,
+            lambda: get_governor().stream(
+                self.model_name,
+                prompt_tokens + max_tokens,
+                lambda: call.sent(self.client.chat.completions.create(
+                    messages=messages,
+                    model=self.model_name,
+                    temperature=self.temperature,
+                    max_completion_tokens=max_tokens,
+                    top_p=1,
+                    stream=True,
+                    timeout=deadline.timeout(LLM_TIMEOUT_SECONDS),
+                    **extra,
+                )),
+            ),
+        ))
+        # Upstream usage is accounted once, by the caller that opened the stream
+        if stream.leader:
+            metrics.record(llm_calls=1)
+        try:
+            async for chunk in stream:
+                deadline.check()  # stop reading (and close the stream) once the budget is gone
+                content = call.observe(chunk)
+                if content:
+                    metrics.record_first_token()
+                    metrics.record(streamed_chunks=1)
+                    if publish_tokens:
+                        events.publish("token", content=content)
+                    yield content
+        except Exception:
+            if stream.leader:
+                call.fail()
+            raise
+        if stream.leader:
+            call.complete(prompt_tokens)
+
+    async def structured_completion(
+        self,
+        messages: List[Dict[str, str]],
+        fields: Dict[str, str],
+        max_tokens: int = 1024,
+    ) -> Optional[Dict[str, str]]:
+        """
+        Ask for several string fields in one request (JSON mode). The JSON is
+        parsed while it streams and each field is published as `field` events.
+        Returns {field: value}, or None if the output is missing or malformed a
+        field so the caller can fall back.
+        """
+        schema = ", ".join(f'"{name}": string ({description})' for name, description in fields.items())
+        instruction = {
+            "role": "system",
+            "content": f"Respond with only a JSON object of the form {{{schema}}}.",
+        }
+        parser = JsonFieldStream()
+        raw = ""
+        try:
+            async for chunk in self.stream_completion(
+                messages + [instruction],
+                max_tokens=max_tokens + JSON_OVERHEAD_TOKENS,
+                response_format={"type": "json_object"},
+                publish_tokens=False,
+            ):
+                raw += chunk
+                for field, delta in parser.feed(chunk):
+                    if field in fields:
+                        events.publish("field", field=field, content=delta)
+        except Exception as e:
+            # Groq answers 400 json_validate_failed when the model's output isn't valid JSON;
+            # anything else (rate limits, deadline) is not a formatting problem
+            if getattr(e, "status_code", None) != 400:
+                raise
+            logger.warning(f"[LlmService] structured completion rejected: {e}")
+            return None
+
+        try:
+            values = json.loads(raw)
+        except json.JSONDecodeError:
+            values = parser.values  # e.g. cut off after the last field: keep what parsed
+        if not isinstance(values, dict):
+            return None
+        result = {name: values.get(name) for name in fields}
+        if not all(isinstance(value, str) and value.strip() for value in result.values()):
+            logger.warning(f"[LlmService] structured completion missing fields: {raw[:200]!r}")
+            return None
+        return {name: value.strip() for name, value in result.items()}
 
     @staticmethod
     def build_metadata() -> dict:
+        # Token counts, TTFT, tokens/sec and queue wait per agent are added by the
+        # pipeline engine under meta["llm_usage"] (app/core/llm_usage.py)
         return {
             "model_used": MODEL_NAME,
             "timestamp": datetime.utcnow().isoformat() + "Z",
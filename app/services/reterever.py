@@ -1,16 +1,19 @@
 import os
-from typing import Optional, List
+from typing import Callable, Optional, List
 
 from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
-from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.prompts import ChatPromptTemplate
 from langchain_groq import ChatGroq
 from sklearn.metrics.pairwise import cosine_similarity
-import tiktoken
 
-from app.core.config import FAISS_INDEX_PATH, MODEL_NAME
+from app.core.config import FAISS_INDEX_PATH, LLM_BASE_URL, MODEL_NAME, ROUTER_CENTROIDS
+from app.core import llm_usage, metrics
+from app.core.executors import run_blocking
+from app.core import tokens
+from app.core.rate_limit import get_governor
+from app.services.kb_router import compute_centroids, load_centroids, save_centroids
 from app.core.logging_utils import get_logger
 
 logger = get_logger()
@@ -33,25 +36,42 @@ class RetrieverService:
         self.file_path = file_path
         self.embeddings = embeddings
         self.vectors: Optional[FAISS] = None
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+        # Cluster centroids of the index for RouterAgent (None until an index exists)
+        self.centroids = None
+        # Callbacks run whenever the index is replaced (cache invalidation etc.)
+        self._index_listeners: List[Callable[[], None]] = []
 
         # LLM + prompt setup
         self.prompt = ChatPromptTemplate.from_template(
-            "You are a helpful assistant. Answer the query based ONLY on the context below.\n\nContext:\n{context}\n\nQuery: {input}"
+            "You are a helpful assistant. Answer the query based ONLY on the context below.\n\n"
+            "{history}Context:\n{context}\n\nQuery: {input}"
         )
-        self.llm = ChatGroq(model_name=MODEL_NAME, temperature=0.2)
+        self.llm = ChatGroq(model_name=MODEL_NAME, temperature=0.2, max_retries=0, base_url=LLM_BASE_URL)  # retries via rate governor
         self.document_chain = create_stuff_documents_chain(self.llm, self.prompt)
+        self.endpoint = llm_usage.endpoint_of(LLM_BASE_URL or "https://api.groq.com")
 
         # 🚫 Do NOT auto-load FAISS index
         logger.info("[Retriever Init] Skipping FAISS auto-load. Waiting for create_kb.")
 
+    def add_index_listener(self, listener: Callable[[], None]):
+        self._index_listeners.append(listener)
+
+    def set_vectors(self, vectors: Optional[FAISS], centroids=None):
+        """Swap in a freshly built index (and its router centroids) and notify listeners."""
+        self.vectors = vectors
+        self.centroids = centroids
+        for listener in self._index_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"[Retriever] Index listener failed: {e}")
+
     def reload_index(self):
         """Reload FAISS index after CreateKB builds it (always fresh)."""
         if os.path.exists(FAISS_INDEX_PATH):
             try:
-                self.vectors = FAISS.load_local(
-                    FAISS_INDEX_PATH, self.embeddings, allow_dangerous_deserialization=True
-                )
+                vectors = FAISS.load_local(FAISS_INDEX_PATH, self.embeddings, allow_dangerous_deserialization=True)
+                self.set_vectors(vectors, centroids=self._load_or_compute_centroids(vectors))
                 logger.info("[Retriever] FAISS index loaded successfully.")
             except Exception as e:
                 logger.error(f"[Retriever] Failed to load FAISS index: {e}")
@@ -59,24 +79,74 @@ class RetrieverService:
         else:
             logger.warning("[Retriever] No FAISS index found. Run create_kb first.")
 
-    def retrieve(self, query: str) -> Optional[str]:
-        """Retrieve and answer query using FAISS + LLM."""
+    @staticmethod
+    def _load_or_compute_centroids(vectors: FAISS):
+        """Router centroids for an index; indexes written before centroids existed get them now."""
+        centroids = load_centroids()
+        if centroids is None and vectors.index.ntotal:
+            index = vectors.index
+            centroids = compute_centroids(index.reconstruct_n(0, index.ntotal), k=ROUTER_CENTROIDS)
+            try:
+                save_centroids(centroids)
+            except OSError as e:
+                logger.warning(f"[Retriever] Could not save router centroids: {e}")
+            logger.info("[Retriever] Router centroids computed for an index that had none.")
+        return centroids
+
+    def search(self, query: str) -> Optional[List[Document]]:
+        """FAISS search + relevance check; None when the KB can't answer the query."""
         if not self.vectors:
             logger.warning("No FAISS index loaded. Run create_kb first.")
             return None
 
         retriever = self.vectors.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-        docs = retriever.invoke(query)
+        with metrics.timed("faiss_search_ms"):
+            docs = retriever.invoke(query)
 
         logger.info(f"Retriever raw docs: {[d.page_content[:100] for d in docs]}")
 
         if not docs or not _is_query_relevant(query, docs, self.embeddings):
             logger.info("Query not relevant to vectorstore. Falling back to MainAgent.")
             return None
+        return docs
 
-        chain = create_retrieval_chain(retriever, self.document_chain)
-        result = chain.invoke({"input": query, "context": "\n".join([d.page_content for d in docs])})
+    def answer(self, query: str, docs: List[Document], history: str = "") -> str:
+        # Stuff the already-retrieved docs directly (a retrieval chain would search FAISS again)
+        metrics.record(llm_calls=1)
+        history = f"Conversation so far:\n{history}\n\n" if history else ""
+        return self.document_chain.invoke({"input": query, "context": docs, "history": history})
 
-        return result.get("answer")
+    def retrieve(self, query: str) -> Optional[str]:
+        """Retrieve and answer query using FAISS + LLM."""
+        docs = self.search(query)
+        if docs is None:
+            return None
+        return self.answer(query, docs)
+
+    async def aretrieve(self, query: str, history: str = "", search_query: Optional[str] = None) -> Optional[str]:
+        """
+        retrieve() with the search on the embedding pool and the LLM call on the I/O pool.
+        ``history`` is earlier conversation for the prompt; ``search_query`` (e.g. the
+        previous question plus this one, for follow-ups) replaces ``query`` for the search.
+        """
+        docs = await run_blocking("embedding", self.search, search_query or query)
+        if docs is None:
+            return None
+        prompt_tokens = tokens.count_message_tokens([query, history] + [d.page_content for d in docs])
+        call = llm_usage.LlmCall(MODEL_NAME, self.endpoint)
+        try:
+            answer = await get_governor().call(
+                MODEL_NAME,
+                prompt_tokens + 512,
+                lambda: call.sent(run_blocking("io", self.answer, query, docs, history)),
+            )
+        except Exception:
+            call.fail()
+            raise
+        # The stuff-documents chain returns text only: count tokens locally
+        completion_tokens = tokens.count_tokens(answer)
+        metrics.record(tokens_in=prompt_tokens, tokens_out=completion_tokens)
+        call.finish(prompt_tokens, completion_tokens, estimated=True)
+        return answer
 
 
@@ -0,0 +1,98 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core import metrics
+from app.core.executors import run_blocking
+from app.core.logging_utils import get_logger
+
+logger = get_logger()
+
+
+class SemanticCache:
+    """
+    Answers keyed by query meaning rather than exact text.
+
+    Query embeddings are L2-normalized rows of one preallocated matrix, so a
+    lookup is a single matrix-vector product. When full, the least recently
+    used entry is overwritten.
+    """
+
+    def __init__(self, embeddings, name: str, threshold: float = 0.92, max_entries: int = 1000):
+        self.embeddings = embeddings
+        self.name = name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors: Optional[np.ndarray] = None
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(await run_blocking("embedding", self.embeddings.embed_query, query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup_vector(self, vector: np.ndarray) -> Tuple[Optional[str], float]:
+        with self._lock:
+            if self._size == 0:
+                self.misses += 1
+                metrics.SEMANTIC_CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+                return None, 0.0
+            scores = self._vectors[: self._size] @ vector
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score >= self.threshold:
+                self._clock += 1
+                self._last_used[best] = self._clock
+                self.hits += 1
+                metrics.SEMANTIC_CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+                return self._answers[best], score
+            self.misses += 1
+            metrics.SEMANTIC_CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+            return None, score
+
+    async def lookup(self, query: str) -> Tuple[Optional[str], np.ndarray, float]:
+        """Returns (cached answer or None, query vector for a later store(), best similarity)."""
+        vector = await self.embed(query)
+        answer, score = self.lookup_vector(vector)
+        return answer, vector, score
+
+    def store(self, vector: np.ndarray, answer: str):
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._clock += 1
+            self._vectors[slot] = vector
+            self._answers[slot] = answer
+            self._last_used[slot] = self._clock
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._answers = [None] * self.max_entries
+            self._last_used[:] = 0
+        logger.info(f"[SemanticCache:{self.name}] Cleared.")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
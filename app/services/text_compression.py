@@ -0,0 +1,109 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from app.core import tokens
+from app.core.config import COMPRESSION_REDUNDANCY, COMPRESSION_TOKEN_BUDGET, EMBED_BATCH_SIZE
+from app.core.executors import run_blocking
+from app.core.logging_utils import get_logger
+
+logger = get_logger()
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+
+
+@dataclass
+class CompressionResult:
+    text: str
+    original_tokens: int
+    compressed_tokens: int
+    units_total: int
+    units_kept: int
+
+    @property
+    def ratio(self) -> float:
+        return round(self.compressed_tokens / self.original_tokens, 3) if self.original_tokens else 1.0
+
+    def trace_entry(self, agent: str) -> dict:
+        return {
+            "agent": agent,
+            "status": "compressed",
+            "original_tokens": self.original_tokens,
+            "compressed_tokens": self.compressed_tokens,
+            "compression_ratio": self.ratio,
+            "units_kept": self.units_kept,
+            "units_total": self.units_total,
+        }
+
+
+def split_units(text: str, unit: str = "sentence") -> List[str]:
+    """Rows (one per line) for tabular text, sentences within lines for prose."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if unit == "row":
+        return lines
+    return [sentence for line in lines for sentence in _SENTENCE_END.split(line) if sentence.strip()]
+
+
+def select_units(
+    vectors: np.ndarray, unit_tokens: np.ndarray, budget: int, redundancy: float = COMPRESSION_REDUNDANCY
+) -> np.ndarray:
+    """
+    Greedy maximal-marginal-relevance pick within a token budget.
+
+    Salience is a unit's similarity to the document centroid; each pick is
+    penalized by ``redundancy`` times its similarity to the closest unit
+    already kept. Returns the kept indices in document order.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    x = vectors / np.where(norms == 0, 1, norms)
+    centroid = x.mean(axis=0)
+    centroid /= np.linalg.norm(centroid) or 1.0
+    salience = x @ centroid
+
+    closest = np.zeros(len(x), dtype=np.float32)  # max similarity to anything kept so far
+    available = unit_tokens <= budget
+    kept: List[int] = []
+    remaining = budget
+    while remaining > 0 and available.any():
+        scores = np.where(available, (1 - redundancy) * salience - redundancy * closest, -np.inf)
+        best = int(np.argmax(scores))
+        kept.append(best)
+        remaining -= int(unit_tokens[best])
+        available[best] = False
+        available &= unit_tokens <= remaining
+        np.maximum(closest, x @ x[best], out=closest)
+    return np.sort(np.asarray(kept, dtype=np.int64))
+
+
+async def compress_text(
+    text: str,
+    embeddings,
+    budget: int = COMPRESSION_TOKEN_BUDGET,
+    unit: str = "sentence",
+) -> CompressionResult:
+    """
+    Extractive pre-summarization: keep the most salient, least redundant
+    sentences (or rows) that fit in ``budget`` tokens, in their original order.
+    Text already within budget is returned unchanged.
+    """
+    original_tokens = tokens.count_tokens(text)
+    units = split_units(text, unit)
+    if original_tokens <= budget or len(units) < 2:
+        return CompressionResult(text, original_tokens, original_tokens, len(units), len(units))
+
+    # One embedding slot per batch so interactive queries can get the model in between
+    vectors = []
+    for start in range(0, len(units), EMBED_BATCH_SIZE):
+        vectors += await run_blocking("embedding", embeddings.embed_documents, units[start:start + EMBED_BATCH_SIZE])
+    unit_tokens = np.asarray(tokens.count_tokens_batch(units), dtype=np.int64) + 1  # + separator
+    kept = select_units(np.asarray(vectors, dtype=np.float32), unit_tokens, budget)
+
+    compressed = "\n".join(units[i] for i in kept)
+    result = CompressionResult(compressed, original_tokens, tokens.count_tokens(compressed), len(units), len(kept))
+    logger.info(
+        f"[Compression] {result.original_tokens} -> {result.compressed_tokens} tokens "
+        f"({result.units_kept}/{result.units_total} {unit}s)"
+    )
+    return result
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import hedged_provider
+from app.core.hedged_provider import HedgedProvider, StubProvider
+
+
+@pytest.fixture(autouse=True)
+def short_hedge_delay(monkeypatch):
+    # Hedge after 50ms while a backend has too few samples for its own p95
+    monkeypatch.setattr(hedged_provider, "LLM_HEDGE_DEFAULT_DELAY", 0.05)
+
+
+async def _collect(stream):
+    return "".join([token async for token in stream])
+
+
+def test_fast_primary_is_not_hedged():
+    primary, secondary = StubProvider("primary", first_token_delay=0.0), StubProvider("secondary")
+    provider = HedgedProvider([("primary", primary), ("secondary", secondary)])
+
+    assert asyncio.run(provider.generate_response("q")) == "primary"
+    assert (primary.calls, secondary.calls, provider.hedges) == (1, 0, 0)
+
+
+def test_slow_primary_is_hedged_and_the_loser_leaves_no_sample():
+    slow, fast = StubProvider("slow", first_token_delay=1.0), StubProvider("fast", first_token_delay=0.0)
+    provider = HedgedProvider([("slow", slow), ("fast", fast)])
+
+    assert asyncio.run(provider.generate_response("q")) == "fast"
+    assert (provider.hedges, provider.secondary_wins) == (1, 1)
+    assert len(provider.latency["fast"].latencies) == 1
+    # The cancelled call's elapsed time is not a latency
+    assert len(provider.latency["slow"].latencies) == 0
+
+
+def test_stream_is_taken_whole_from_the_winner():
+    slow = StubProvider("slow words here", first_token_delay=1.0)
+    fast = StubProvider("fast words here", first_token_delay=0.0)
+    provider = HedgedProvider([("slow", slow), ("fast", fast)])
+
+    assert asyncio.run(_collect(provider.stream_response("q"))) == "fast words here"
+
+
+def test_errors_fail_over_to_the_next_backend():
+    broken, healthy = StubProvider(fail=True), StubProvider("healthy")
+    provider = HedgedProvider([("broken", broken), ("healthy", healthy)])
+
+    assert asyncio.run(provider.generate_response("q")) == "healthy"
+    assert provider.latency["broken"].errors == 1
+    assert provider.stats()["order"] == ["healthy", "broken"]
+
+
+def test_hedge_after_failover_uses_the_running_backends_delay(monkeypatch):
+    # The primary has too few samples for a p95, so its delay is the (long) default
+    monkeypatch.setattr(hedged_provider, "LLM_HEDGE_DEFAULT_DELAY", 1.0)
+    broken, slow, fast = StubProvider(fail=True), StubProvider("slow", first_token_delay=2.0), StubProvider("fast")
+    provider = HedgedProvider([("broken", broken), ("slow", slow), ("fast", fast)], min_delay=0.01, min_samples=3)
+    provider.latency["broken"].observe(0.001)
+    for _ in range(3):
+        provider.latency["slow"].observe(0.02)
+        provider.latency["fast"].observe(0.03)
+
+    started = time.perf_counter()
+    assert asyncio.run(provider.generate_response("q")) == "fast"
+    # Hedged on slow's 20ms p95, not the failed primary's 1s default
+    assert time.perf_counter() - started < 0.5
+    assert (broken.calls, slow.calls, fast.calls, provider.hedges) == (1, 1, 1, 1)
+
+
+def test_last_error_is_raised_when_every_backend_fails():
+    provider = HedgedProvider([("a", StubProvider(fail=True)), ("b", StubProvider(fail=True))])
+    with pytest.raises(RuntimeError, match="stub provider failure"):
+        asyncio.run(provider.generate_response("q"))
+
+
+def test_backends_are_ranked_by_recent_latency():
+    provider = HedgedProvider([("a", StubProvider()), ("b", StubProvider())])
+    for _ in range(5):
+        provider.latency["a"].observe(0.8)
+        provider.latency["b"].observe(0.1)
+    assert [name for name, _ in provider.ranked()] == ["b", "a"]
+
+
+def test_hedge_delay_follows_p95_within_bounds():
+    provider = HedgedProvider([("a", StubProvider())], min_delay=0.2, max_delay=1.0, min_samples=3)
+    assert provider.hedge_delay("a") == 0.05  # default until there are enough samples
+    for seconds in (0.4, 0.5, 0.6):
+        provider.latency["a"].observe(seconds)
+    assert provider.hedge_delay("a") == 0.6
+    for _ in range(20):
+        provider.latency["a"].observe(5.0)
+    assert provider.hedge_delay("a") == 1.0
+
+
+def test_from_config_skips_unconfigured_backends(monkeypatch):
+    configured = StubProvider("groq")
+
+    def get_llm_provider(name):
+        if name == "openai":
+            raise ValueError("OPENAI_API_KEY is not set in environment variables.")
+        return configured
+
+    monkeypatch.setattr(hedged_provider, "get_llm_provider", get_llm_provider)
+    provider = HedgedProvider.from_config(["groq", "openai"])
+    assert provider.backends == [("groq", configured)]
@@ -0,0 +1,55 @@
+import json
+
+from app.services.json_stream import JsonFieldStream
+
+DOCUMENT = json.dumps({"summary": 'Q3 revenue rose 12%.\nCosts "flat".', "subject": "Q3 résumé"})
+
+
+def _feed_all(chunks):
+    parser = JsonFieldStream()
+    deltas = [delta for chunk in chunks for delta in parser.feed(chunk)]
+    return parser, deltas
+
+
+def test_whole_object_in_one_chunk():
+    parser, deltas = _feed_all([DOCUMENT])
+    assert parser.values == json.loads(DOCUMENT)
+    assert parser.done
+    assert [field for field, _ in deltas] == ["summary", "subject"]
+
+
+def test_any_chunking_gives_the_same_values():
+    expected = json.loads(DOCUMENT)
+    for size in (1, 2, 3, 7):
+        chunks = [DOCUMENT[i:i + size] for i in range(0, len(DOCUMENT), size)]
+        parser, deltas = _feed_all(chunks)
+        assert parser.values == expected, size
+        for field in expected:
+            assert "".join(text for name, text in deltas if name == field) == expected[field]
+
+
+def test_fields_stream_before_the_object_closes():
+    parser = JsonFieldStream()
+    assert parser.feed('{"summary": "Revenue ro') == [("summary", "Revenue ro")]
+    assert parser.feed('se"') == [("summary", "se")]
+    assert not parser.done
+    parser.feed("}")
+    assert parser.done
+
+
+def test_escapes_split_across_chunks():
+    parser, _ = _feed_all(['{"subject": "caf\\', "u00", 'e9 \\"menu\\"\\', 'n"}'])
+    assert parser.values == {"subject": 'café "menu"\n'}
+
+
+def test_non_string_values_are_skipped():
+    text = '{"count": 3, "flags": [true, {"x": 1}], "ok": null, "summary": "kept", "nested": {"a": [1, 2]}}'
+    parser, deltas = _feed_all([text])
+    assert parser.values == {"summary": "kept"}
+    assert deltas == [("summary", "kept")]
+    assert parser.done
+
+
+def test_text_before_the_object_is_ignored():
+    parser, _ = _feed_all(['Sure, here it is: {"summary": "s"}'])
+    assert parser.values == {"summary": "s"}
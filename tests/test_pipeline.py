@@ -0,0 +1,109 @@
+from app.core.pipeline import merge_branches, plan_stages
+from app.core.types import PipelineContext
+
+
+class Agent:
+    def __init__(self, reads=(), writes=()):
+        self.reads = frozenset(reads)
+        self.writes = frozenset(writes)
+
+
+class Barrier:
+    """No reads/writes declared: treated as touching every field."""
+
+
+# -------------------------------------------------------------------
+# plan_stages
+# -------------------------------------------------------------------
+def test_independent_agents_share_a_stage():
+    agents = [Agent({"query"}, {"response"}), Agent({"query"}, {"summary"})]
+    assert plan_stages(agents) == [[0, 1]]
+
+
+def test_read_after_write_runs_later():
+    retriever = Agent({"query"}, {"response"})
+    summary = Agent({"response"}, {"summary"})
+    sms = Agent({"summary"}, {"sms_status"})
+    assert plan_stages([retriever, summary, sms]) == [[0], [1], [2]]
+
+
+def test_fan_out_after_a_shared_dependency():
+    main = Agent({"query"}, {"response"})
+    summary = Agent({"response"}, {"summary"})
+    email = Agent({"response"}, {"email_status"})
+    assert plan_stages([main, summary, email]) == [[0], [1, 2]]
+
+
+def test_write_after_read_keeps_order_within_a_stage():
+    reader = Agent({"response"}, {"summary"})
+    writer = Agent({"query"}, {"response"})
+    # writer must not run before reader, but may run alongside it (reader sees its own snapshot)
+    assert plan_stages([reader, writer]) == [[0, 1]]
+
+
+def test_agent_without_declarations_is_a_barrier():
+    before = Agent({"query"}, {"response"})
+    after = Agent({"query"}, {"summary"})
+    assert plan_stages([before, Barrier(), after]) == [[0], [1], [2]]
+
+
+def test_shared_resource_orders_agents():
+    build = Agent({"url"}, {"kb_index"})
+    retrieve = Agent({"query", "kb_index"}, {"response"})
+    assert plan_stages([build, retrieve]) == [[0], [1]]
+
+
+def test_empty_pipeline():
+    assert plan_stages([]) == []
+
+
+# -------------------------------------------------------------------
+# merge_branches
+# -------------------------------------------------------------------
+def _branch(base: PipelineContext, **changes) -> PipelineContext:
+    meta = changes.pop("meta", {})
+    trace = changes.pop("trace", [])
+    branch = PipelineContext(**{**base.__dict__, "trace": list(base.trace), "meta": dict(base.meta)})
+    for name, value in changes.items():
+        setattr(branch, name, value)
+    branch.meta.update(meta)
+    branch.trace.extend(trace)
+    return branch
+
+
+def test_merge_takes_changed_fields_and_new_trace_entries():
+    base = PipelineContext(query="q", trace=[{"agent": "earlier"}])
+    summary = _branch(base, summary="s", trace=[{"agent": "SummaryAgent"}])
+    sms = _branch(base, sms_status="mocked", trace=[{"agent": "SmsAgent"}])
+
+    merged = merge_branches(base, [summary, sms])
+
+    assert (merged.query, merged.summary, merged.sms_status) == ("q", "s", "mocked")
+    assert [t["agent"] for t in merged.trace] == ["earlier", "SummaryAgent", "SmsAgent"]
+    # base is left untouched
+    assert base.summary is None and len(base.trace) == 1
+
+
+def test_merge_last_writer_wins_in_request_order():
+    base = PipelineContext(query="q")
+    merged = merge_branches(base, [_branch(base, response="first"), _branch(base, response="second")])
+    assert merged.response == "second"
+
+
+def test_merge_keeps_unchanged_fields_from_earlier_branches():
+    base = PipelineContext(query="q", response="old")
+    changed = _branch(base, response="new")
+    untouched = _branch(base)
+    assert merge_branches(base, [changed, untouched]).response == "new"
+
+
+def test_merge_meta_and_llm_usage_per_agent():
+    base = PipelineContext(query="q", meta={"source": "vectorstore", "llm_usage": {"retriever": {"calls": 1}}})
+    main = _branch(base, meta={"model": "m", "llm_usage": {"retriever": {"calls": 1}, "main": {"calls": 1}}})
+    summary = _branch(base, meta={"llm_usage": {"retriever": {"calls": 1}, "summary": {"calls": 2}}})
+
+    merged = merge_branches(base, [main, summary])
+
+    assert merged.meta["source"] == "vectorstore"
+    assert merged.meta["model"] == "m"
+    assert set(merged.meta["llm_usage"]) == {"retriever", "main", "summary"}
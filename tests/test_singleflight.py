@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from app.core import deadline
+from app.core.scheduler import priority_scope
+from app.core.singleflight import SingleFlight, flight_key
+
+
+class Upstream:
+    """Counts calls; streams ``chunks`` with a pause before each one."""
+
+    def __init__(self, chunks=("a", "b", "c"), delay: float = 0.02, fail: bool = False):
+        self.chunks = chunks
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = False
+        self.deadlines = []
+
+    async def call(self):
+        self.calls += 1
+        self.deadlines.append(deadline.current())
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise RuntimeError("upstream failed")
+        return "result"
+
+    async def stream(self):
+        self.calls += 1
+        self.deadlines.append(deadline.current())
+        try:
+            for chunk in self.chunks:
+                await asyncio.sleep(self.delay)
+                yield chunk
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+async def _read(subscription):
+    return [chunk async for chunk in subscription]
+
+
+def test_flight_key_ignores_argument_order():
+    assert flight_key(model="m", messages=[1], temperature=0) == flight_key(temperature=0, messages=[1], model="m")
+    assert flight_key(model="m", temperature=0) != flight_key(model="m", temperature=0.5)
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    group, upstream = SingleFlight("test"), Upstream()
+
+    async def main():
+        return await asyncio.gather(*(group.do("k", upstream.call) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert upstream.calls == 1
+    assert [result for result, _ in results] == ["result"] * 5
+    assert [leader for _, leader in results].count(True) == 1
+
+
+def test_errors_reach_every_caller():
+    group, upstream = SingleFlight("test"), Upstream(fail=True)
+
+    async def main():
+        return await asyncio.gather(*(group.do("k", upstream.call) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert upstream.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_upstream_is_cancelled_only_when_the_last_caller_leaves():
+    group, upstream = SingleFlight("test"), Upstream(delay=0.2)
+
+    async def main():
+        first = asyncio.create_task(group.do("k", upstream.call))
+        second = asyncio.create_task(group.do("k", upstream.call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert not upstream.cancelled
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert upstream.cancelled
+
+
+def test_stream_subscribers_all_get_every_chunk():
+    group, upstream = SingleFlight("test"), Upstream()
+
+    async def main():
+        leader = group.stream("k", upstream.stream)
+        await asyncio.sleep(0.03)  # a late subscriber replays what was already produced
+        follower = group.stream("k", upstream.stream)
+        return leader, follower, await asyncio.gather(_read(leader), _read(follower))
+
+    leader, follower, outputs = asyncio.run(main())
+    assert upstream.calls == 1
+    assert (leader.leader, follower.leader) == (True, False)
+    assert outputs == [["a", "b", "c"], ["a", "b", "c"]]
+
+
+def test_stream_is_cancelled_when_every_subscriber_leaves():
+    group, upstream = SingleFlight("test"), Upstream(delay=0.05)
+
+    async def main():
+        subscription = group.stream("k", upstream.stream)
+        reader = asyncio.create_task(_read(subscription))
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert upstream.cancelled
+
+
+def test_upstream_runs_without_the_leaders_deadline():
+    group, upstream = SingleFlight("test"), Upstream(delay=0.05)
+
+    async def call(budget):
+        with deadline.scope(deadline.from_timeout(budget)):
+            return await group.do("k", upstream.call)
+
+    async def main():
+        return await asyncio.gather(call(0.01), call(5), return_exceptions=True)
+
+    short, long = asyncio.run(main())
+    assert isinstance(short, deadline.DeadlineExceeded)
+    # The follower with more budget still gets the shared result
+    assert long == ("result", False)
+    assert upstream.deadlines == [None]
+
+
+def test_stream_follower_outlives_the_leaders_deadline():
+    group, upstream = SingleFlight("test"), Upstream(delay=0.02)
+
+    async def read(budget):
+        with deadline.scope(deadline.from_timeout(budget)):
+            try:
+                return await _read(group.stream("k", upstream.stream))
+            except deadline.DeadlineExceeded:
+                return "timed out"
+
+    async def main():
+        return await asyncio.gather(read(0.03), read(5))
+
+    assert asyncio.run(main()) == ["timed out", ["a", "b", "c"]]
+    assert upstream.calls == 1
+
+
+@pytest.mark.parametrize("shared", [True, False])
+def test_calls_are_only_shared_within_a_priority_class(shared):
+    group, upstream = SingleFlight("test"), Upstream()
+
+    async def call(priority):
+        with priority_scope(priority):
+            return await group.do("k", upstream.call)
+
+    async def main():
+        return await asyncio.gather(call("interactive"), call("interactive" if shared else "batch"))
+
+    asyncio.run(main())
+    assert upstream.calls == (1 if shared else 2)
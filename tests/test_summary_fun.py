@@ -0,0 +1,123 @@
+import asyncio
+import math
+from types import SimpleNamespace
+
+from app.core import llm_cache, llm_provider, tokens
+from app.core.llm_cache import LlmResponseCache
+from app.core.llm_provider import ChatCompletionsProvider
+from app.core.summary_fun import (
+    MAP_PROMPT,
+    REDUCE_PROMPT,
+    map_reduce_summarize,
+    split_into_sections,
+    summarize_extracted_text,
+)
+
+
+class FakeProvider:
+    """Answers every prompt with ``reply`` and records what it was asked."""
+
+    def __init__(self, reply: str = "partial summary"):
+        self.reply = reply
+        self.prompts = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def generate_response(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return self.reply
+
+    async def stream_response(self, prompt: str):
+        yield await self.generate_response(prompt)
+
+
+def _document(rows: int) -> str:
+    return "\n".join(f"row {i}: revenue {i * 10}, region north, status active" for i in range(rows))
+
+
+def test_sections_respect_the_budget_and_keep_rows_whole():
+    text = _document(300)
+    sections = split_into_sections(text, max_tokens=200)
+    assert len(sections) > 1
+    assert all(tokens.count_tokens(section) <= 200 for section in sections)
+    assert "\n".join(sections).splitlines() == text.splitlines()
+
+
+def test_oversized_line_is_split_on_its_own():
+    text = "short line\n" + " ".join(["word"] * 1000) + "\nlast line"
+    sections = split_into_sections(text, max_tokens=100)
+    assert sections[0] == "short line" and sections[-1] == "last line"
+    assert all(tokens.count_tokens(section) <= 100 for section in sections)
+
+
+def test_single_section_takes_one_call_with_the_callers_prompt():
+    provider = FakeProvider()
+    result = asyncio.run(map_reduce_summarize(_document(3), "CALLER PROMPT\n", provider, section_tokens=1000))
+    assert result == "partial summary"
+    assert len(provider.prompts) == 1
+    assert provider.prompts[0].startswith("CALLER PROMPT")
+
+
+def test_every_section_is_mapped_then_merged_once_under_the_callers_prompt():
+    text = _document(100)
+    sections = split_into_sections(text, 200)
+    provider = FakeProvider(reply="ok")
+
+    asyncio.run(map_reduce_summarize(text, "CALLER PROMPT\n", provider, section_tokens=200, concurrency=3))
+
+    map_calls = [p for p in provider.prompts if p.startswith(MAP_PROMPT)]
+    final_calls = [p for p in provider.prompts if p.startswith("CALLER PROMPT")]
+    assert len(map_calls) == len(sections)
+    # Short partial summaries all fit in one group: no intermediate level, no extra pass
+    assert len(provider.prompts) == len(sections) + 1
+    assert len(final_calls) == 1 and REDUCE_PROMPT in final_calls[0]
+    assert provider.peak <= 3
+
+
+def test_long_partial_summaries_still_converge():
+    # Each partial summary fills most of a section, so no two pack together: merge pairwise
+    provider = FakeProvider(reply=" ".join(["fact"] * 120))
+    text = _document(400)
+    sections = split_into_sections(text, 200)
+
+    asyncio.run(map_reduce_summarize(text, "CALLER PROMPT\n", provider, section_tokens=200))
+
+    # n map calls, then a pairwise merge tree: n - 1 merges plus at most one odd leftover per level
+    n = len(sections)
+    assert len(provider.prompts) <= n + (n - 1) + math.ceil(math.log2(n))
+    assert provider.prompts[-1].startswith("CALLER PROMPT")
+
+
+class FakeCompletions:
+    """Stands in for ``client.chat.completions``: records each request and answers "cached summary"."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, **request):
+        self.requests.append(request)
+        message = SimpleNamespace(content="cached summary")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def test_repeated_summary_is_served_from_the_llm_cache(tmp_path, monkeypatch):
+    completions = FakeCompletions()
+    provider = ChatCompletionsProvider()
+    provider.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    provider.model_name = "test-model"
+    monkeypatch.setitem(llm_provider._providers, "fake", provider)
+    cache = LlmResponseCache(path=str(tmp_path / "llm_cache.db"), mode="readwrite")
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+
+    async def main():
+        return [await summarize_extracted_text(_document(3), llm_provider="fake") for _ in range(2)]
+
+    assert asyncio.run(main()) == ["cached summary", "cached summary"]
+    assert len(completions.requests) == 1
+    assert completions.requests[0]["temperature"] == 0.0
+    assert (cache.hits, cache.writes) == (1, 1)
+    cache.close()
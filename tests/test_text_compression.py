@@ -0,0 +1,87 @@
+import asyncio
+import zlib
+
+import numpy as np
+
+from app.core import tokens
+from app.services.text_compression import CompressionResult, compress_text, select_units, split_units
+
+
+class HashedEmbeddings:
+    """Bag-of-words vectors: deterministic and offline, close enough for selection tests."""
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % 64] += 1
+        return vectors.tolist()
+
+
+def _unit(*components: float) -> np.ndarray:
+    return np.asarray(components, dtype=np.float32)
+
+
+def test_split_units_rows_and_sentences():
+    text = "Name, Sales\nAlice, 10\n\nBob, 20"
+    assert split_units(text, "row") == ["Name, Sales", "Alice, 10", "Bob, 20"]
+    prose = "Revenue rose. Costs fell! Was it luck? No.\nNext line here."
+    assert split_units(prose, "sentence") == ["Revenue rose.", "Costs fell!", "Was it luck?", "No.", "Next line here."]
+
+
+def test_select_units_stays_within_budget_in_document_order():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(40, 8)).astype(np.float32)
+    unit_tokens = rng.integers(5, 30, size=40)
+
+    kept = select_units(vectors, unit_tokens, budget=100)
+
+    assert unit_tokens[kept].sum() <= 100
+    assert list(kept) == sorted(kept)
+    assert len(set(kept.tolist())) == len(kept)
+
+
+def test_select_units_prefers_salient_units():
+    # Three units on the document's main topic, one outlier
+    vectors = np.stack([_unit(1, 0.1, 0), _unit(1, 0, 0.1), _unit(0.9, 0.1, 0.1), _unit(0, 0, 1)])
+    kept = select_units(vectors, np.array([10, 10, 10, 10]), budget=10, redundancy=0.0)
+    assert kept.tolist() in ([0], [1], [2])
+
+
+def test_select_units_skips_near_duplicates():
+    # Units 0 and 1 say the same thing; unit 2 is different but still on topic
+    vectors = np.stack([_unit(1, 0, 0), _unit(1, 0, 0), _unit(0.6, 0.8, 0)])
+    tokens = np.array([10, 10, 10])
+    assert select_units(vectors, tokens, budget=20, redundancy=0.0).tolist() == [0, 1]
+    assert select_units(vectors, tokens, budget=20, redundancy=0.7).tolist() == [0, 2]
+
+
+def test_select_units_skips_units_larger_than_what_is_left():
+    vectors = np.stack([_unit(1, 0), _unit(1, 0), _unit(1, 0)])
+    # Unit 0 alone exceeds the budget; after unit 1, exactly unit 2 still fits
+    kept = select_units(vectors, np.array([70, 50, 10]), budget=60, redundancy=0.0)
+    assert kept.tolist() == [1, 2]
+
+
+def test_compression_result_ratio():
+    result = CompressionResult("short", original_tokens=200, compressed_tokens=50, units_total=10, units_kept=3)
+    assert result.ratio == 0.25
+    assert result.trace_entry("GoogleDocsAgent")["compression_ratio"] == 0.25
+    assert CompressionResult("", 0, 0, 0, 0).ratio == 1.0
+
+
+def test_compress_text_within_budget_is_unchanged():
+    text = "Short note. Nothing to cut."
+    result = asyncio.run(compress_text(text, HashedEmbeddings(), budget=1000))
+    assert result.text == text and result.ratio == 1.0
+
+
+def test_compress_text_fits_the_budget_and_keeps_whole_units():
+    sentences = [f"Region {i % 5} reported revenue of {i * 7} units in week {i}." for i in range(60)]
+    text = " ".join(sentences)
+    result = asyncio.run(compress_text(text, HashedEmbeddings(), budget=150))
+
+    assert result.compressed_tokens <= 150 < result.original_tokens
+    assert 0 < result.units_kept < result.units_total == len(sentences)
+    assert all(line in sentences for line in result.text.splitlines())
+    assert result.compressed_tokens == tokens.count_tokens(result.text)